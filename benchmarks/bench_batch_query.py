@@ -0,0 +1,93 @@
+"""
+Batch blocking versus one query column at a time.
+
+- per column: range_query + block for every query column separately (the
+  original online loop), re-gathering the same postings and candidate
+  vectors for each column
+- batch: one range_query over all query vectors and one block_batch pass
+  comparing each candidate column against every query column
+- dedup: as batch, but values shared between query columns (query tables
+  drawn from the same domains) are blocked once; also on 4 threads
+
+All modes must return the same matches per query column (early stopping
+off: batch and single runs close columns at different points).
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_query
+"""
+from __future__ import annotations
+import time
+
+import numpy as np
+
+from benchmarks.bench_grid_tree import DIM, LATENT, make_lake
+from benchmarks.workloads import index_lake
+from index.pivots import PivotSelector
+from index.grid import HierarchicalGrid
+from search.blocking import Blocker, QueryGroups
+from utils.config import Config
+from utils.types import GREEN, RED, RESET
+
+QUERY_ROWS = 50
+
+
+def main():
+    cfg = Config(verify_early_stop="none")
+    rng = np.random.default_rng(cfg.seed)
+    basis = rng.standard_normal((LATENT, DIM))
+    lake = make_lake(400, 250, rng, basis)
+    all_vecs = np.vstack(list(lake.values()))
+
+    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+    selector.fit(all_vecs)
+    grid = HierarchicalGrid(levels=cfg.grid_levels)
+    grid.fit(selector.transform(all_vecs))
+    inv, tree, dists_map = index_lake(lake, selector, grid)
+
+    print(f"{'query cols':>10} {'per col s':>10} {'batch s':>8} {'dedup s':>8} {'4 thr s':>8} "
+          f"{'speedup':>8}  same matches")
+    # query columns sample values from a few shared domains, as nightly query tables do
+    domains = [lake[k] for k in list(lake)[:5]]
+    for n_queries in (20, 100):
+        picks = [(rng.integers(len(domains)), rng.choice(250, QUERY_ROWS, replace=False)) for _ in range(n_queries)]
+        queries = [domains[d][rows] for d, rows in picks]
+        q_dists = [selector.transform(q) for q in queries]
+
+        t0 = time.perf_counter()
+        single = []
+        for q, qd in zip(queries, q_dists):
+            blocker = Blocker(cfg, grid, tree)
+            post = blocker.range_query(qd, inv)
+            single.append(blocker.block(q, post, lake, qd, dists_map))
+        t_single = time.perf_counter() - t0
+
+        offsets = np.arange(n_queries + 1) * QUERY_ROWS
+        t0 = time.perf_counter()
+        q_all, qd_all = np.vstack(queries), np.vstack(q_dists)
+        blocker = Blocker(cfg, grid, tree)
+        post = blocker.range_query(qd_all, inv)
+        batched = blocker.block_batch(q_all, QueryGroups.from_offsets(offsets), post, lake, qd_all, dists_map)
+        t_batch = time.perf_counter() - t0
+
+        timings, same = [], single == batched
+        for workers in (1, 4):
+            t0 = time.perf_counter()
+            ids = np.concatenate([d * 250 + rows for d, rows in picks])
+            uniq, inverse = np.unique(ids, return_inverse=True)
+            q_uniq = np.vstack(domains)[uniq]
+            qd_uniq = selector.transform(q_uniq)
+            blocker = Blocker(cfg, grid, tree)
+            post = blocker.range_query(qd_uniq, inv)
+            deduped = blocker.block_batch(
+                q_uniq, QueryGroups.from_inverse(inverse, offsets), post, lake, qd_uniq, dists_map, workers=workers,
+            )
+            timings.append(time.perf_counter() - t0)
+            same &= single == deduped
+
+        flag = f"{GREEN}yes{RESET}" if same else f"{RED}NO{RESET}"
+        print(f"{n_queries:>10} {t_single:>10.3f} {t_batch:>8.3f} {timings[0]:>8.3f} {timings[1]:>8.3f} "
+              f"{t_single / min(timings):>7.1f}x  {flag}")
+
+
+if __name__ == "__main__":
+    main()
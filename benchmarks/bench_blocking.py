@@ -0,0 +1,53 @@
+"""
+Microbenchmark for Blocker.block.
+
+Times the tiled matrix engine against the original per-posting,
+per-query-vector loop (benchmarks.workloads.reference_block) on
+synthetic unit vectors (early stopping off, so
+both count every match). That both return the same counts is checked by
+tests/test_blocking.py.
+
+Run from the repository root:
+    python -m benchmarks.bench_blocking
+"""
+from __future__ import annotations
+import time
+
+import numpy as np
+
+from benchmarks.workloads import make_blocking_workload, reference_block
+from search.blocking import Blocker
+from utils.config import Config
+
+DIM = 300
+N_COLUMNS = 20
+# skip the reference loop above this many (posting, query vector) pairs
+REFERENCE_MAX_PAIRS = 2_000_000
+
+
+def main():
+    cfg = Config(verify_early_stop="none")
+    rng = np.random.default_rng(cfg.seed)
+    blocker = Blocker(cfg)
+
+    print(f"{'|Q|':>6} {'postings':>9} {'tiled (s)':>10} {'loop (s)':>10} {'speedup':>8}")
+    for n_query in (100, 1000, 4000):
+        for n_postings in (1_000, 10_000, 100_000):
+            q_vecs, postings, cand_vecs_map = make_blocking_workload(
+                n_query, N_COLUMNS, max(1, n_postings // N_COLUMNS), DIM, rng)
+
+            t0 = time.perf_counter()
+            blocker.block(q_vecs, postings, cand_vecs_map)
+            t_fast = time.perf_counter() - t0
+
+            if n_query * n_postings <= REFERENCE_MAX_PAIRS:
+                t0 = time.perf_counter()
+                reference_block(q_vecs, postings, cand_vecs_map, cfg.tau_ratio * 2.0)
+                t_ref = time.perf_counter() - t0
+                print(f"{n_query:>6} {n_postings:>9} {t_fast:>10.4f} {t_ref:>10.4f} {t_ref / t_fast:>7.1f}x")
+            else:
+                print(f"{n_query:>6} {n_postings:>9} {t_fast:>10.4f} {'-':>10} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Recall and latency of the candidate generators.
+
+Builds a synthetic clustered lake (see bench_grid_tree), then answers the
+same query columns with
+- grid: leaf cells of the pivot grid tree (exact)
+- ivf: IVF lists over the value vectors, every list within radius + τ (exact)
+- ivf/n: IVF probing at most n lists per query vector (approximate)
+
+and compares the matched query vectors per candidate column against a
+brute-force scan. Recall is the share of true (query vector, column)
+matches found; time covers candidate generation plus blocking.
+
+Run from the repository root:
+    python -m benchmarks.bench_candidates
+"""
+from __future__ import annotations
+import time
+
+import numpy as np
+
+from benchmarks.bench_grid_tree import DIM, LATENT, make_lake
+from benchmarks.workloads import index_lake, unit
+from index.candidates import GridCandidates, IVFCandidates, build_ivf_lists
+from index.grid import HierarchicalGrid
+from index.pivots import PivotSelector
+from search.blocking import Blocker, QueryGroups
+from utils.config import Config
+from utils.types import TableId, ColumnId
+
+N_COLUMNS = 400
+ROWS = 250
+N_QUERIES = 10
+NPROBE = (1, 4, 16)
+
+
+def brute_force(q_vecs: np.ndarray, lake: dict, tau: float) -> dict:
+    """(table, column) -> number of query vectors within τ of some row."""
+    q_sq = np.einsum("ij,ij->i", q_vecs, q_vecs)
+    matched = {}
+    for (t, c), vecs in lake.items():
+        d_sq = q_sq[:, None] + np.einsum("ij,ij->i", vecs, vecs)[None, :] - 2.0 * q_vecs @ vecs.T
+        n = int((d_sq.min(axis=1) <= tau * tau + 1e-6).sum())
+        if n:
+            matched[(TableId(t), ColumnId(c))] = n
+    return matched
+
+
+def main():
+    cfg = Config(verify_early_stop="none")  # exact counts, so recall is measured on matches
+    rng = np.random.default_rng(cfg.seed)
+    basis = rng.standard_normal((LATENT, DIM))
+    lake = make_lake(N_COLUMNS, ROWS, rng, basis)
+    keys = list(lake)
+    all_vecs = np.vstack([lake[k] for k in keys])
+
+    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+    selector.fit(all_vecs)
+    grid = HierarchicalGrid(levels=cfg.grid_levels)
+    grid.fit(selector.transform(all_vecs))
+    inv, tree, dists_map = index_lake(lake, selector, grid)
+
+    t0 = time.perf_counter()
+    centroids = IVFCandidates.fit_centroids(all_vecs, IVFCandidates.default_lists(len(all_vecs)), cfg.seed)
+    list_ids, center_dists = IVFCandidates.assign(centroids, all_vecs)
+    col_ids = np.repeat(np.arange(len(keys), dtype=np.int32), ROWS)
+    row_ids = np.tile(np.arange(ROWS, dtype=np.int32), len(keys))
+    ivf = build_ivf_lists(centroids, inv.columns, list_ids, col_ids, row_ids, center_dists)
+    print(f"lake: {len(all_vecs)} vectors in {N_COLUMNS} columns; "
+          f"IVF: {len(centroids)} lists, fitted in {time.perf_counter() - t0:.2f} s")
+
+    generators = [("grid", GridCandidates(grid, tree, inv)), ("ivf", ivf)]
+    generators += [(f"ivf/{n}", IVFCandidates(ivf.centroids, ivf.radii, ivf.lists, nprobe=n)) for n in NPROBE]
+
+    # query columns: noisy copies of lake columns, so matches spread over neighbouring columns
+    queries = [
+        unit(lake[keys[i]][:100] + 0.004 * rng.standard_normal((100, DIM)))
+        for i in rng.choice(len(keys), N_QUERIES, replace=False)
+    ]
+
+    print(f"{'tau':>5} {'backend':>8} {'cells':>7} {'exact dists':>12} {'ms/query':>9} {'recall':>7}  (matches)")
+    for tau_ratio in (0.06, 0.1, 0.15):
+        cfg.tau_ratio = tau_ratio
+        truth = [brute_force(q, lake, tau_ratio * 2) for q in queries]
+        total = sum(sum(t.values()) for t in truth)
+        for name, generator in generators:
+            cells = verified = found = 0
+            elapsed = 0.0
+            for q_vecs, expected in zip(queries, truth):
+                q_dists = selector.transform(q_vecs)
+                blocker = Blocker(cfg, grid, tree, generator)
+                t0 = time.perf_counter()
+                postings = blocker.candidates(q_vecs, q_dists)
+                result = blocker.block_batch(
+                    q_vecs, QueryGroups.from_offsets([0, len(q_vecs)]), postings, lake, q_dists, dists_map,
+                )[0]
+                elapsed += time.perf_counter() - t0
+                cells += blocker.stats.cells_visited
+                verified += blocker.stats.pairs_verified
+                found += sum(min(n, result.get(key, 0)) for key, n in expected.items())
+            print(f"{tau_ratio * 2:>5.2f} {name:>8} {cells / N_QUERIES:>7.0f} {verified / N_QUERIES:>12.0f} "
+                  f"{1000 * elapsed / N_QUERIES:>9.2f} {found / max(1, total):>7.3f}  ({total})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Column pre-filter: candidate columns eliminated per stage, and latency.
+
+Lake of clustered columns (bench_grid_tree.make_lake: unit vectors near
+a low-dimensional subspace, one cluster per column, as columns of one
+kind of value are in a real embedding space), written with write_index
+and searched through IndexSearcher. Each query column copies a share of
+one lake column's rows (its planted partner) and fills the rest from
+its own cluster.
+
+Every query column is answered with cfg.column_prefilter off and on, for
+all joinable columns and for the top k. Reported, summed over query
+columns: the candidate columns reached by the range query and how many
+each stage drops (column summaries, then query vectors reaching the
+column's cells), the columns scanned row by row and the joinable ones.
+Joinable columns must be the same either way.
+
+Also checks the MinHash estimate used for ranking: the share of query
+columns whose best estimated candidate column is their planted partner.
+
+Run from the repository root:
+    python -m benchmarks.bench_column_prefilter
+"""
+from __future__ import annotations
+import math
+import os
+import tempfile
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from benchmarks.bench_grid_tree import DIM, LATENT, make_lake
+from benchmarks.workloads import unit
+from index.grid import fit_grid
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex
+from index.pivots import PivotSelector
+from index.storage import write_index
+from search.blocking import QueryGroups
+from search.engine import IndexSearcher
+from utils.config import Config
+from utils.types import GREEN, RED, RESET, TableId, ColumnId
+
+N_COLUMNS = 400
+COLUMN_ROWS = 250
+N_QUERIES = 20
+QUERY_ROWS = 200
+TOP_K = 3
+REPEATS = 3
+
+
+def build(path: str, lake: dict, cfg: Config):
+    all_vecs = np.vstack(list(lake.values()))
+    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+    selector.fit(all_vecs)
+    grid = fit_grid(selector.transform(all_vecs), cfg.grid_levels, cfg.grid_bins, cfg.grid_cell_cap)
+    inv, tree = InvertedIndex(), GridTree(levels=grid.levels)
+    col_meta, col_embeddings, col_dists = {}, {}, {}
+    for cid, ((t, c), vecs) in enumerate(lake.items()):
+        dists = selector.transform(vecs)
+        codes = grid.transform_codes(dists)
+        inv.add(codes[:, -1], TableId(t), ColumnId(c))
+        tree.add(codes, dists)
+        col_meta[cid], col_embeddings[cid], col_dists[cid] = {"table": t, "column": c}, vecs, dists
+    tree.finalize()
+    write_index(path, selector.pivots, grid, tree, inv, col_meta, col_embeddings, col_dists)
+
+
+def make_queries(lake: dict, rng: np.random.Generator, basis: np.ndarray):
+    """(planted partner, query vectors) pairs: a share of the partner's rows, the rest from a new cluster."""
+    keys = list(lake)
+    queries = []
+    for i in rng.choice(len(keys), N_QUERIES, replace=False):
+        partner = keys[i]
+        copied = lake[partner][rng.permutation(COLUMN_ROWS)[:int(rng.uniform(0.3, 1.0) * QUERY_ROWS)]]
+        z = rng.standard_normal(LATENT) * 3 + rng.standard_normal((QUERY_ROWS - len(copied), LATENT))
+        own = unit(z @ basis + 0.05 * rng.standard_normal((len(z), DIM)))
+        queries.append((partner, np.vstack([copied, own])))
+    return queries
+
+
+def run_queries(searcher: IndexSearcher, queries, top_k: int):
+    """(per query best-of-REPEATS latencies, summed column counters, joinable (query, column) set)."""
+    latencies, found = [], set()
+    counters = dict(reached=0, summary=0, cells=0, scanned=0, joinable=0)
+    for qi, (_, q_vecs) in enumerate(queries):
+        min_matches = math.ceil(searcher.cfg.T_ratio * len(q_vecs) - 1e-9)
+        runs = []
+        for _ in range(REPEATS):
+            t0 = time.perf_counter()
+            q_dists = searcher.selector.transform(q_vecs)
+            if top_k:
+                best, stats, _, _ = searcher.top_k(q_vecs, q_dists, np.ones(len(q_vecs), dtype=np.int64),
+                                                   top_k, min_matches)
+                joinable = {key for key, _ in best}
+            else:
+                per_column, stats, _ = searcher.block(q_vecs, q_dists, QueryGroups.from_offsets([0, len(q_vecs)]))
+                joinable = {key for key, m in per_column[0].items() if m >= min_matches}
+            runs.append(time.perf_counter() - t0)
+        latencies.append(min(runs))
+        found |= {(qi, t.name, c.name) for t, c in joinable}
+        counters["reached"] += stats.columns_reached
+        counters["summary"] += stats.columns_pruned_summary
+        counters["cells"] += stats.columns_pruned_cells
+        counters["scanned"] += stats.columns_scanned
+        counters["joinable"] += len(joinable)
+    return latencies, counters, found
+
+
+def main():
+    cfg = Config()
+    rng = np.random.default_rng(cfg.seed)
+    basis = rng.standard_normal((LATENT, DIM))
+    lake = make_lake(N_COLUMNS, COLUMN_ROWS, rng, basis)
+    queries = make_queries(lake, rng, basis)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index")
+        build(path, lake, cfg)
+        print(f"lake: {N_COLUMNS} columns x {COLUMN_ROWS} rows; {N_QUERIES} query columns of {QUERY_ROWS} rows "
+              f"(counts summed over them)")
+        print(f"{'mode':>6} {'prefilter':>9} {'reached':>7} {'summary':>7} {'cells':>5} {'scanned':>7} "
+              f"{'joinable':>8} {'p50 ms':>7}  same results")
+        for top_k in (0, TOP_K):
+            expected = None
+            for prefilter in (False, True):
+                searcher = IndexSearcher(path, replace(cfg, column_prefilter=prefilter))
+                latencies, c, found = run_queries(searcher, queries, top_k)
+                expected = found if expected is None else expected
+                mode = f"top {top_k}" if top_k else "all"
+                print(f"{mode:>6} {'on' if prefilter else 'off':>9} {c['reached']:>7} {c['summary']:>7} "
+                      f"{c['cells']:>5} {c['scanned']:>7} {c['joinable']:>8} "
+                      f"{1000 * np.percentile(latencies, 50):>7.1f}  "
+                      f"{GREEN + 'yes' if found == expected else RED + 'NO'}{RESET}")
+
+        summaries = IndexSearcher(path, cfg).summaries
+        keys = list(lake)
+        rows = summaries.positions(keys)
+        hits = sum(keys[int(np.argmax(summaries.estimate(rows, q_vecs)))] == partner for partner, q_vecs in queries)
+        print(f"best candidate by MinHash estimate is the planted partner for {100 * hits / len(queries):.0f}% "
+              f"of query columns")
+
+
+if __name__ == "__main__":
+    main()
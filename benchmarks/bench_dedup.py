@@ -0,0 +1,83 @@
+"""
+Index size and query cost with one vector per distinct value per column.
+
+Builds a synthetic CSV lake of low-cardinality columns (a few dozen
+distinct values over thousands of rows, like country or status columns)
+and reports, next to the rows in the lake, the vectors and postings
+actually stored, the size of the embedding, pivot distance and postings
+files, and what they would take at one vector per row. Then times a
+query column with repeated values in both joinability modes.
+
+Run from the repository root:
+    python -m benchmarks.bench_dedup [rows_per_table]
+"""
+from __future__ import annotations
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_streaming_build import HashModel
+from index.storage import INDEX_DIRNAME, IndexReader, resolve_index
+from offline import run_offline
+from search.engine import QueryEngine
+from utils.config import Config
+
+N_TABLES = 20
+CARDINALITY = (12, 50, 200)
+
+
+def make_lake(folder: str, rows: int, rng: np.random.Generator):
+    for t in range(N_TABLES):
+        pd.DataFrame({
+            f"c{n}": [f"v{n}_{x}" for x in rng.integers(0, n, rows)] for n in CARDINALITY
+        }).to_csv(os.path.join(folder, f"table_{t:03d}.csv"), index=False)
+
+
+def _file_mb(index_dir: str, names) -> float:
+    live = resolve_index(index_dir)
+    return sum(os.path.getsize(os.path.join(live, f"{n}.bin")) for n in names) / (1024 * 1024)
+
+
+def main(rows: int):
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        lake, out = os.path.join(tmp, "lake"), os.path.join(tmp, "out")
+        os.makedirs(lake)
+        make_lake(lake, rows, rng)
+        cfg = Config(embedding_cache=False)
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_offline(lake, out, cfg, model=HashModel())
+        build_s = time.perf_counter() - t0
+
+        index_dir = os.path.join(out, INDEX_DIRNAME)
+        reader = IndexReader(index_dir)
+        counts = reader.array("value_counts")
+        k, d = reader.array("pivots").shape
+        n_vecs, n_rows = len(counts), int(counts.sum())
+        arrays = ("embeddings", "pivot_dists", "postings_col_ids", "postings_row_ids")
+        stored = _file_mb(index_dir, arrays)
+        per_row = n_rows * (4 * d + 4 * k + 8) / (1024 * 1024)
+        print(f"lake rows: {n_rows}, stored vectors: {n_vecs} ({n_rows / n_vecs:.0f} rows per vector), "
+              f"build: {build_s:.2f} s")
+        print(f"embeddings + pivot dists + postings: {stored:.2f} MB (one vector per row: {per_row:.1f} MB)")
+
+        query = [f"v50_{x}" for x in rng.integers(0, 60, 20_000)]  # 50 of 60 values exist in the lake
+        for mode in ("weighted", "distinct"):
+            engine = QueryEngine(out, Config(embedding_cache=False, joinability=mode), HashModel())
+            t0 = time.perf_counter()
+            results, stats = engine.query_column("q.csv", "value", query)
+            elapsed = time.perf_counter() - t0
+            best = max(results, key=lambda r: r.joinability)
+            print(f"{mode:>8}: |Q| = {best.query_size}, best joinability {best.joinability:.3f}, "
+                  f"{stats.pairs_verified} exact distances, {elapsed:.3f} s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,106 @@
+"""
+Posting list balance and query cost of uniform versus quantile grid bins.
+
+Builds a skewed synthetic lake, where a few dense clusters hold most of
+the rows (cluster sizes follow a power law), and indexes it with
+- uniform: equal-width bins between each pivot's min and max distance
+- quantile: equal-depth bins at the quantiles of each pivot's distances
+- quantile+cap: quantile bins, levels added until no cell exceeds CELL_CAP
+
+then answers the same query columns against each grid. Matches must be
+the same; posting lists should be shorter and more even with quantiles.
+
+Run from the repository root:
+    python -m benchmarks.bench_grid_bins
+"""
+from __future__ import annotations
+import time
+
+import numpy as np
+
+from benchmarks.bench_grid_tree import DIM, LATENT
+from benchmarks.workloads import unit
+from index.candidates import GridCandidates
+from index.grid import fit_grid
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex
+from index.pivots import PivotSelector
+from search.blocking import Blocker, QueryGroups
+from utils.config import Config
+from utils.types import TableId, ColumnId
+
+N_COLUMNS = 400
+ROWS = 250
+N_CLUSTERS = 40
+N_QUERIES = 10
+CELL_CAP = 500
+# (name, bins, cell cap)
+VARIANTS = [("uniform", "uniform", 0), ("quantile", "quantile", 0), ("quantile+cap", "quantile", CELL_CAP)]
+
+
+def make_skewed_lake(rng: np.random.Generator, basis: np.ndarray) -> dict:
+    """Columns drawn from clusters of power-law popularity, so a few regions are crowded."""
+    centres = rng.standard_normal((N_CLUSTERS, LATENT)) * 3
+    weights = 1.0 / np.arange(1, N_CLUSTERS + 1) ** 1.5
+    lake = {}
+    for c in range(N_COLUMNS):
+        cluster = rng.choice(N_CLUSTERS, p=weights / weights.sum())
+        z = centres[cluster] + 0.3 * rng.standard_normal((ROWS, LATENT))
+        lake[(f"t{c}.csv", "value")] = unit(z @ basis + 0.05 * rng.standard_normal((ROWS, DIM)))
+    return lake
+
+
+def main():
+    cfg = Config(verify_early_stop="none")  # exact counts, comparable across grids
+    rng = np.random.default_rng(cfg.seed)
+    basis = rng.standard_normal((LATENT, DIM))
+    lake = make_skewed_lake(rng, basis)
+    keys = list(lake)
+    all_vecs = np.vstack([lake[k] for k in keys])
+    queries = [
+        unit(lake[keys[i]][:100] + 0.004 * rng.standard_normal((100, DIM)))
+        for i in rng.choice(len(keys), N_QUERIES, replace=False)
+    ]
+
+    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+    selector.fit(all_vecs)
+    all_dists = selector.transform(all_vecs)
+    dists_map = {key: selector.transform(vecs) for key, vecs in lake.items()}
+    print(f"lake: {len(all_vecs)} vectors in {N_COLUMNS} columns from {N_CLUSTERS} clusters; "
+          f"{N_QUERIES} queries, tau = {cfg.tau_ratio * 2:.2f}")
+    print(f"{'grid':>13} {'levels':>6} {'lists':>6} {'max':>6} {'p99':>6} {'gini':>5} "
+          f"{'cells':>7} {'exact dists':>12} {'ms/query':>9}  same matches")
+
+    baseline = None
+    for name, bins, cap in VARIANTS:
+        grid = fit_grid(all_dists, cfg.grid_levels, bins, cap)
+        inv, tree = InvertedIndex(), GridTree(grid.levels)
+        for (t, c), dists in dists_map.items():
+            codes = grid.transform_codes(dists)
+            inv.add(codes[:, -1], TableId(t), ColumnId(c))
+            tree.add(codes, dists)
+        tree.finalize()
+        stats = inv.length_stats()
+
+        generator = GridCandidates(grid, tree, inv)
+        results, cells, verified, elapsed = [], 0, 0, 0.0
+        for q_vecs in queries:
+            q_dists = selector.transform(q_vecs)
+            blocker = Blocker(cfg, grid, tree, generator)
+            t0 = time.perf_counter()
+            postings = blocker.candidates(q_vecs, q_dists)
+            results.append(blocker.block_batch(
+                q_vecs, QueryGroups.from_offsets([0, len(q_vecs)]), postings, lake, q_dists, dists_map,
+            )[0])
+            elapsed += time.perf_counter() - t0
+            cells += blocker.stats.cells_visited
+            verified += blocker.stats.pairs_verified
+        if baseline is None:
+            baseline = results
+        print(f"{name:>13} {grid.levels:>6} {stats['cells']:>6} {stats['max']:>6} {stats['p99']:>6.0f} "
+              f"{stats['gini']:>5.2f} {cells / N_QUERIES:>7.0f} {verified / N_QUERIES:>12.0f} "
+              f"{1000 * elapsed / N_QUERIES:>9.2f}  {results == baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Cells visited per query: top-down GridTree traversal versus flat lookups.
+
+- leaf lookup: the original online path, one leaf cell per query vector
+  (cheap, but misses matches in neighbouring cells)
+- flat range: every leaf cell of the inverted index is tested
+- tree: GridTree.search, pruning/accepting subtrees at coarse levels
+
+Both range strategies must yield the same matches.
+
+Run from the repository root:
+    python -m benchmarks.bench_grid_tree
+"""
+from __future__ import annotations
+import time
+
+import numpy as np
+
+from benchmarks.workloads import index_lake, unit
+from index.pivots import PivotSelector
+from index.grid import HierarchicalGrid
+from search.blocking import Blocker
+from utils.config import Config
+
+DIM = 300
+LATENT = 8
+
+
+def make_lake(n_columns: int, rows: int, rng: np.random.Generator, basis: np.ndarray):
+    """Columns of unit vectors living near a low-dimensional subspace."""
+    cols = {}
+    for c in range(n_columns):
+        centre = rng.standard_normal(LATENT) * 3
+        z = centre + rng.standard_normal((rows, LATENT))
+        cols[(f"t{c}.csv", "value")] = unit(z @ basis + 0.05 * rng.standard_normal((rows, DIM)))
+    return cols
+
+
+def main():
+    cfg = Config(verify_early_stop="none")  # exact counts on both sides
+    rng = np.random.default_rng(cfg.seed)
+    basis = rng.standard_normal((LATENT, DIM))
+
+    print(f"{'lake rows':>10} {'levels':>6} {'tau':>5} {'leaf':>6} {'flat':>7} {'tree':>7} "
+          f"{'flat s':>8} {'tree s':>8}  same matches")
+    for n_columns in (50, 200, 800):
+        lake = make_lake(n_columns, 250, rng, basis)
+        all_vecs = np.vstack(list(lake.values()))
+
+        selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+        selector.fit(all_vecs)
+        for levels in (3, 5):
+            grid = HierarchicalGrid(levels=levels)
+            grid.fit(selector.transform(all_vecs))
+            inv, tree, dists_map = index_lake(lake, selector, grid)
+
+            for tau_ratio in (0.06, 0.15):
+                cfg.tau_ratio = tau_ratio
+                queries = [lake[k][:100] for k in list(lake)[:10]]
+                n_leaf = n_flat = n_tree = 0
+                t_flat = t_tree = 0.0
+                same = True
+                for q_vecs in queries:
+                    q_dists = selector.transform(q_vecs)
+                    n_leaf += len(np.unique(grid.transform_codes(q_dists)[:, -1]))
+
+                    flat = Blocker(cfg, grid)
+                    t0 = time.perf_counter()
+                    post = flat.range_query(q_dists, inv)
+                    res_flat = flat.block(q_vecs, post, lake, q_dists, dists_map)
+                    t_flat += time.perf_counter() - t0
+                    n_flat += flat.stats.cells_visited
+
+                    treed = Blocker(cfg, grid, tree)
+                    t0 = time.perf_counter()
+                    post = treed.range_query(q_dists, inv)
+                    res_tree = treed.block(q_vecs, post, lake, q_dists, dists_map)
+                    t_tree += time.perf_counter() - t0
+                    n_tree += treed.stats.cells_visited
+
+                    same &= res_flat == res_tree
+
+                nq = len(queries)
+                print(f"{len(all_vecs):>10} {levels:>6} {cfg.tau_ratio * 2:>5.2f} {n_leaf / nq:>6.0f} "
+                      f"{n_flat / nq:>7.0f} {n_tree / nq:>7.0f} {t_flat / nq:>8.4f} {t_tree / nq:>8.4f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Bytes read and time spent reading, normalizing and picking key columns of
+a wide CSV with CSVFolderAdapter settings:
+
+- full: parse every column, normalize all of them, then detect key columns
+- sniff: pick key columns on the first SNIFF_ROWS rows, parse only those
+- sniff+cap: as sniff, reading at most MAX_ROWS rows
+
+The file has KEY_COLUMNS text columns and SPARSE_COLUMNS numeric columns
+that are over 90% empty (rejected by detect_key_columns). Full and sniff
+must index the same key columns with the same values.
+
+Run from the repository root:
+    python -m benchmarks.bench_ingest
+"""
+from __future__ import annotations
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.adapters import CSVFolderAdapter
+from data.preprocess import normalize_column
+
+ROWS = 200_000
+KEY_COLUMNS = 4
+SPARSE_COLUMNS = 60
+SNIFF_ROWS = 2000
+MAX_ROWS = 20_000
+
+
+def write_wide_csv(path: str, rng: np.random.Generator):
+    words = np.array([f"Value {i}, item-{i % 97}" for i in range(20_000)], dtype=object)
+    data = {f"key{j}": words[rng.integers(0, len(words), ROWS)] for j in range(KEY_COLUMNS)}
+    for j in range(SPARSE_COLUMNS):
+        col = np.full(ROWS, np.nan)
+        filled = rng.random(ROWS) < 0.03
+        col[filled] = rng.standard_normal(int(filled.sum()))
+        data[f"reading{j}"] = col
+    pd.DataFrame(data).to_csv(path, index=False)
+
+
+def ingest(adapter: CSVFolderAdapter, fname: str):
+    """Load, normalize and pick key columns like offline._embed_table; returns (key column -> values, seconds)."""
+    t0 = time.perf_counter()
+    df = adapter.load_table(fname)
+    for c in df.columns:
+        df[c] = normalize_column(df[c])
+    keys = {cid.name: df[cid.name].tolist() for cid in adapter.detect_key_columns(df)}
+    return keys, time.perf_counter() - t0
+
+
+def main():
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        write_wide_csv(os.path.join(tmp, "wide.csv"), rng)
+        size_mb = os.path.getsize(os.path.join(tmp, "wide.csv")) / (1024 * 1024)
+        print(f"wide.csv: {ROWS} rows, {KEY_COLUMNS} key + {SPARSE_COLUMNS} sparse columns, {size_mb:.1f} MB")
+        print(f"{'adapter':>10} {'total s':>8}  load")
+        baseline = None
+        for name, kwargs in [("full", {}), ("sniff", {"sniff_rows": SNIFF_ROWS}),
+                             ("sniff+cap", {"sniff_rows": SNIFF_ROWS, "max_rows": MAX_ROWS})]:
+            adapter = CSVFolderAdapter(tmp, **kwargs)
+            keys, elapsed = ingest(adapter, "wide.csv")
+            if baseline is None:
+                baseline = keys
+            same = keys == baseline if "max_rows" not in kwargs else all(
+                keys[c] == baseline[c][:MAX_ROWS] for c in baseline) and keys.keys() == baseline.keys()
+            print(f"{name:>10} {elapsed:>8.2f}  {adapter.last_load}; key columns: {len(keys)}, "
+                  f"same values: {same}")
+
+
+if __name__ == "__main__":
+    main()
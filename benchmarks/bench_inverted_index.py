@@ -0,0 +1,68 @@
+"""
+Memory and build-time comparison of inverted index layouts.
+
+- dict: the original defaultdict(list) of (TableId, ColumnId, row_id) tuples
+- csr:  InvertedIndex (sorted cell codes + offsets + int32 col/row arrays)
+
+Run from the repository root:
+    python -m benchmarks.bench_inverted_index [n_postings ...]
+e.g. python -m benchmarks.bench_inverted_index 1000000 10000000
+"""
+from __future__ import annotations
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+from index.inverted_index import InvertedIndex
+from utils.types import TableId, ColumnId
+
+ROWS_PER_COLUMN = 10_000
+N_CELLS = 5_000
+
+
+def build_dict(columns):
+    index = defaultdict(list)
+    for table, column, cells in columns:
+        for row_id, cell in enumerate(cells.tolist()):
+            index[cell].append((table, column, row_id))
+    return index
+
+
+def build_csr(columns):
+    inv = InvertedIndex()
+    for table, column, cells in columns:
+        inv.add(cells, table, column)
+    inv.cells  # force compaction
+    return inv
+
+
+def measure(builder, columns):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    index = builder(columns)
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del index
+    return elapsed, current, peak
+
+
+def main(sizes):
+    rng = np.random.default_rng(42)
+    mb = 1024 * 1024
+    print(f"{'postings':>10} {'layout':>6} {'build s':>8} {'resident MB':>12} {'peak MB':>8}")
+    for n in sizes:
+        columns = [
+            (TableId(f"t{c}.csv"), ColumnId("value"), rng.integers(0, N_CELLS, ROWS_PER_COLUMN))
+            for c in range(max(1, n // ROWS_PER_COLUMN))
+        ]
+        for name, builder in (("dict", build_dict), ("csr", build_csr)):
+            elapsed, current, peak = measure(builder, columns)
+            print(f"{n:>10} {name:>6} {elapsed:>8.2f} {current / mb:>12.1f} {peak / mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000_000])
@@ -0,0 +1,46 @@
+"""
+Throughput of the vectorized column normalization.
+
+Values/second of normalize_column and of the original per-value loop
+(benchmarks.workloads.reference_normalize_column) on columns with few
+and with many distinct values. That both return the same values on random columns
+of every kind is checked by tests/test_preprocess.py.
+
+Run from the repository root:
+    python -m benchmarks.bench_normalize
+"""
+from __future__ import annotations
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.workloads import random_strings, reference_normalize_column
+from data.preprocess import normalize_column
+
+THROUGHPUT_ROWS = 200_000
+
+
+def main():
+    rng = np.random.default_rng(42)
+    words = np.array(random_strings(rng, 50_000), dtype=object)
+    columns = {
+        "text, 1k distinct": pd.Series(words[rng.integers(0, 1000, THROUGHPUT_ROWS)], dtype="str"),
+        "text, 50k distinct": pd.Series(words[rng.integers(0, len(words), THROUGHPUT_ROWS)], dtype="str"),
+        "float": pd.Series(rng.standard_normal(THROUGHPUT_ROWS)),
+        "int": pd.Series(rng.integers(0, 10**9, THROUGHPUT_ROWS)),
+        "datetime": pd.Series(pd.to_datetime(rng.integers(0, 2 * 10**18, THROUGHPUT_ROWS))),
+    }
+    print(f"{'column':>20} {'loop values/s':>14} {'vectorized values/s':>20} {'speedup':>8}")
+    for name, series in columns.items():
+        t0 = time.perf_counter()
+        reference_normalize_column(series)
+        loop_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        normalize_column(series)
+        vec_s = time.perf_counter() - t0
+        print(f"{name:>20} {len(series) / loop_s:>14,.0f} {len(series) / vec_s:>20,.0f} {loop_s / vec_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
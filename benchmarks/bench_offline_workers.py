@@ -0,0 +1,87 @@
+"""
+Scaling of the parallel offline build with --workers.
+
+Builds the same synthetic CSV lake with 1, 4 and 16 worker processes,
+using a CPU-bound hashed character-trigram model in place of FastText,
+and checks that the written index is byte-identical for every worker count.
+
+Run from the repository root:
+    python -m benchmarks.bench_offline_workers
+"""
+from __future__ import annotations
+import contextlib
+import hashlib
+import io
+import os
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from embedding.embedder import EmbeddingModel
+from index.storage import INDEX_DIRNAME, resolve_index
+from offline import run_offline
+from utils.config import Config
+
+N_TABLES = 64
+N_ROWS = 400
+
+
+class TrigramModel(EmbeddingModel):
+    """Deterministic bag of hashed character trigrams."""
+
+    def __init__(self, dim: int = 300):
+        self.dim = dim
+        self.model_id = f"bench-trigram:{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vecs = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            t = f"<{t}>"
+            for j in range(len(t) - 2):
+                h = hashlib.md5(t[j:j + 3].encode("utf-8")).digest()
+                seed = int.from_bytes(h[:4], "little")
+                vecs[i] += np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return vecs / (np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12)
+
+
+def make_lake(folder: str, rng: np.random.Generator):
+    syllables = ["ka", "lo", "mi", "ra", "ten", "vor", "su", "pel", "dri", "an"]
+    for t in range(N_TABLES):
+        words = ["".join(rng.choice(syllables, size=rng.integers(2, 5))) for _ in range(N_ROWS)]
+        pd.DataFrame({
+            "name": words,
+            "code": [f"{w}-{rng.integers(0, 100)}" for w in words],
+            "value": rng.integers(0, 10_000, size=N_ROWS),
+        }).to_csv(os.path.join(folder, f"table_{t:03d}.csv"), index=False)
+
+
+def main():
+    rng = np.random.default_rng(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        lake = os.path.join(tmp, "lake")
+        os.makedirs(lake)
+        make_lake(lake, rng)
+
+        reference = None
+        print(f"{'workers':>7} {'build s':>8} {'speedup':>8}  identical")
+        base = None
+        for workers in (1, 4, 16):
+            out = os.path.join(tmp, f"out_{workers}")
+            cfg = Config(workers=workers, embedding_cache=False)
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                run_offline(lake, out, cfg, model=TrigramModel())
+            elapsed = time.perf_counter() - t0
+            base = base or elapsed
+
+            with open(os.path.join(resolve_index(os.path.join(out, INDEX_DIRNAME)), "embeddings.bin"), "rb") as f:
+                data = f.read()
+            reference = reference or data
+            print(f"{workers:>7} {elapsed:>8.2f} {base / elapsed:>7.1f}x  {data == reference}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Memory and throughput of PivotSelector.transform.
+
+Compares the chunked float32 matrix-product transform with the former
+broadcast ||v - p|| over an (n, k, d) temporary, on random unit vectors,
+by peak traced memory (tracemalloc), rows per second (best of REPEATS)
+and the largest deviation from float64 distances. The broadcast is only
+run up to BROADCAST_MAX_ROWS rows; beyond that its temporary alone
+takes gigabytes.
+
+Run from the repository root:
+    python -m benchmarks.bench_pivot_transform
+"""
+from __future__ import annotations
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.workloads import unit
+from index.pivots import PivotSelector
+from utils.config import Config
+from utils.types import GREEN, RED, RESET
+
+DIM = 300
+ROWS = (10_000, 100_000, 1_000_000)
+BROADCAST_MAX_ROWS = 100_000
+REPEATS = 3
+# largest accepted deviation from float64 distances (unit vectors, distances up to 2)
+MAX_ERROR = 1e-5
+
+
+def broadcast_transform(pivots: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """The transform before the matrix product: an (n, k, d) difference tensor."""
+    return np.linalg.norm(vectors[:, None, :] - pivots[None, :, :], axis=2)
+
+
+def measure(fn, vectors: np.ndarray):
+    """(peak traced MB, rows per second, result) of fn(vectors)."""
+    tracemalloc.start()
+    result = fn(vectors)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    runs = []
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn(vectors)
+        runs.append(time.perf_counter() - t0)
+    return peak / (1024 * 1024), len(vectors) / min(runs), result
+
+
+def main():
+    cfg = Config()
+    rng = np.random.default_rng(cfg.seed)
+    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+    selector.fit(unit(rng.standard_normal((5_000, DIM))))
+    pivots64 = selector.pivots.astype(np.float64)
+
+    print(f"d = {DIM}, k = {cfg.pivots_k}; input is {DIM * 4} bytes per row")
+    print(f"{'rows':>9} {'method':>9} {'peak MB':>9} {'rows/s':>12} {'max err':>9}")
+    ok = True
+    for n in ROWS:
+        vectors = np.vstack([unit(rng.standard_normal((min(10_000, n - s), DIM))) for s in range(0, n, 10_000)])
+        exact = np.vstack([np.linalg.norm(vectors[s:s + 10_000, None, :].astype(np.float64) - pivots64[None],
+                                          axis=2) for s in range(0, n, 10_000)])
+        methods = [("matmul", selector.transform)]
+        if n <= BROADCAST_MAX_ROWS:
+            methods.append(("broadcast", lambda v: broadcast_transform(selector.pivots, v)))
+        for name, fn in methods:
+            peak, rate, result = measure(fn, vectors)
+            err = float(np.abs(result - exact).max())
+            ok = ok and err <= MAX_ERROR
+            print(f"{n:>9} {name:>9} {peak:>9.1f} {rate:>12,.0f} {err:>9.1e}")
+        # the out= buffer avoids the result allocation too
+        out = np.empty((n, cfg.pivots_k), dtype=np.float32)
+        peak, rate, _ = measure(lambda v: selector.transform(v, out=out), vectors)
+        print(f"{n:>9} {'out=':>9} {peak:>9.1f} {rate:>12,.0f}")
+    print(f"{GREEN}All within {MAX_ERROR:g} of float64{RESET}" if ok else f"{RED}Deviation above {MAX_ERROR:g}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
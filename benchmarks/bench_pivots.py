@@ -0,0 +1,46 @@
+"""
+Pruning power of the pivot strategies on synthetic lakes.
+
+Runs index.pivots.evaluate_pivots (pivots fitted on half a sample, random
+pairs of the other half) on
+- clustered: unit vectors near a low-dimensional subspace (bench_grid_tree)
+- uniform: unit vectors spread over the whole sphere
+
+For an existing index use `python -m index.pivots <index_dir>` instead.
+
+Run from the repository root:
+    python -m benchmarks.bench_pivots
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from benchmarks.bench_grid_tree import DIM, LATENT, make_lake
+from benchmarks.workloads import unit
+from index.pivots import evaluate_pivots
+from utils.config import Config
+
+SAMPLE = 20_000
+
+
+def main():
+    cfg = Config()
+    rng = np.random.default_rng(cfg.seed)
+    basis = rng.standard_normal((LATENT, DIM))
+    lakes = {
+        "clustered": np.vstack(list(make_lake(SAMPLE // 250, 250, rng, basis).values())),
+        "uniform": unit(rng.standard_normal((SAMPLE, DIM))),
+    }
+    for tau_ratio in (0.06, 0.15):
+        tau = tau_ratio * 2.0
+        for name, sample in lakes.items():
+            rows = evaluate_pivots(sample, tau, seed=cfg.seed)
+            print(f"\n{name}, tau = {tau:.2f}: pairs farther than tau {rows[0]['prunable']:.3f}")
+            print(f"{'strategy':>15} " + " ".join(f"{'k=' + str(k):>6}" for k in sorted({r['k'] for r in rows})))
+            for strategy in dict.fromkeys(r["strategy"] for r in rows):
+                pruned = [r["pruned"] for r in rows if r["strategy"] == strategy]
+                print(f"{strategy:>15} " + " ".join(f"{p:>6.3f}" for p in pruned))
+
+
+if __name__ == "__main__":
+    main()
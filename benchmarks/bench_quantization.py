@@ -0,0 +1,175 @@
+"""
+Index size, query working set, throughput and results of reduced-precision
+and quantized embedding storage.
+
+Writes the same synthetic lake (query values copied into candidate
+columns at distances spread around τ, padded with unrelated vectors) as
+index directories with float32 and float16 embeddings, and with sq8 and
+pq codes next to them, and queries each variant in a fresh process.
+
+The working set is what the queries read of the embedding data: every
+scanned candidate row (its vector, or its code and error bound) plus,
+with codes, the stored vectors of re-ranked rows. That is the part of
+online RSS that grows with the lake; the resident size of the memory
+maps themselves also depends on kernel readahead and page cache folio
+sizes. Matched counts are compared with the float32 index.
+
+Run from the repository root:
+    python -m benchmarks.bench_quantization
+"""
+from __future__ import annotations
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.workloads import unit
+from index.grid import HierarchicalGrid
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex
+from index.pivots import PivotSelector
+from index.quantization import make_quantizer
+from index.storage import IndexReader, resolve_index, write_index
+from search.blocking import Blocker, QueryGroups
+from utils.config import Config
+from utils.types import TableId, ColumnId, GREEN, YELLOW, RESET
+
+DIM = 300
+N_COLUMNS = 40
+COLUMN_ROWS = 4000
+N_QUERIES = 10
+QUERY_ROWS = 500
+# (dtype, codes) per variant
+VARIANTS = [("float32", "none"), ("float16", "none"), ("float32", "sq8"), ("float32", "pq"), ("float16", "pq")]
+
+
+def make_lake(pool: np.ndarray, rng: np.random.Generator):
+    """Columns holding noisy copies of pool values, at distances spread around τ = 0.12."""
+    lake = {}
+    for c in range(N_COLUMNS):
+        n_near = int(rng.integers(0, COLUMN_ROWS // 2))
+        src = rng.integers(0, len(pool), n_near)
+        sigma = rng.uniform(0.001, 0.009, n_near)[:, None]  # distances ~0.02 .. 0.16
+        near = unit(pool[src] + sigma * rng.standard_normal((n_near, DIM)))
+        far = unit(rng.standard_normal((COLUMN_ROWS - n_near, DIM)))
+        lake[(f"t{c}.csv", "value")] = np.vstack([near, far])[rng.permutation(COLUMN_ROWS)]
+    return lake
+
+
+class _RowsRead:
+    """Stored vectors of one column, recording which rows are read."""
+
+    def __init__(self, vecs: np.ndarray):
+        self.vecs = vecs
+        self.read = np.zeros(len(vecs), dtype=bool)
+
+    def __getitem__(self, rows):
+        self.read[rows] = True
+        return self.vecs[rows]
+
+
+def run_queries(path: str, codes: str, queries: list, out: mp.Queue):
+    """Query one index directory; runs in its own process."""
+    cfg = Config(verify_early_stop="none")
+    reader = IndexReader(path)
+    selector, grid, tree, inv = reader.selector(), reader.grid(), reader.grid_tree(), reader.inverted_index()
+    vecs_map = reader.cand_codes_map(codes) if codes != "none" else reader.cand_vecs_map()
+    dists_map = reader.cand_dists_map()
+    scanned = {key: np.zeros(len(v), dtype=bool) for key, v in vecs_map.items()}
+    if codes != "none":
+        for column in vecs_map.values():
+            column.exact = _RowsRead(column.exact)
+
+    counts, reranked, verified = [], 0, 0
+    t0 = time.perf_counter()
+    for q_vecs in queries:
+        q_dists = selector.transform(q_vecs)
+        blocker = Blocker(cfg, grid, tree)
+        postings = blocker.range_query(q_dists, inv)
+        counts.append(blocker.block_batch(
+            q_vecs, QueryGroups.from_offsets([0, len(q_vecs)]), postings, vecs_map, q_dists, dists_map,
+        )[0])
+        reranked += blocker.stats.pairs_reranked
+        verified += blocker.stats.pairs_verified
+        for (t, c), (rows, _) in blocker._group_postings(postings, vecs_map).items():
+            scanned[(t.name, c.name)][rows] = True
+    elapsed = time.perf_counter() - t0
+
+    n_scanned = sum(int(s.sum()) for s in scanned.values())
+    if codes == "none":
+        row_bytes = next(iter(vecs_map.values())).itemsize * reader.array("embeddings").shape[1]
+        working = n_scanned * row_bytes
+    else:
+        row_bytes = reader.array("codes").shape[1] + 4
+        vec_bytes = reader.array("embeddings").itemsize * reader.array("embeddings").shape[1]
+        working = n_scanned * row_bytes + sum(int(v.exact.read.sum()) for v in vecs_map.values()) * vec_bytes
+    out.put((counts, elapsed, working / (1024 * 1024), verified, reranked))
+
+
+def _size_mb(path: str, names) -> float:
+    live = resolve_index(path)
+    return sum(os.path.getsize(os.path.join(live, f"{n}.bin")) for n in names
+               if os.path.exists(os.path.join(live, f"{n}.bin"))) / (1024 * 1024)
+
+
+def main():
+    cfg = Config()
+    rng = np.random.default_rng(cfg.seed)
+    pool = unit(rng.standard_normal((N_QUERIES * QUERY_ROWS, DIM)))
+    lake = make_lake(pool, rng)
+    queries = [pool[i * QUERY_ROWS:(i + 1) * QUERY_ROWS] for i in range(N_QUERIES)]
+    all_vecs = np.vstack(list(lake.values()))
+    sample = all_vecs[rng.choice(len(all_vecs), min(len(all_vecs), cfg.pivot_sample_size), replace=False)]
+
+    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+    pivots = selector.fit(sample)
+    col_dists = {i: selector.transform(v).astype(np.float32) for i, v in enumerate(lake.values())}
+    grid = HierarchicalGrid(levels=cfg.grid_levels)
+    grid.fit(np.vstack(list(col_dists.values())))
+    inv, tree = InvertedIndex(), GridTree(grid.levels)
+    col_meta, col_embeddings = {}, {}
+    for i, ((t, c), vecs) in enumerate(lake.items()):
+        codes = grid.transform_codes(col_dists[i])
+        inv.add(codes[:, -1], TableId(t), ColumnId(c))
+        tree.add(codes, col_dists[i])
+        col_meta[i], col_embeddings[i] = {"table": t, "column": c}, vecs
+    tree.finalize()
+
+    ctx = mp.get_context("spawn")
+    print(f"lake: {len(all_vecs)} vectors; {N_QUERIES} queries of {QUERY_ROWS} vectors, tau = {cfg.tau_ratio * 2}")
+    print(f"{'storage':>13} {'vectors MB':>10} {'codes MB':>9} {'fit s':>6} {'read MB':>8} "
+          f"{'queries/s':>9} {'distances':>10} {'re-ranked':>9}  results vs float32")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype, kind in VARIANTS:
+            path = os.path.join(tmp, f"{dtype}_{kind}")
+            t0 = time.perf_counter()
+            quantizer = make_quantizer(kind, cfg.pq_subspaces, cfg.seed)
+            if quantizer is not None:
+                quantizer.fit(sample)
+            fit_s = time.perf_counter() - t0
+            write_index(path, pivots, grid, tree, inv, col_meta, col_embeddings, col_dists, dtype,
+                        quantizer=quantizer)
+
+            out = ctx.Queue()
+            proc = ctx.Process(target=run_queries, args=(path, kind, queries, out))
+            proc.start()
+            counts, elapsed, rss, verified, reranked = out.get()
+            proc.join()
+
+            if baseline is None:
+                baseline = counts
+            changed = sum(
+                a.get(key, 0) != b.get(key, 0)
+                for a, b in zip(counts, baseline) for key in set(a) | set(b)
+            )
+            flag = f"{GREEN}same{RESET}" if changed == 0 else f"{YELLOW}{changed} counts differ{RESET}"
+            print(f"{dtype + '/' + kind:>13} {_size_mb(path, ['embeddings']):>10.1f} "
+                  f"{_size_mb(path, ['codes', 'code_errors']):>9.1f} {fit_s:>6.1f} {rss:>8.1f} "
+                  f"{N_QUERIES / elapsed:>9.2f} {verified:>10} {reranked:>9}  {flag}")
+
+
+if __name__ == "__main__":
+    main()
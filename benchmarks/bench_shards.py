@@ -0,0 +1,120 @@
+"""
+Build time and query latency of a sharded index by shard count.
+
+Builds one synthetic lake (benchmarks.synthetic_lake, HashingEmbedder)
+with 1, 2, 4 and 8 shards. Shard 0 is built first; the other shards are
+then built at the same time, one process each, as they would be on
+separate hosts. Every query column is answered with shards searched on
+threads and in worker processes, and the joinable columns must equal
+those of the unsharded index.
+
+Parallel speedups need as many cores as shards; on fewer cores the
+numbers show the scatter-gather overhead instead.
+
+Run from the repository root:
+    python -m benchmarks.bench_shards [--tables 64] [--rows 1000]
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, replace
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_lake import LakeSpec, add_spec_arguments, generate_lake
+from embedding.embedder import HashingEmbedder
+from offline import run_offline
+from search.engine import QueryEngine
+from search.shards import ShardedQueryEngine
+from utils.config import Config
+from utils.types import GREEN, RED, RESET
+
+SHARD_COUNTS = (1, 2, 4, 8)
+REPEATS = 3
+
+
+def _build(lake_dir: str, out_dir: str, cfg: Config) -> float:
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_offline(lake_dir, out_dir, cfg, HashingEmbedder())
+    return time.perf_counter() - t0
+
+
+def build_sharded(lake_dir: str, out_dir: str, cfg: Config, shards: int):
+    """(seconds for shard 0, wall seconds for the others built in parallel, sum of all shard builds)."""
+    if shards == 1:
+        t = _build(lake_dir, out_dir, cfg)
+        return t, 0.0, t
+    cfg = replace(cfg, shards=shards)
+    first = _build(lake_dir, out_dir, replace(cfg, shard=0))
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=shards - 1) as pool:
+        rest = list(pool.map(_build, [lake_dir] * (shards - 1), [out_dir] * (shards - 1),
+                             [replace(cfg, shard=i) for i in range(1, shards)]))
+    return first, time.perf_counter() - t0, first + sum(rest)
+
+
+def run_queries(engine: QueryEngine, queries):
+    """(per query column best-of-REPEATS latencies, joinable (query, table, column, matches) set)."""
+    latencies, found = [], set()
+    for qf, qcol, values in queries:
+        runs = []
+        for _ in range(REPEATS):
+            t0 = time.perf_counter()
+            results, _ = engine.query_column(qf, qcol, values)
+            runs.append(time.perf_counter() - t0)
+        latencies.append(min(runs))
+        found |= {(qf, qcol, r.candidate_table.name, r.candidate_column.name, r.matches)
+                  for r in results if r.is_joinable}
+    return latencies, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded index build and query scaling.")
+    add_spec_arguments(parser)
+    parser.set_defaults(tables=64, rows=1000, cardinality=400, queries=8, query_rows=500,
+                        query_cardinality=300, planted=40)
+    args = parser.parse_args()
+    spec = LakeSpec(**{k: getattr(args, k) for k in asdict(LakeSpec())})
+    cfg = Config(embedding_model="hashing", embedding_cache=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate_lake(tmp, spec)
+        lake_dir, query_dir = os.path.join(tmp, "lake"), os.path.join(tmp, "queries")
+        queries = []
+        for qf in sorted(os.listdir(query_dir)):
+            df = pd.read_csv(os.path.join(query_dir, qf))
+            queries += [(qf, c, df[c]) for c in df.columns]
+        print(f"lake: {spec.tables} tables x {spec.columns} columns x {spec.rows} rows; "
+              f"{len(queries)} query columns; {os.cpu_count()} CPUs")
+        print(f"{'shards':>6} {'build 0 s':>9} {'others s':>8} {'total s':>8} {'sum s':>7} "
+              f"{'thread p50 ms':>13} {'process p50 ms':>14}  same results")
+
+        expected = None
+        for shards in SHARD_COUNTS:
+            out_dir = os.path.join(tmp, f"out{shards}")
+            first, rest, total = build_sharded(lake_dir, out_dir, cfg, shards)
+            row = f"{shards:>6} {first:>9.2f} {rest:>8.2f} {first + rest:>8.2f} {total:>7.2f}"
+            same = True
+            for mode in ("thread", "process"):
+                if shards == 1:
+                    engine = QueryEngine(out_dir, cfg, HashingEmbedder())
+                else:
+                    engine = ShardedQueryEngine(out_dir, replace(cfg, shard_mode=mode), HashingEmbedder())
+                latencies, found = run_queries(engine, queries)
+                if shards > 1:
+                    engine.close()
+                expected = found if expected is None else expected
+                same = same and found == expected
+                row += f" {1000 * np.percentile(latencies, 50):>{13 if mode == 'thread' else 14}.1f}"
+            print(row + f"  {GREEN + 'yes' if same else RED + 'NO'}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
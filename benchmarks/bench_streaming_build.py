@@ -0,0 +1,84 @@
+"""
+Peak memory of the in-memory vs the streaming offline build.
+
+Builds the same synthetic CSV lake both ways with a cheap hashed-value
+model and reports build time and traced peak memory (numpy allocations
+included). The streaming build should stay near its budget as the lake
+grows, while the in-memory build grows with ~2x the lake's embeddings.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming_build [n_tables ...]
+"""
+from __future__ import annotations
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from embedding.embedder import EmbeddingModel
+from offline import run_offline
+from utils.config import Config
+
+N_ROWS = 2_000
+BUDGET_MB = 64
+
+
+class HashModel(EmbeddingModel):
+    """One pseudo-random unit vector per distinct value."""
+
+    def __init__(self, dim: int = 300):
+        self.dim = dim
+        self.model_id = f"bench-hash:{dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vecs = np.stack([
+            np.random.default_rng(zlib.crc32(t.encode("utf-8"))).standard_normal(self.dim)
+            for t in texts
+        ]).astype(np.float32)
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def make_lake(folder: str, n_tables: int, rng: np.random.Generator):
+    for t in range(n_tables):
+        pd.DataFrame({
+            "name": [f"v{x}" for x in rng.integers(0, 50_000, N_ROWS)],
+            "value": rng.integers(0, 10_000, N_ROWS),
+        }).to_csv(os.path.join(folder, f"table_{t:04d}.csv"), index=False)
+
+
+def measure(lake: str, out: str, cfg: Config):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_offline(lake, out, cfg, model=HashModel())
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(sizes):
+    rng = np.random.default_rng(42)
+    mb = 1024 * 1024
+    print(f"{'tables':>6} {'rows':>8} {'mode':>10} {'build s':>8} {'peak MB':>8}")
+    for n_tables in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            lake = os.path.join(tmp, "lake")
+            os.makedirs(lake)
+            make_lake(lake, n_tables, rng)
+            for name, streaming in (("in-memory", False), ("streaming", True)):
+                cfg = Config(embedding_cache=False, streaming_build=streaming, memory_budget_mb=BUDGET_MB)
+                elapsed, peak = measure(lake, os.path.join(tmp, name), cfg)
+                print(f"{n_tables:>6} {n_tables * N_ROWS:>8} {name:>10} {elapsed:>8.2f} {peak / mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [20, 80])
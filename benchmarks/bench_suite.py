@@ -0,0 +1,178 @@
+"""
+End-to-end benchmark on a synthetic lake, runnable anywhere.
+
+Generates a lake with planted joinable pairs (benchmarks.synthetic_lake),
+builds the index and answers every query column with the offline
+stand-in embedder (HashingEmbedder, no download), and reports
+- build time and index size
+- query latency (per query column, best of REPEATS runs, p50/p95)
+- precision and recall of the joinable (query column, lake column) pairs
+  against a brute-force scan of the indexed vectors, and the share of
+  planted pairs at or above T_ratio that were found
+
+Results can be saved and compared with an earlier run (e.g. from another
+version) to spot regressions:
+
+    python -m benchmarks.bench_suite --save base.json
+    python -m benchmarks.bench_suite --compare base.json
+
+Run from the repository root; lake shape options as in
+benchmarks.synthetic_lake (--tables, --rows, --cardinality, --planted, ...).
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_lake import LakeSpec, add_spec_arguments, generate_lake
+from data.preprocess import normalize_column
+from embedding.embedder import HashingEmbedder
+from index.storage import INDEX_DIRNAME, IndexReader, resolve_index
+from offline import run_offline
+from search.engine import QueryEngine
+from utils.config import Config
+from utils.types import GREEN, RED, YELLOW, RESET
+
+# metric -> +1 if higher is better, -1 if lower is better
+METRICS = {
+    "build_s": -1, "index_mb": -1, "query_p50_ms": -1, "query_p95_ms": -1,
+    "precision": 1, "recall": 1, "planted_recall": 1,
+}
+# relative change flagged as a regression
+TOLERANCE = 0.10
+# each query column is timed this often, the fastest run counts
+REPEATS = 3
+
+
+def brute_force(q_vecs: np.ndarray, weights: np.ndarray, cand_vecs_map: dict, tau: float) -> dict:
+    """(table, column) -> joinability, every indexed column scanned exhaustively."""
+    q_sq = np.einsum("ij,ij->i", q_vecs, q_vecs)
+    scores = {}
+    for key, vecs in cand_vecs_map.items():
+        vecs = np.asarray(vecs, dtype=np.float32)
+        d_sq = q_sq[:, None] + np.einsum("ij,ij->i", vecs, vecs)[None, :] - 2.0 * q_vecs @ vecs.T
+        matched = d_sq.min(axis=1) <= tau * tau + 1e-6
+        if matched.any():
+            scores[key] = float(weights[matched].sum() / weights.sum())
+    return scores
+
+
+def _index_mb(index_dir: str) -> float:
+    live = resolve_index(index_dir)
+    return sum(os.path.getsize(os.path.join(live, f)) for f in os.listdir(live)) / (1024 * 1024)
+
+
+def run_suite(spec: LakeSpec, cfg: Config, work_dir: str) -> dict:
+    truth = generate_lake(work_dir, spec)
+    out_dir = os.path.join(work_dir, "out")
+    model = HashingEmbedder()
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_offline(os.path.join(work_dir, "lake"), out_dir, cfg, model)
+    build_s = time.perf_counter() - t0
+
+    engine = QueryEngine(out_dir, cfg, model)
+    reader = IndexReader(os.path.join(out_dir, INDEX_DIRNAME))
+    cand_vecs_map = reader.cand_vecs_map()
+    tau = cfg.tau_ratio * 2.0
+    latencies, found, expected = [], set(), set()
+    query_dir = os.path.join(work_dir, "queries")
+    for qf in sorted(os.listdir(query_dir)):
+        df = pd.read_csv(os.path.join(query_dir, qf))
+        for qcol in df.columns:
+            runs = []
+            for _ in range(REPEATS):
+                t0 = time.perf_counter()
+                results, _ = engine.query_column(qf, qcol, df[qcol])
+                runs.append(time.perf_counter() - t0)
+            latencies.append(min(runs))
+            found |= {(qf, qcol, r.candidate_table.name, r.candidate_column.name) for r in results if r.is_joinable}
+
+            distinct, inverse = normalize_column(df[qcol], return_inverse=True)
+            weights = np.bincount(inverse, minlength=len(distinct)).astype(np.float64)
+            scores = brute_force(model.embed(distinct), weights, cand_vecs_map, tau)
+            expected |= {(qf, qcol, t, c) for (t, c), s in scores.items() if s >= cfg.T_ratio - 1e-9}
+
+    planted = {(p["query"], p["query_column"], p["table"], p["column"])
+               for p in truth["planted"] if p["joinability"] >= cfg.T_ratio}
+    hits = len(found & expected)
+    return {
+        "build_s": build_s,
+        "index_mb": _index_mb(os.path.join(out_dir, INDEX_DIRNAME)),
+        "query_p50_ms": 1000 * float(np.percentile(latencies, 50)),
+        "query_p95_ms": 1000 * float(np.percentile(latencies, 95)),
+        "precision": hits / len(found) if found else 1.0,
+        "recall": hits / len(expected) if expected else 1.0,
+        "planted_recall": len(found & planted) / len(planted) if planted else 1.0,
+        "joinable_found": len(found),
+        "joinable_expected": len(expected),
+        "planted_joinable": len(planted),
+    }
+
+
+def _revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict):
+    """Print every metric next to the baseline; relative changes beyond TOLERANCE in the wrong direction in red."""
+    print(f"\n{'metric':>15} {'baseline':>10} {'current':>10} {'change':>8}  (baseline: {baseline.get('revision')})")
+    for name, direction in METRICS.items():
+        old, new = baseline["results"].get(name), current["results"][name]
+        if old is None:
+            continue
+        change = (new - old) / abs(old) if old else 0.0
+        color = RED if direction * change < -TOLERANCE else (GREEN if direction * change > TOLERANCE else "")
+        print(f"{name:>15} {old:>10.3f} {new:>10.3f} {color}{100 * change:>+7.1f}%{RESET if color else ''}")
+    if current["spec"] != baseline.get("spec"):
+        print(f"{YELLOW}Lake specs differ; the comparison is not like for like.{RESET}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark on a synthetic lake.")
+    add_spec_arguments(parser)
+    parser.add_argument("--save", default=None, help="write results to this JSON file")
+    parser.add_argument("--compare", default=None, help="compare with results saved by an earlier run")
+    parser.add_argument("--keep", default=None, help="keep the lake and index in this directory")
+    args = parser.parse_args()
+
+    spec = LakeSpec(**{k: getattr(args, k) for k in asdict(LakeSpec())})
+    cfg = Config(embedding_model="hashing", embedding_cache=False)
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        results = run_suite(spec, cfg, args.keep)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = run_suite(spec, cfg, tmp)
+
+    print(f"lake: {spec.tables} tables x {spec.columns} columns x {spec.rows} rows, "
+          f"{spec.queries} queries, {spec.planted} planted pairs")
+    for name, value in results.items():
+        print(f"{name:>18}: {value:.3f}" if isinstance(value, float) else f"{name:>18}: {value}")
+
+    record = {"revision": _revision(), "spec": asdict(spec), "results": results}
+    if args.compare:
+        with open(args.compare) as f:
+            compare(record, json.load(f))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(record, f, indent=1)
+        print(f"{GREEN}Saved results to {args.save}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
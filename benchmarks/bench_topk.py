@@ -0,0 +1,94 @@
+"""
+Top-k search versus scoring every candidate column.
+
+- full: Blocker.block with early stopping off: every candidate column
+  reached by the range query is scored exactly
+- top-k: TopKSearcher, scanning columns in decreasing upper-bound order,
+  skipping those whose bound cannot beat the k-th best and abandoning a
+  scan once the column can no longer make the cut
+
+Query columns mix rows of a handful of lake columns in decreasing shares,
+(shuffled) so a few candidates are clearly best and many match a little. Both modes
+must agree on the top-k scores (reference: TopKSearcher with k = all
+columns, so nothing is skipped or abandoned); the work saved is reported
+in exact distances computed and time.
+
+Run from the repository root:
+    python -m benchmarks.bench_topk
+"""
+from __future__ import annotations
+import time
+
+import numpy as np
+
+from benchmarks.bench_grid_tree import DIM, LATENT, make_lake
+from benchmarks.workloads import index_lake
+from index.pivots import PivotSelector
+from index.grid import HierarchicalGrid
+from search.blocking import Blocker
+from search.topk import TopKSearcher
+from utils.config import Config
+from utils.types import GREEN, RED, RESET
+
+QUERY_ROWS = 400
+SHARES = (0.35, 0.25, 0.15, 0.1, 0.05, 0.04, 0.03, 0.02, 0.01)
+
+
+def main():
+    cfg = Config(verify_early_stop="none")
+    rng = np.random.default_rng(cfg.seed)
+    basis = rng.standard_normal((LATENT, DIM))
+    lake = make_lake(600, 250, rng, basis)
+    all_vecs = np.vstack(list(lake.values()))
+
+    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+    selector.fit(all_vecs)
+    grid = HierarchicalGrid(levels=cfg.grid_levels)
+    grid.fit(selector.transform(all_vecs))
+    inv, tree, dists_map = index_lake(lake, selector, grid)
+
+    keys = list(lake)
+    print(f"{'k':>3} {'queries':>7} {'full exact':>11} {'top-k exact':>11} {'full s':>7} {'top-k s':>8} "
+          f"{'skipped':>8} {'abandoned':>9}  same scores")
+    for k in (1, 5, 10):
+        full_pairs = topk_pairs = skipped = abandoned = 0
+        t_full = t_topk = 0.0
+        same = True
+        for _ in range(10):
+            picks = rng.choice(len(keys), len(SHARES), replace=False)
+            parts = [
+                lake[keys[p]][rng.choice(250, int(share * QUERY_ROWS), replace=False)]
+                for p, share in zip(picks, SHARES)
+            ]
+            q = np.vstack(parts)[rng.permutation(sum(len(p) for p in parts))]
+            qd = selector.transform(q)
+            weights = np.ones(len(q), dtype=np.int64)
+
+            t0 = time.perf_counter()
+            blocker = Blocker(cfg, grid, tree)
+            post = blocker.range_query(qd, inv)
+            blocker.block(q, post, lake, qd, dists_map)
+            t_full += time.perf_counter() - t0
+            full_pairs += blocker.stats.pairs_verified
+            full = TopKSearcher(blocker, k=len(keys)).search(q, qd, weights, post, lake, dists_map)
+
+            t0 = time.perf_counter()
+            blocker = Blocker(cfg, grid, tree)
+            post = blocker.range_query(qd, inv)
+            searcher = TopKSearcher(blocker, k=k)
+            best = searcher.search(q, qd, weights, post, lake, dists_map)
+            t_topk += time.perf_counter() - t0
+            topk_pairs += blocker.stats.pairs_verified
+            skipped += searcher.stats.columns_skipped
+            abandoned += searcher.stats.columns_abandoned
+
+            expected = sorted((score for _, score in full), reverse=True)[:k]
+            same &= [score for _, score in best] == expected
+
+        flag = f"{GREEN}yes{RESET}" if same else f"{RED}NO{RESET}"
+        print(f"{k:>3} {10:>7} {full_pairs:>11} {topk_pairs:>11} {t_full:>7.3f} {t_topk:>8.3f} "
+              f"{skipped:>8} {abandoned:>9}  {flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Load test for the query server (pexeso.py serve).
+
+Sends /query requests built from the columns of a query CSV with a fixed
+number of concurrent clients and reports latency percentiles and QPS.
+
+Run from the repository root against a running server:
+    python -m benchmarks.load_test --query_csv <file.csv> [--url http://127.0.0.1:8765]
+                                   [--socket /tmp/pexeso.sock] [--concurrency 8] [--requests 200]
+"""
+from __future__ import annotations
+import argparse
+import http.client
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str):
+        super().__init__("localhost")
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+class Client:
+    """One keep-alive connection per client thread."""
+
+    def __init__(self, url: str, socket_path: str | None):
+        self.url, self.socket_path = urlparse(url), socket_path
+        self._local = threading.local()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self.socket_path:
+                conn = UnixHTTPConnection(self.socket_path)
+            else:
+                conn = http.client.HTTPConnection(self.url.hostname, self.url.port or 80)
+            self._local.conn = conn
+        return conn
+
+    def post(self, path: str, body: dict) -> dict:
+        conn = self._conn()
+        conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        data = json.loads(resp.read())
+        if resp.status != 200:
+            raise RuntimeError(data.get("error", resp.status))
+        return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--query_csv", required=True)
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--socket", default=None)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.query_csv)
+    bodies = [
+        {"table": "load_test", "column": str(c), "values": df[c].astype(str).tolist(), "top": 10}
+        for c in df.columns
+    ]
+    client = Client(args.url, args.socket)
+    client.post("/query", bodies[0])  # warm up (page in the index)
+
+    def one(i: int) -> float:
+        t0 = time.perf_counter()
+        client.post("/query", bodies[i % len(bodies)])
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = np.array(list(pool.map(one, range(args.requests)))) * 1000
+    wall = time.perf_counter() - t0
+
+    print(f"requests: {args.requests}, concurrency: {args.concurrency}, query columns: {len(bodies)}")
+    print(f"latency ms  p50: {np.percentile(latencies, 50):.1f}  p90: {np.percentile(latencies, 90):.1f}  "
+          f"p99: {np.percentile(latencies, 99):.1f}  max: {latencies.max():.1f}")
+    print(f"throughput: {args.requests / wall:.1f} QPS")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Synthetic data lakes with planted joinable column pairs.
+
+Every lake column draws its values from its own vocabulary of random
+pseudo-words, so unrelated columns share no values. A planted pair copies
+a chosen share of a query column's distinct values into a lake column
+(with changed case and added punctuation, which normalization removes),
+so the pair's joinability is known by construction:
+
+    joinability = query rows whose value was copied / query rows
+
+Layout written by generate_lake(out_dir, spec):
+    out_dir/lake/t000.csv ...      spec.tables tables of spec.columns text columns
+                                   (plus a numeric "id" column)
+    out_dir/queries/q000.csv ...   one "value" column per query table
+    out_dir/truth.json             the spec and every planted pair
+
+Write a lake from the repository root:
+    python -m benchmarks.synthetic_lake <out_dir> [--tables N] [--rows N] ...
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+_SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vor", "su", "pel", "dri", "an", "zo", "bex", "qui", "fa", "nor", "ut"]
+
+
+@dataclass
+class LakeSpec:
+    """Shape of a synthetic lake."""
+    tables: int = 20
+    columns: int = 3          # text columns per table
+    rows: int = 1000          # rows per table
+    cardinality: int = 300    # distinct values per lake column
+    queries: int = 5          # query tables, one column each
+    query_rows: int = 200
+    query_cardinality: int = 100
+    planted: int = 15         # planted (query column, lake column) pairs
+    min_joinability: float = 0.2
+    max_joinability: float = 1.0
+    seed: int = 42
+
+
+def _vocabulary(rng: np.random.Generator, n: int, taken: set) -> List[str]:
+    """n new distinct pseudo-words."""
+    words: List[str] = []
+    while len(words) < n:
+        w = "".join(rng.choice(_SYLLABLES, size=int(rng.integers(3, 6))))
+        w += str(int(rng.integers(0, 1000)))
+        if w not in taken:
+            taken.add(w)
+            words.append(w)
+    return words
+
+
+def _disguise(rng: np.random.Generator, word: str) -> str:
+    """Same value after normalization (case and punctuation only)."""
+    style = rng.integers(0, 3)
+    if style == 1:
+        word = word.upper()
+    elif style == 2:
+        word = word.capitalize() + "."
+    return word
+
+
+def generate_lake(out_dir: str, spec: LakeSpec) -> dict:
+    """
+    Write a lake, its query tables and truth.json under out_dir.
+
+    Returns:
+        the truth.json content: {"spec": ..., "planted": [{"query", "query_column",
+        "table", "column", "joinability"}, ...]}
+    """
+    rng = np.random.default_rng(spec.seed)
+    lake_dir, query_dir = os.path.join(out_dir, "lake"), os.path.join(out_dir, "queries")
+    os.makedirs(lake_dir, exist_ok=True)
+    os.makedirs(query_dir, exist_ok=True)
+    taken: set = set()
+
+    # query columns: rows drawn from their own vocabulary, every value present at least once
+    queries = []
+    for q in range(spec.queries):
+        vocab = np.array(_vocabulary(rng, spec.query_cardinality, taken), dtype=object)
+        rows = np.concatenate([vocab, vocab[rng.integers(0, len(vocab), max(0, spec.query_rows - len(vocab)))]])
+        queries.append((f"q{q:03d}.csv", vocab, rng.permutation(rows)))
+
+    # planted pairs: distinct lake columns, query columns round-robin
+    lake_columns = [(t, c) for t in range(spec.tables) for c in range(spec.columns)]
+    chosen = rng.choice(len(lake_columns), min(spec.planted, len(lake_columns)), replace=False)
+    plants = {}
+    for i, idx in enumerate(chosen):
+        q = i % spec.queries
+        target = rng.uniform(spec.min_joinability, spec.max_joinability)
+        _, vocab, _ = queries[q]
+        copied = vocab[rng.permutation(len(vocab))[:max(1, int(round(target * len(vocab))))]]
+        plants[lake_columns[idx]] = (q, copied)
+
+    planted = []
+    for t in range(spec.tables):
+        table = {"id": np.arange(spec.rows)}
+        for c in range(spec.columns):
+            n_vocab = min(spec.cardinality, spec.rows)
+            vocab = _vocabulary(rng, n_vocab, taken)
+            disguised = {}
+            if (t, c) in plants:
+                q, copied = plants[(t, c)]
+                disguised = {_disguise(rng, w): w for w in copied[:n_vocab]}
+                vocab = list(disguised) + vocab[:max(0, n_vocab - len(disguised))]
+            vocab = np.array(vocab, dtype=object)
+            # every vocabulary value occurs, the rest of the rows are drawn at random
+            rows = np.concatenate([vocab, vocab[rng.integers(0, len(vocab), max(0, spec.rows - len(vocab)))]])
+            table[f"c{c}"] = rng.permutation(rows)
+            if disguised:
+                qname, _, qrows = queries[q]
+                joinability = float(np.isin(qrows, list(disguised.values())).mean())
+                planted.append({"query": qname, "query_column": "value", "table": f"t{t:03d}.csv",
+                                "column": f"c{c}", "joinability": joinability})
+        pd.DataFrame(table).to_csv(os.path.join(lake_dir, f"t{t:03d}.csv"), index=False)
+
+    for qname, _, qrows in queries:
+        pd.DataFrame({"value": qrows}).to_csv(os.path.join(query_dir, qname), index=False)
+
+    truth = {"spec": asdict(spec), "planted": planted}
+    with open(os.path.join(out_dir, "truth.json"), "w") as f:
+        json.dump(truth, f, indent=1)
+    return truth
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    """One --<field> option per LakeSpec field."""
+    for name, default in asdict(LakeSpec()).items():
+        parser.add_argument(f"--{name}", type=type(default), default=default)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic lake with planted joinable columns.")
+    parser.add_argument("out_dir")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    spec = LakeSpec(**{k: getattr(args, k) for k in asdict(LakeSpec())})
+    truth = generate_lake(args.out_dir, spec)
+    print(f"Wrote {spec.tables} tables and {spec.queries} queries with {len(truth['planted'])} planted pairs "
+          f"to {args.out_dir}")
@@ -0,0 +1,135 @@
+"""
+Synthetic workloads and reference implementations shared by the
+benchmarks and the tests in tests/.
+
+The benchmarks time the optimized code against the reference
+implementations kept here; the tests check on small workloads that both
+return the same results.
+"""
+from __future__ import annotations
+import re
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from index.grid import HierarchicalGrid
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex
+from index.pivots import PivotSelector
+from utils.types import TableId, ColumnId
+
+_punct_re = re.compile(r"[^\w\s]", re.UNICODE)
+# letters with tricky case mappings, punctuation, and whitespace Python strips but \s and Arrow may not agree on
+_ALPHABET = list("abcXYZ019 ._-,;!?'\"()") + ["\t", "\n", "\x1c", " ", "　", "É", "ß", "İ", "Ǆ", "ﬁ", "Σ", "ǅ", "😀", "ー"]
+
+
+def unit(x: np.ndarray) -> np.ndarray:
+    """Rows of x scaled to unit length, as float32 (like the embedders' output)."""
+    return (x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-12)).astype("float32")
+
+
+def make_blocking_workload(n_query: int, n_columns: int, rows_per_col: int, dim: int, rng: np.random.Generator):
+    """
+    Query vectors plus postings whose rows are partly near-duplicates of them.
+
+    Args:
+        n_query: Query vectors.
+        n_columns: Candidate columns.
+        rows_per_col: Posted rows per column; about 30% are noisy copies of query vectors.
+        dim: Vector dimension.
+        rng: Random generator.
+
+    Returns:
+        (query vectors, {cell: [(table, column, row)]}, {(table, column): vectors}),
+        the arguments of Blocker.block.
+    """
+    q_vecs = unit(rng.standard_normal((n_query, dim)))
+    cand_vecs_map, postings = {}, {}
+    for c in range(n_columns):
+        base = unit(rng.standard_normal((rows_per_col, dim)))
+        near = rng.random(rows_per_col) < 0.3
+        src = rng.integers(0, n_query, size=rows_per_col)
+        base[near] = unit(q_vecs[src[near]] + 0.003 * rng.standard_normal((int(near.sum()), dim)))
+        table, col = TableId(f"t{c}.csv"), ColumnId("value")
+        cand_vecs_map[(table.name, col.name)] = base
+        for r in range(rows_per_col):
+            postings.setdefault((c % 7) * 5 + r % 5, []).append((table, col, r))
+    return q_vecs, postings, cand_vecs_map
+
+
+def reference_block(query_vecs, candidate_postings, cand_vecs_map, tau: float):
+    """The original Blocker.block loop: query vectors within τ of some posted row, per column, one pair at a time in float64."""
+    query64 = np.asarray(query_vecs, dtype=np.float64)
+    matched = {}
+    for postings in candidate_postings.values():
+        for table, col, row_id in postings:
+            c_vec = cand_vecs_map[(table.name, col.name)][row_id].astype(np.float64)
+            for qi, q_vec in enumerate(query64):
+                if np.linalg.norm(q_vec - c_vec) <= tau:
+                    matched.setdefault((table, col), set()).add(qi)
+    return {key: len(qs) for key, qs in matched.items()}
+
+
+def make_joinable_lake(query: np.ndarray, n_columns: int, column_rows: int, rng: np.random.Generator):
+    """
+    Lake with known joinability: column j holds noisy copies (1-3 each) of
+    exactly m_j query values, padded with unrelated unit vectors.
+
+    Returns:
+        ({(table, column): vectors}, {(table, column): m_j / |Q|})
+    """
+    lake, known = {}, {}
+    dim = query.shape[1]
+    for c in range(n_columns):
+        m = int(rng.integers(0, len(query) + 1))
+        picked = rng.choice(len(query), m, replace=False)
+        copies = np.repeat(picked, rng.integers(1, 4, size=m))[:column_rows]
+        near = unit(query[copies] + 0.003 * rng.standard_normal((len(copies), dim)))
+        far = unit(rng.standard_normal((column_rows - len(copies), dim)))
+        key = (f"t{c}.csv", "value")
+        lake[key] = np.vstack([near, far])[rng.permutation(column_rows)]
+        known[key] = len(np.unique(copies)) / len(query)
+    return lake, known
+
+
+def index_lake(lake, selector: PivotSelector, grid: HierarchicalGrid):
+    """Inverted index, finalized grid tree and pivot distances of every column of `lake` (fitted pivots and grid)."""
+    inv, tree, dists_map = InvertedIndex(), GridTree(grid.levels), {}
+    for (t, c), vecs in lake.items():
+        dists = selector.transform(vecs)
+        codes = grid.transform_codes(dists)
+        dists_map[(t, c)] = dists
+        inv.add(codes[:, -1], TableId(t), ColumnId(c))
+        tree.add(codes, dists)
+    tree.finalize()
+    return inv, tree, dists_map
+
+def reference_normalize_column(series: pd.Series) -> List[str]:
+    """The original per-value normalization (data.preprocess before vectorization)."""
+    def clean_text(values):
+        cleaned = []
+        for v in values:
+            if not isinstance(v, str):
+                v = str(v)
+            v = v.lower().strip()
+            v = _punct_re.sub("", v)
+            cleaned.append(v if v != "" else "__EMPTY__")
+        return cleaned
+
+    if pd.api.types.is_numeric_dtype(series):
+        values = [str(v) if pd.notna(v) else "__EMPTY__" for v in series]
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        values = [
+            str(pd.to_datetime(v, errors="coerce").date()) if pd.notna(v) else "__EMPTY__"
+            for v in series
+        ]
+    else:
+        values = clean_text(series.fillna("__EMPTY__").astype(str).tolist())
+    return [v if v.strip() != "" else "__EMPTY__" for v in values]
+
+
+def random_strings(rng: np.random.Generator, n: int) -> List[str]:
+    """n short strings of awkward characters, drawn from a pool of about n/3 distinct ones."""
+    pool = ["".join(rng.choice(_ALPHABET, rng.integers(0, 8))) for _ in range(max(1, n // 3))]
+    return [pool[i] for i in rng.integers(0, len(pool), n)]
@@ -1,9 +1,13 @@
 import re
+import numpy as np
 import pandas as pd
-from typing import List
+from typing import List, Tuple
 
 _punct_re = re.compile(r"[^\w\s]", re.UNICODE)
 
+EMPTY = "__EMPTY__"
+
+
 def clean_text(values: List[str]) -> List[str]:
     """Lowercase, strip, remove punctuation."""
     cleaned = []
@@ -12,22 +16,88 @@ def clean_text(values: List[str]) -> List[str]:
             v = str(v)
         v = v.lower().strip()
         v = _punct_re.sub("", v)
-        cleaned.append(v if v != "" else "__EMPTY__")
+        cleaned.append(v if v != "" else EMPTY)
     return cleaned
 
 
-def normalize_column(series: pd.Series) -> List[str]:
-    """Normalize a column to strings ready for embedding."""
+def normalize_column(series: pd.Series, return_inverse: bool = False):
+    """
+    Normalize a column to strings ready for embedding.
+
+    Values are converted with whole-column operations: numbers through one
+    str() pass, datetimes through one day-resolution cast, and text is
+    cleaned once per distinct raw value with pandas string methods (which
+    apply the same str.lower/strip and regex as clean_text; Arrow kernels
+    differ on Unicode case, whitespace and \\w, so they are not used).
+
+    Args:
+        series: raw column values
+        return_inverse: return distinct values and the row -> value index
+            instead of one string per row
+    Returns:
+        values: one normalized string per row, or
+        (distinct, inverse): distinct normalized strings in first-occurrence
+            order and an (n,) int64 array with values == distinct[inverse]
+    """
     if pd.api.types.is_numeric_dtype(series):
-        values = [str(v) if pd.notna(v) else "__EMPTY__" for v in series]
+        values = _numeric_strings(series)
     elif pd.api.types.is_datetime64_any_dtype(series):
-        values = [
-            str(pd.to_datetime(v, errors="coerce").date()) if pd.notna(v) else "__EMPTY__"
-            for v in series
-        ]
+        values = _date_strings(series)
+    else:
+        raw = series.fillna(EMPTY).astype(str).to_numpy(dtype=object)
+        inverse, uniques = pd.factorize(raw)
+        values = _clean_distinct(uniques)[inverse]
+
+    if not return_inverse:
+        return values.tolist()
+    inverse, distinct = pd.factorize(values)
+    return distinct.tolist(), inverse.astype(np.int64)
+
+
+def _numeric_strings(series: pd.Series) -> np.ndarray:
+    """str() of each value as a Python scalar (as iterating the series gives), "__EMPTY__" for missing."""
+    missing = series.isna().to_numpy()
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iub":
+        # integers and booleans print the same from NumPy
+        values = series.to_numpy().astype(str).astype(object)
     else:
-        values = clean_text(series.fillna("__EMPTY__").astype(str).tolist())
+        values = np.array(list(map(str, series.tolist())), dtype=object)
+    values[missing] = EMPTY
+    return values
+
+
+def _date_strings(series: pd.Series) -> np.ndarray:
+    """YYYY-MM-DD of each value's (local) date, "__EMPTY__" for missing."""
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)  # local wall time, as Timestamp.date()
+    missing = series.isna().to_numpy()
+    days = series.to_numpy().astype("datetime64[D]")
+    years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+    if ((years[~missing] < 1) | (years[~missing] > 9999)).any():
+        # outside datetime.date's range NumPy and str(date) disagree; keep the original conversion
+        values = np.array([str(v.date()) if pd.notna(v) else EMPTY for v in series], dtype=object)
+    else:
+        values = np.datetime_as_string(days, unit="D").astype(object)
+    values[missing] = EMPTY
+    return values
+
 
-    # final cleanup
-    values = [v if v.strip() != "" else "__EMPTY__" for v in values]
+def _clean_distinct(uniques: np.ndarray) -> np.ndarray:
+    """clean_text plus the blank -> "__EMPTY__" rule, applied to distinct strings."""
+    cleaned = (
+        pd.Series(uniques, dtype=object)
+        .str.lower()
+        .str.strip()
+        .str.replace(_punct_re, "", regex=True)
+    )
+    # also catches punctuation-only values cleaned to "" or to inner whitespace
+    blank = (cleaned.str.strip() == "").to_numpy(dtype=bool)
+    values = cleaned.to_numpy(dtype=object, copy=True)
+    values[blank] = EMPTY
     return values
+
+
+def distinct_values(values: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Distinct values in first-occurrence order and how many rows hold each."""
+    inverse, distinct = pd.factorize(np.asarray(values, dtype=object))
+    return distinct.tolist(), np.bincount(inverse, minlength=len(distinct)).astype(np.int32)
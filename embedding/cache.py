@@ -0,0 +1,233 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from embedding.embedder import EmbeddingModel
+from utils.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@dataclass
+class CacheStats:
+    """Lookup counters of an EmbeddingCache, counted per distinct value."""
+    requested: int = 0      # values passed to embed(), duplicates included
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0         # values sent to the wrapped model
+
+    @property
+    def hit_rate(self) -> float:
+        looked_up = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / max(1, looked_up)
+
+
+def _value_key(text: str) -> int:
+    """64-bit hash of a (normalized) value."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class EmbeddingCache(EmbeddingModel):
+    """
+    Value -> vector cache in front of any EmbeddingModel.
+
+    Each embed() call is deduplicated, then values are looked up in a
+    bounded in-memory LRU, then in a persistent store on disk, and only
+    the remaining misses reach the wrapped model. With persist=False the
+    disk store is only read and new vectors are queued for take_new(), so
+    worker processes can hand them to one writer. The disk store lives in
+    a sub-directory named after the model id and dimension, so changing
+    either starts a fresh store instead of serving stale vectors.
+
+    Disk layout (per model id/dim):
+        meta.json     {"model_id", "dim"}
+        keys.bin      uint64 value hashes, one per row
+        vectors.bin   float32 (n, dim) vectors, memory-mapped for lookups
+        lock          held (flock) while the store is reset or appended to
+
+    Several processes may share a store (parallel shard builds, a server
+    next to a build): appends take the lock, start after the rows already
+    in vectors.bin and write keys.bin last, so a key is never visible
+    before its vector. Without fcntl (Windows) appends are not locked and
+    a store must have one writer at a time.
+    """
+
+    def __init__(
+        self,
+        model: EmbeddingModel,
+        cache_dir: str | None = None,
+        max_memory_items: int = 100_000,
+        persist: bool = True,
+    ):
+        self.model = model
+        self.dim = model.dim
+        self.model_id = model.model_id
+        self.max_memory_items = max_memory_items
+        self.stats = CacheStats()
+
+        self._lru: OrderedDict[int, np.ndarray] = OrderedDict()
+        self._rows: Dict[int, int] = {}       # value hash -> row in vectors.bin
+        self._n_rows = 0                      # rows of vectors.bin read into _rows
+        self._mapped: np.ndarray | None = None
+        self._new: List[Tuple[int, np.ndarray]] = []  # computed but not persisted
+        self.persist = persist
+        self.path: str | None = None
+        if cache_dir is not None:
+            self._open_store(cache_dir)
+
+    def _open_store(self, cache_dir: str):
+        namespace = hashlib.sha1(f"{self.model_id}:{self.dim}".encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, namespace)
+        os.makedirs(self.path, exist_ok=True)
+
+        meta_path = os.path.join(self.path, "meta.json")
+        meta = {"model_id": self.model_id, "dim": self.dim}
+        with self._locked():
+            if os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    stale = json.load(f) != meta
+            else:
+                stale = True
+            if stale:
+                for name in ("keys.bin", "vectors.bin"):
+                    open(os.path.join(self.path, name), "wb").close()
+                with open(meta_path, "w") as f:
+                    json.dump(meta, f)
+            self._read_rows()
+
+    @contextmanager
+    def _locked(self):
+        """Hold the store's lock file exclusively (across processes)."""
+        with open(os.path.join(self.path, "lock"), "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_rows(self):
+        """
+        Map the rows appended since the last call, by this or another
+        process. Called with the lock held: a vectors.bin longer than
+        keys.bin is an interrupted append, whose vectors are dropped so the
+        next append starts where the keys end.
+        """
+        keys_path = os.path.join(self.path, "keys.bin")
+        vectors_path = os.path.join(self.path, "vectors.bin")
+        row_bytes = 4 * self.dim
+        n = min(os.path.getsize(keys_path) // 8, os.path.getsize(vectors_path) // row_bytes)
+        if os.path.getsize(vectors_path) != n * row_bytes:
+            os.truncate(vectors_path, n * row_bytes)
+        if n > self._n_rows:
+            keys = np.fromfile(keys_path, dtype="<u8", count=n - self._n_rows, offset=8 * self._n_rows)
+            for i, key in enumerate(keys.tolist(), start=self._n_rows):
+                self._rows.setdefault(key, i)
+            self._n_rows = n
+
+    def _disk_vector(self, row: int) -> np.ndarray:
+        if self._mapped is None or row >= len(self._mapped):
+            self._mapped = np.memmap(
+                os.path.join(self.path, "vectors.bin"), dtype="<f4", mode="r", shape=(self._n_rows, self.dim)
+            )
+        return self._mapped[row]
+
+    def _remember(self, key: int, vec: np.ndarray):
+        # a copy: a row view would keep the whole batch (or mapping) it came from alive
+        self._lru[key] = np.array(vec, dtype=np.float32)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_items:
+            self._lru.popitem(last=False)
+
+    def store(self, keys: List[int], vecs: np.ndarray):
+        """Append vectors to the disk store (keys already stored, by any process, are skipped)."""
+        if self.path is None or not keys:
+            return
+        with self._locked():
+            self._read_rows()
+            fresh, seen = [], set()
+            for i, key in enumerate(keys):
+                if key not in self._rows and key not in seen:
+                    seen.add(key)
+                    fresh.append(i)
+            if not fresh:
+                return
+            keys = [keys[i] for i in fresh]
+            vecs = np.asarray(vecs)[fresh]
+            start = os.path.getsize(os.path.join(self.path, "vectors.bin")) // (4 * self.dim)
+            with open(os.path.join(self.path, "vectors.bin"), "ab") as f:
+                np.ascontiguousarray(vecs, dtype="<f4").tofile(f)
+            # keys last: a crash in between leaves vectors without keys, dropped by the next _read_rows
+            with open(os.path.join(self.path, "keys.bin"), "ab") as f:
+                np.asarray(keys, dtype="<u8").tofile(f)
+            for i, key in enumerate(keys):
+                self._rows[key] = start + i
+            self._n_rows = start + len(keys)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Return embeddings for a list of texts, computing each distinct value at most once."""
+        self.stats.requested += len(texts)
+        positions: Dict[str, int] = {}
+        inverse = np.fromiter(
+            (positions.setdefault(t, len(positions)) for t in map(str, texts)),
+            dtype=np.int64, count=len(texts),
+        )
+        uniq = list(positions)
+
+        out = np.empty((len(uniq), self.dim), dtype=np.float32)
+        miss_idx: List[int] = []
+        miss_keys: List[int] = []
+        for i, text in enumerate(uniq):
+            key = _value_key(text)
+            vec = self._lru.get(key)
+            if vec is not None:
+                self._lru.move_to_end(key)
+                self.stats.memory_hits += 1
+            elif key in self._rows:
+                vec = self._disk_vector(self._rows[key])
+                self._remember(key, vec)
+                self.stats.disk_hits += 1
+            else:
+                miss_idx.append(i)
+                miss_keys.append(key)
+                continue
+            out[i] = vec
+
+        if miss_idx:
+            self.stats.misses += len(miss_idx)
+            vecs = np.asarray(self.model.embed([uniq[i] for i in miss_idx]), dtype=np.float32)
+            out[miss_idx] = vecs
+            for key, vec in zip(miss_keys, vecs):
+                self._remember(key, vec)
+            if self.persist:
+                self.store(miss_keys, vecs)
+            else:
+                self._new.extend(zip(miss_keys, vecs))
+
+        return out[inverse]
+
+    def take_new(self) -> Tuple[List[int], np.ndarray]:
+        """Keys and vectors computed since the last call (persist=False only)."""
+        keys = [key for key, _ in self._new]
+        vecs = np.array([vec for _, vec in self._new], dtype=np.float32).reshape(-1, self.dim)
+        self._new = []
+        return keys, vecs
+
+
+def with_cache(model: EmbeddingModel, cfg: Config, out_dir: str, persist: bool = True) -> EmbeddingModel:
+    """Wrap `model` in an EmbeddingCache as configured (default store: <out_dir>/embedding_cache)."""
+    if not cfg.embedding_cache:
+        return model
+    cache_dir = cfg.embedding_cache_dir or os.path.join(out_dir, "embedding_cache")
+    return EmbeddingCache(model, cache_dir, max_memory_items=cfg.embedding_cache_items, persist=persist)
@@ -1,15 +1,16 @@
 from __future__ import annotations
+import hashlib
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Sequence
 import numpy as np
 
-import fasttext
-import fasttext.util
-
 
 class EmbeddingModel(ABC):
     """Abstract base class for embedding models."""
 
+    dim: int
+    model_id: str  # identifies model weights; vectors of different ids are not interchangeable
+
     @abstractmethod
     def embed(self, texts: List[str]) -> np.ndarray:  # Convert list of strings into an array of vectors.
         pass
@@ -23,6 +24,10 @@ class FastTextEmbedder(EmbeddingModel):
         Load English FastText vectors.
         Default: 300 dimensions (cc.en.300.bin).
         """
+        # imported here so the rest of the package works without fasttext
+        import fasttext
+        import fasttext.util
+
         fasttext.util.download_model('en', if_exists='ignore')  # downloads if not present
         self.model = fasttext.load_model('cc.en.300.bin')
 
@@ -31,6 +36,7 @@ class FastTextEmbedder(EmbeddingModel):
             fasttext.util.reduce_model(self.model, dim)
 
         self.dim = dim
+        self.model_id = f"fasttext:cc.en.300.bin:{dim}"
 
     def embed(self, texts: List[str]) -> np.ndarray:
         """Return L2-normalized embeddings for a list of texts."""
@@ -39,3 +45,54 @@ class FastTextEmbedder(EmbeddingModel):
         # L2 normalization (important for cosine distance)
         norms = np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12
         return vecs / norms
+
+
+class HashingEmbedder(EmbeddingModel):
+    """
+    Deterministic stand-in for FastText that needs no download: each text
+    is the sum of its hashed character n-grams (of "<text>"), every n-gram
+    adding ±1 to a few hashed dimensions. Texts sharing most n-grams get
+    close vectors; unrelated texts are nearly orthogonal. Same vectors on
+    every machine and in every process.
+    """
+
+    # dimensions each n-gram is added to
+    _PROBES = 4
+
+    def __init__(self, dim: int = 300, ngrams: Sequence[int] = (3, 4, 5)):
+        self.dim = dim
+        self.ngrams = tuple(ngrams)
+        self.model_id = f"hashing:{'-'.join(map(str, self.ngrams))}:{dim}"
+
+    def _features(self, text: str) -> np.ndarray:
+        """(n-grams x probes) hashed feature ids; the low bit is the sign."""
+        t = f"<{text}>"
+        grams = [t[i:i + n] for n in self.ngrams for i in range(max(1, len(t) - n + 1))]
+        digests = b"".join(
+            hashlib.blake2b(g.encode("utf-8"), digest_size=4 * self._PROBES).digest() for g in grams
+        )
+        return np.frombuffer(digests, dtype="<u4").astype(np.int64)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Return L2-normalized embeddings for a list of texts."""
+        vecs = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if not texts:
+            return vecs
+        feats = [self._features(str(text)) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(f) for f in feats])
+        feats = np.concatenate(feats)
+        np.add.at(vecs, (rows, (feats >> 1) % self.dim), np.where(feats & 1, 1.0, -1.0).astype(np.float32))
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-12
+        return vecs / norms
+
+
+EMBEDDING_MODELS = ("fasttext", "hashing")
+
+
+def make_embedder(name: str = "fasttext", dim: int = 300) -> EmbeddingModel:
+    """Embedding model for Config.embedding_model."""
+    if name == "fasttext":
+        return FastTextEmbedder(dim=dim)
+    if name == "hashing":
+        return HashingEmbedder(dim=dim)
+    raise ValueError(f"Unknown embedding model: {name}")
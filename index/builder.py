@@ -0,0 +1,237 @@
+# pexeso/index/builder.py
+from __future__ import annotations
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from index.candidates import IVFCandidates
+from index.grid import HierarchicalGrid, fit_grid
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex
+from index.pivots import PivotSelector
+from index.quantization import make_quantizer
+from index.shards import shard_meta
+from index.storage import IndexWriter, append_codes, fit_summary, write_quantizer, write_summaries
+from utils.config import Config
+from utils.metrics import NULL_METRICS, Metrics
+from utils.types import TableId, ColumnId
+
+
+class StreamingIndexBuilder:
+    """
+    Builds an index directory without holding the lake's embeddings in memory.
+
+    - add_column() appends each column's embeddings to disk as soon as they
+      are produced and feeds a fixed-size reservoir sample.
+    - finish() fits pivots on the sample, then streams the stored embeddings
+      back in chunks to write pivot distances and track per-pivot min/max,
+      fits the grid from those ranges (quantile edges: from the sample's
+      pivot distances, stretched to them), and streams the distances once more
+      to assign cells, grow the grid tree and collect postings.
+
+    With `frozen` (pivots and grid of another index, e.g. shard 0 of a
+    sharded index), nothing is fitted and rows are placed under those.
+
+    With candidate_generator="ivf", IVF centroids are fitted on the same
+    sample and vectors are assigned to lists during the first pass; with
+    embedding_codes, the quantizer is fitted on it too and the stored
+    embeddings are encoded in that pass.
+
+    Leaf cells (and IVF lists) of the rows are spilled to scratch arrays
+    as they are computed; the postings CSR is then counted and scattered
+    into memory-mapped output arrays chunk by chunk (_write_csr). Apart
+    from the reservoir and one chunk, memory grows only with the number of
+    columns and of occupied cells (column offsets, per-cell counts, grid
+    tree nodes), never with the number of rows.
+    """
+
+    def __init__(self, path: str, cfg: Config, dim: int,
+                 frozen: Tuple[PivotSelector, HierarchicalGrid] | None = None):
+        self.path = path
+        self.cfg = cfg
+        self.dim = dim
+        self.frozen = frozen
+        self.writer = IndexWriter(path)
+        self.rng = np.random.default_rng(cfg.seed)
+
+        budget = cfg.memory_budget_mb * 1024 * 1024
+        # a quarter of the budget for the pivot sample (PCA makes ~3 working
+        # copies of it while fitting); a quarter for one chunk and about three
+        # float32 working copies of it (dtype conversion, IVF residuals; the
+        # pivot transform only adds (rows, k) arrays)
+        self.sample_cap = max(1, min(cfg.pivot_sample_size, budget // (4 * 4 * dim)))
+        self.chunk_rows = max(1, budget // (4 * 4 * 4 * dim))
+
+        self.sample = np.empty((self.sample_cap, dim), dtype=np.float32)
+        self.seen = 0
+        self.col_meta: List[dict] = []
+        self.offsets: List[int] = [0]
+
+    def add_column(self, table: str, column: str, vecs: np.ndarray, counts: np.ndarray | None = None):
+        """Append one column's embeddings (and rows per vector) and update the reservoir sample."""
+        vecs = np.asarray(vecs, dtype=np.float32)
+        self.writer.append("embeddings", vecs.astype(self.cfg.dtype))
+        self.writer.append("value_counts", np.ones(len(vecs), dtype=np.int32) if counts is None
+                           else np.asarray(counts, dtype=np.int32))
+        self.col_meta.append({"table": table, "column": column})
+        self.offsets.append(self.offsets[-1] + len(vecs))
+        self._sample(vecs)
+
+    def _sample(self, vecs: np.ndarray):
+        # Algorithm R, vectorized over the rows of one column
+        n = len(vecs)
+        fill = max(0, min(n, self.sample_cap - self.seen))
+        self.sample[self.seen:self.seen + fill] = vecs[:fill]
+        t = self.seen + np.arange(fill, n)
+        j = self.rng.integers(0, t + 1) if len(t) else t
+        keep = j < self.sample_cap
+        self.sample[j[keep]] = vecs[fill:][keep]  # later rows win, as in sequential order
+        self.seen += n
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def abandon(self):
+        """Drop the partial index and release the index directory for other writers."""
+        self.writer.abandon()
+
+    def _chunks(self, name: str):
+        data = self.writer.open_array(name)
+        for s in range(0, len(data), self.chunk_rows):
+            yield np.asarray(data[s:s + self.chunk_rows])
+
+    def finish(self, sources: Dict[str, dict] | None = None, metrics: Metrics = NULL_METRICS) -> Dict[str, int]:
+        """Fit pivots and grid, write distances, postings and tree, and close the index."""
+        cfg = self.cfg
+        sample = self.sample[:min(self.seen, self.sample_cap)]
+
+        with metrics.stage("pivots"):
+            if self.frozen is None:
+                selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed, strategy=cfg.pivot_strategy)
+                pivots = selector.fit(sample)
+            else:
+                selector = self.frozen[0]
+                pivots = selector.pivots
+            self.writer.write("pivots", pivots)
+
+        quantizer = make_quantizer(cfg.embedding_codes, cfg.pq_subspaces, cfg.seed)
+        if quantizer is not None:
+            with metrics.stage("quantizer"):
+                write_quantizer(self.writer, quantizer.fit(sample))
+
+        centroids = None
+        if cfg.candidate_generator == "ivf":
+            with metrics.stage("ivf"):
+                centroids = IVFCandidates.fit_centroids(
+                    sample, cfg.ivf_lists or IVFCandidates.default_lists(len(self)), cfg.seed,
+                )
+            radii = np.zeros(len(centroids), dtype=np.float32)
+
+        col_min = np.full(len(pivots), np.inf)
+        col_max = np.full(len(pivots), -np.inf)
+        with metrics.stage("embeddings_pass"):
+            for chunk in self._chunks("embeddings"):
+                if quantizer is not None:
+                    append_codes(self.writer, quantizer, chunk)
+                if centroids is not None:
+                    ids, d = IVFCandidates.assign(centroids, chunk)
+                    self.writer.append("scratch_lists", ids.astype(np.int64))
+                    np.maximum.at(radii, ids, d.astype(np.float32))
+                dists = selector.transform(chunk)
+                np.minimum(col_min, dists.min(axis=0), out=col_min)
+                np.maximum(col_max, dists.max(axis=0), out=col_max)
+                self.writer.append("pivot_dists", dists)
+
+        with metrics.stage("grid"):
+            # quantile edges come from the sample, stretched to the range of all rows
+            if self.frozen is None:
+                grid = fit_grid(
+                    selector.transform(sample), cfg.grid_levels, cfg.grid_bins, cfg.grid_cell_cap,
+                    scale=len(self) / max(1, len(sample)), col_min=col_min, col_max=col_max,
+                )
+            else:
+                grid = self.frozen[1]
+            for l in range(grid.levels):
+                self.writer.write(f"grid_edges_{l}", np.array([edges[l] for edges in grid.bin_edges], dtype=np.float64))
+
+        tree = GridTree(levels=grid.levels)
+        with metrics.stage("distances_pass"):
+            for dists in self._chunks("pivot_dists"):
+                codes = grid.transform_codes(dists)
+                tree.add(codes, dists)
+                self.writer.append("scratch_leaf", codes[:, -1].astype(np.int64))
+            tree.finalize()
+            for name, arr in tree.to_arrays().items():
+                self.writer.write(f"tree_{name}", arr)
+
+        with metrics.stage("postings"):
+            cells, offsets = self._write_csr("postings", "scratch_leaf")
+            if centroids is not None:
+                self.writer.write("ivf_centroids", centroids)
+                self.writer.write("ivf_radii", radii)
+                self._write_csr("ivf", "scratch_lists")
+            self.writer.write("column_offsets", np.array(self.offsets, dtype=np.int64))
+            columns = [(TableId(m["table"]), ColumnId(m["column"])) for m in self.col_meta]
+            inv = InvertedIndex.from_csr(cells, offsets, self.writer.open_array("postings_col_ids"),
+                                         self.writer.open_array("postings_row_ids"), columns)
+            posting_lists = inv.length_stats()
+
+        with metrics.stage("summaries"):
+            write_summaries(self.writer, self.writer.open_array("embeddings"), self.writer.open_array("pivot_dists"),
+                            self.offsets)
+
+        self.writer.close(
+            grid_levels=grid.levels,
+            embedding_dtype=np.dtype(cfg.dtype).name,
+            columns=self.col_meta,
+            sources=sources or {},
+            fit=fit_summary(tree),
+            shard=shard_meta(cfg),
+        )
+        return {"rows": len(self), "columns": len(self.col_meta), "sampled": len(sample), "postings": len(self),
+                "grid_levels": grid.levels, "posting_lists": posting_lists}
+
+    def _write_csr(self, prefix: str, keys_name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Write the CSR postings {prefix}_cells/_offsets/_col_ids/_row_ids of
+        the per-row cell codes in scratch array `keys_name` (removed after),
+        as InvertedIndex.from_postings would order them: by cell, then in
+        storage order. One pass counts rows per cell; a second scatters
+        each chunk's (column, row) ids into memory-mapped outputs at the
+        next free slots of their cells.
+
+        Returns:
+            cells, offsets: the CSR's cell codes and offsets
+        """
+        cells = np.empty(0, dtype=np.int64)
+        counts = np.empty(0, dtype=np.int64)
+        for keys in self._chunks(keys_name):
+            u, c = np.unique(keys, return_counts=True)
+            cells, inverse = np.unique(np.concatenate([cells, u]), return_inverse=True)
+            counts = np.bincount(inverse, weights=np.concatenate([counts, c]), minlength=len(cells)).astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        col_offsets = np.array(self.offsets, dtype=np.int64)
+        col_out = self.writer.allocate(f"{prefix}_col_ids", (len(self),), np.int32)
+        row_out = self.writer.allocate(f"{prefix}_row_ids", (len(self),), np.int32)
+        cursor = offsets[:-1].copy()
+        pos = 0
+        for keys in self._chunks(keys_name):
+            idx = np.searchsorted(cells, keys)
+            order = np.argsort(idx, kind="stable")  # storage order within a cell
+            grouped, starts, sizes = np.unique(idx[order], return_index=True, return_counts=True)
+            dest = np.repeat(cursor[grouped] - starts, sizes) + np.arange(len(keys))
+            rows = pos + order
+            col = np.searchsorted(col_offsets, rows, side="right") - 1
+            col_out[dest] = col
+            row_out[dest] = rows - col_offsets[col]
+            cursor[grouped] += sizes
+            pos += len(keys)
+        for out in (col_out, row_out):
+            if isinstance(out, np.memmap):
+                out.flush()
+        del col_out, row_out
+        self.writer.write(f"{prefix}_cells", cells)
+        self.writer.write(f"{prefix}_offsets", offsets)
+        self.writer.remove(keys_name)
+        return cells, offsets
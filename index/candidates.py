@@ -0,0 +1,269 @@
+# pexeso/index/candidates.py
+"""
+Candidate generation: which (column, row) postings a query must be
+compared against.
+
+A CandidateGenerator answers a τ range query with a PostingsBlock whose
+postings are grouped in "cells", and decides per (query vector, cell)
+whether the cell can hold a match at all (hit) or holds only matches
+(accept). Blocker uses both to restrict exact work to plausible pairs.
+
+- GridCandidates: leaf cells of the pivot grid (HierarchicalGrid +
+  GridTree + InvertedIndex), bounds in pivot-distance space.
+- IVFCandidates: IVF-flat lists over the value vectors (k-means
+  centroids), bounds from each list's radius around its centroid. Exact
+  when every list within radius + τ is probed; with nprobe > 0 each query
+  vector probes at most its nprobe nearest such lists (approximate).
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from index.grid import HierarchicalGrid
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex, PostingsBlock
+from index.pivots import PIVOT_BOUND_EPS
+
+# Slack on list radii so rounding never drops a true match: float32 distances,
+# and float16-stored rows (about 1e-3 on unit vectors) in indexes whose radii
+# were measured before rounding.
+_RADIUS_EPS = 1e-3
+
+# Query vectors per distance block against all centroids.
+_QUERY_BLOCK = 4096
+# Largest (vectors, centroids) distance block of nearest(), in elements (16 MB of
+# float32), so assigning stays bounded when the list count grows with the lake.
+_ASSIGN_BLOCK_ELEMS = 1 << 22
+
+
+class CandidateGenerator(ABC):
+    """Range-query backend of the blocking step."""
+
+    name: str
+
+    @abstractmethod
+    def search(
+        self,
+        query_vecs: np.ndarray | None,   # (n_q, d)
+        query_dists: np.ndarray | None,  # (n_q, k) pivot distances
+        tau: float,
+    ) -> Tuple[PostingsBlock, int]:
+        """
+        Returns:
+            postings: postings of every cell some query vector may match in
+            visited: number of cells whose bounds were evaluated
+        """
+
+    @abstractmethod
+    def cell_masks(
+        self,
+        query_vecs: np.ndarray | None,
+        query_dists: np.ndarray | None,
+        cells: np.ndarray,               # (m,) cells of a PostingsBlock
+        tau: float,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            hit: (n_q, m) the cell may hold vectors within τ of the query
+            accept: (n_q, m) every vector in the cell is within τ of the query
+        """
+
+
+def pivot_cell_masks(
+    query_dists: np.ndarray,  # (n_q, k)
+    lo: np.ndarray,           # (m, k)
+    hi: np.ndarray,           # (m, k)
+    tau: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pivot lemmas for every (query vector, cell) pair, from the cells' pivot-distance bounds."""
+    n_q, k = query_dists.shape
+    hit = np.ones((n_q, len(lo)), dtype=bool)
+    accept = np.zeros((n_q, len(lo)), dtype=bool)
+    slack = tau + PIVOT_BOUND_EPS
+    for p in range(k):
+        qd = query_dists[:, p, None]
+        hit &= (lo[None, :, p] <= qd + slack) & (hi[None, :, p] >= qd - slack)
+        accept |= qd + hi[None, :, p] <= tau - PIVOT_BOUND_EPS
+    return hit, accept & hit
+
+
+class GridCandidates(CandidateGenerator):
+    """Leaf cells of the pivot grid; needs pivot distances of the query."""
+
+    name = "grid"
+
+    def __init__(self, grid: HierarchicalGrid | None, tree: GridTree | None, inv_index: InvertedIndex | None = None):
+        if grid is None and tree is None:
+            raise RuntimeError("GridCandidates needs a grid or grid tree.")
+        self.grid = grid
+        self.tree = tree
+        self.inv_index = inv_index
+
+    def leaf_bounds(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # data-derived bounds of the tree are tighter than the grid's cell edges
+        if self.tree is not None:
+            return self.tree.leaf_bounds(cells)
+        return self.grid.cell_bounds(cells)
+
+    def search(self, query_vecs, query_dists, tau):
+        """
+        With a GridTree the cells are found top-down, pruning and accepting
+        whole subtrees at coarse levels; otherwise every leaf cell of the
+        inverted index is tested.
+        """
+        inv = self.inv_index
+        if query_dists is None or len(query_dists) == 0:
+            return inv.gather([]), 0
+        if self.tree is not None:
+            leaves, visited = self.tree.search(query_dists, tau)
+            return inv.gather(leaves), visited
+
+        cells = inv.cells
+        if len(cells) == 0:
+            return inv.gather([]), 0
+        lo, hi = self.grid.cell_bounds(cells)
+        hit = pivot_cell_masks(np.asarray(query_dists), lo, hi, tau)[0].any(axis=0)
+        return inv.gather(cells[hit]), len(cells)
+
+    def cell_masks(self, query_vecs, query_dists, cells, tau):
+        lo, hi = self.leaf_bounds(cells)
+        return pivot_cell_masks(np.asarray(query_dists), lo, hi, tau)
+
+
+class IVFCandidates(CandidateGenerator):
+    """
+    IVF-flat lists: every value vector is stored in the list of its nearest
+    centroid; a list's radius is the largest distance of its vectors to the
+    centroid. By the triangle inequality a list can hold a vector within τ
+    of q only if d(q, c) <= radius + τ, and holds only such vectors if
+    d(q, c) + radius <= τ.
+    """
+
+    name = "ivf"
+
+    def __init__(self, centroids: np.ndarray, radii: np.ndarray, lists: InvertedIndex, nprobe: int = 0):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.radii = np.asarray(radii, dtype=np.float32)
+        self.lists = lists
+        self.nprobe = nprobe
+        self._c_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+
+    @staticmethod
+    def fit_centroids(sample: np.ndarray, n_lists: int, seed: int = 42, iters: int = 10) -> np.ndarray:
+        """
+        Lloyd's k-means on a sample of value vectors.
+
+        Args:
+            sample: (n, d) vectors (e.g. the pivot reservoir sample)
+            n_lists: number of lists; clipped to the sample size
+        Returns:
+            centroids: (n_lists, d) float32
+        """
+        sample = np.asarray(sample, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        n_lists = max(1, min(n_lists, len(sample)))
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iters):
+            nearest = IVFCandidates.nearest(centroids, sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            sizes = np.bincount(nearest, minlength=n_lists)
+            full = sizes > 0
+            # empty lists keep their centroid
+            centroids[full] = sums[full] / sizes[full, None]
+        return centroids
+
+    @staticmethod
+    def default_lists(n_vectors: int) -> int:
+        """About 4·sqrt(N) lists, the usual IVF starting point."""
+        return max(1, int(round(4 * np.sqrt(max(1, n_vectors)))))
+
+    @staticmethod
+    def nearest(centroids: np.ndarray, vecs: np.ndarray) -> np.ndarray:
+        """Index of the nearest centroid of each vector."""
+        c_sq = np.einsum("ij,ij->i", centroids, centroids)
+        list_ids = np.empty(len(vecs), dtype=np.int64)
+        rows = max(1, min(_QUERY_BLOCK, _ASSIGN_BLOCK_ELEMS // max(1, len(centroids))))
+        for s in range(0, len(vecs), rows):
+            block = vecs[s:s + rows]
+            list_ids[s:s + len(block)] = (c_sq[None, :] - 2.0 * block @ centroids.T).argmin(axis=1)
+        return list_ids
+
+    @staticmethod
+    def assign(centroids: np.ndarray, vecs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest centroid of each vector and the (exact) distance to it."""
+        vecs = np.asarray(vecs, dtype=np.float32)
+        list_ids = IVFCandidates.nearest(centroids, vecs)
+        return list_ids, np.linalg.norm(vecs - centroids[list_ids], axis=1)
+
+    def _distances(self, query_vecs: np.ndarray, ids: np.ndarray) -> np.ndarray:
+        q = np.asarray(query_vecs, dtype=np.float32)
+        q_sq = np.einsum("ij,ij->i", q, q)
+        d_sq = q_sq[:, None] + self._c_sq[None, ids] - 2.0 * q @ self.centroids[ids].T
+        return np.sqrt(np.maximum(d_sq, 0.0))
+
+    def _hit(self, d: np.ndarray, ids: np.ndarray, tau: float) -> np.ndarray:
+        hit = d <= self.radii[None, ids] + tau + _RADIUS_EPS
+        if 0 < self.nprobe < hit.shape[1]:
+            # keep each query's nprobe nearest reachable lists
+            ranked = np.where(hit, d, np.inf)
+            nearest = np.argpartition(ranked, self.nprobe - 1, axis=1)[:, :self.nprobe]
+            probe = np.zeros_like(hit)
+            np.put_along_axis(probe, nearest, True, axis=1)
+            hit &= probe
+        return hit
+
+    def search(self, query_vecs, query_dists, tau):
+        ids = np.arange(len(self.centroids))
+        reached = np.zeros(len(ids), dtype=bool)
+        for s in range(0, len(query_vecs), _QUERY_BLOCK):
+            d = self._distances(query_vecs[s:s + _QUERY_BLOCK], ids)
+            reached |= self._hit(d, ids, tau).any(axis=0)
+        visited = len(ids) if len(query_vecs) else 0
+        return self.lists.gather(ids[reached]), visited
+
+    def cell_masks(self, query_vecs, query_dists, cells, tau):
+        ids = np.asarray(cells, dtype=np.int64)
+        if 0 < self.nprobe < len(self.centroids):
+            # probes are ranked among all lists, as in search()
+            all_ids = np.arange(len(self.centroids))
+            hit = np.empty((len(query_vecs), len(ids)), dtype=bool)
+            d = np.empty((len(query_vecs), len(ids)), dtype=np.float32)
+            for s in range(0, len(query_vecs), _QUERY_BLOCK):
+                d_all = self._distances(query_vecs[s:s + _QUERY_BLOCK], all_ids)
+                hit[s:s + len(d_all)] = self._hit(d_all, all_ids, tau)[:, ids]
+                d[s:s + len(d_all)] = d_all[:, ids]
+        else:
+            d = self._distances(query_vecs, ids)
+            hit = self._hit(d, ids, tau)
+        accept = d + self.radii[None, ids] + _RADIUS_EPS <= tau
+        return hit, accept & hit
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "centroids": self.centroids,
+            "radii": self.radii,
+            "cells": self.lists.cells,
+            "offsets": self.lists.offsets,
+            "col_ids": self.lists.col_ids,
+            "row_ids": self.lists.row_ids,
+        }
+
+
+def build_ivf_lists(
+    centroids: np.ndarray,
+    columns: List[Tuple],
+    list_ids: np.ndarray,         # (N,) list of every stored vector, in storage order
+    col_ids: np.ndarray,          # (N,)
+    row_ids: np.ndarray,          # (N,)
+    center_dists: np.ndarray,     # (N,) distance to its centroid
+    nprobe: int = 0,
+) -> IVFCandidates:
+    """Assemble IVF lists and radii from per-vector assignments."""
+    radii = np.zeros(len(centroids), dtype=np.float32)
+    if len(list_ids):
+        np.maximum.at(radii, list_ids, np.asarray(center_dists, dtype=np.float32))
+    lists = InvertedIndex.from_postings(list_ids, col_ids, row_ids, columns)
+    return IVFCandidates(centroids, radii, lists, nprobe)
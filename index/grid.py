@@ -7,6 +7,14 @@ class HierarchicalGrid:
     """
     Hierarchical grid partitioning of pivot-space distances.
     Each vector is assigned a sequence of cell IDs across grid levels.
+
+    Cell IDs are packed into one int64 code per level: the bin index of
+    pivot `dim` at level l (range -1 .. 2**l, see np.digitize) is stored,
+    offset by one, in bits [dim * (l + 1), (dim + 1) * (l + 1)).
+
+    Level l splits each pivot's distances into 2**l bins, either of equal
+    width (fit_range) or of equal depth (fit_quantiles). Either way every
+    level's edges contain the coarser level's, so cells nest.
     """
 
     def __init__(self, levels: int = 2):
@@ -17,25 +25,150 @@ class HierarchicalGrid:
         self.levels = levels
         self.bin_edges: List[np.ndarray] | None = None
 
-    def fit(self, distances: np.ndarray):
+    def fit(self, distances: np.ndarray, bins: str = "uniform"):
         """
         Fit grid bin edges based on observed distances.
-        
+
         Args:
             distances: (n, k) matrix of pivot distances.
+            bins: "uniform" (equal width) or "quantile" (equal depth).
         """
-        n, k = distances.shape
+        if bins == "quantile":
+            self.fit_quantiles(distances)
+        elif bins == "uniform":
+            self.fit_range(distances.min(axis=0), distances.max(axis=0))
+        else:
+            raise ValueError(f"Unknown grid bins: {bins}")
+
+    @staticmethod
+    def max_levels(k: int) -> int:
+        """Most levels whose cell codes fit in an int64 for k pivots."""
+        return 63 // k - 1
+
+    def _check_bits(self, k: int):
+        if self.levels > self.max_levels(k):
+            raise ValueError(
+                f"{k} pivots x {self.levels} levels do not fit in an int64 cell code."
+            )
+
+    def fit_quantiles(
+        self,
+        distances: np.ndarray,
+        col_min: np.ndarray | None = None,
+        col_max: np.ndarray | None = None,
+    ):
+        """
+        Equi-depth bin edges: level l cuts each pivot's distances at the
+        i / 2**l quantiles, so every bin of a level holds about the same
+        number of vectors however skewed the distances are.
+
+        Args:
+            distances: (n, k) pivot distances, e.g. of a sample.
+            col_min, col_max: (k,) range of all the data, when `distances`
+                is a sample; the outermost edges are widened to it.
+        """
+        distances = np.asarray(distances, dtype=np.float64)
+        k = distances.shape[1]
+        self._check_bits(k)
+        # i / 2**l are exact binary fractions, so finer levels reproduce the coarser edges
+        finest = np.quantile(distances, np.linspace(0.0, 1.0, 2**self.levels + 1), axis=0)  # (2**L + 1, k)
+        if col_min is not None:
+            finest[0] = np.minimum(finest[0], col_min)
+        if col_max is not None:
+            finest[-1] = np.maximum(finest[-1], col_max)
+        self.bin_edges = [
+            [finest[::2 ** (self.levels - l), dim] for l in range(1, self.levels + 1)]
+            for dim in range(k)
+        ]
+
+    def fit_range(self, col_min: np.ndarray, col_max: np.ndarray):
+        """
+        Fit grid bin edges from per-pivot distance ranges, e.g. min/max
+        tracked while streaming over the data.
+
+        Args:
+            col_min, col_max: (k,) smallest/largest distance to each pivot.
+        """
+        k = len(col_min)
+        self._check_bits(k)
         self.bin_edges = []
 
         for dim in range(k):
-            col = distances[:, dim]
             edges_per_level = []
             # Create increasingly finer partitions at each level
             for l in range(1, self.levels + 1):
-                bins = np.linspace(col.min(), col.max(), 2**l + 1)  # uniform bins
+                bins = np.linspace(col_min[dim], col_max[dim], 2**l + 1)  # uniform bins
                 edges_per_level.append(bins)
             self.bin_edges.append(edges_per_level)
 
+    @staticmethod
+    def _bits(level: int) -> int:
+        # level is 0-based here; level l+1 has 2**(l+1) + 2 possible bin indices
+        return level + 2
+
+    def _level(self, level: int) -> int:
+        return level % self.levels
+
+    def assign(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Bin indices of every row, per level and pivot.
+
+        Args:
+            distances: (n, k) matrix of pivot distances.
+        Returns:
+            cells: (n, levels, k) int64 array of bin indices.
+        """
+        if self.bin_edges is None:
+            raise RuntimeError("Grid has not been fitted yet.")
+
+        distances = np.asarray(distances)
+        n, k = distances.shape
+        cells = np.empty((n, self.levels, k), dtype=np.int64)
+        for l in range(self.levels):
+            for dim in range(k):
+                edges = np.asarray(self.bin_edges[dim][l])
+                # same as np.digitize(x, edges) - 1 for increasing edges
+                cells[:, l, dim] = np.searchsorted(edges, distances[:, dim], side="right") - 1
+        return cells
+
+    def transform_codes(self, distances: np.ndarray) -> np.ndarray:
+        """
+        Assign each row to hierarchical grid cells as packed codes.
+
+        Args:
+            distances: (n, k) matrix of pivot distances.
+        Returns:
+            codes: (n, levels) int64 array, one packed cell code per level.
+        """
+        cells = self.assign(distances)
+        codes = np.zeros(cells.shape[:2], dtype=np.int64)
+        for l in range(self.levels):
+            codes[:, l] = self.encode(cells[:, l, :], level=l)
+        return codes
+
+    def encode(self, cells: np.ndarray, level: int = -1) -> np.ndarray:
+        """Pack (m, k) bin indices of one level into (m,) int64 codes."""
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, len(self.bin_edges))
+        bits = self._bits(self._level(level))
+        codes = np.zeros(len(cells), dtype=np.int64)
+        for dim in range(cells.shape[1]):
+            codes |= (cells[:, dim] + 1) << (dim * bits)
+        return codes
+
+    def decode(self, codes: np.ndarray, level: int = -1) -> np.ndarray:
+        """Unpack (m,) int64 codes of one level into (m, k) bin indices."""
+        codes = np.asarray(codes, dtype=np.int64).reshape(-1)
+        bits = self._bits(self._level(level))
+        mask = (1 << bits) - 1
+        cells = np.empty((len(codes), len(self.bin_edges)), dtype=np.int64)
+        for dim in range(cells.shape[1]):
+            cells[:, dim] = ((codes >> (dim * bits)) & mask) - 1
+        return cells
+
+    def to_tuples(self, codes: np.ndarray, level: int = -1) -> List[Tuple[int, ...]]:
+        """Decode packed codes back to tuple cell IDs."""
+        return [tuple(c) for c in self.decode(codes, level).tolist()]
+
     def transform(self, distances: np.ndarray) -> List[List[Tuple[int, ...]]]:
         """
         Assign each row to hierarchical grid cells.
@@ -46,23 +179,76 @@ class HierarchicalGrid:
             cells: list of length n, each entry is a list of cell IDs across levels.
                    Each cell ID is a tuple of bin indices (per pivot).
         """
+        return [[tuple(c) for c in row] for row in self.assign(distances).tolist()]
+
+    def max_occupancy(self, distances: np.ndarray) -> int:
+        """Vectors in the fullest leaf cell."""
+        if len(distances) == 0:
+            return 0
+        return int(np.unique(self.transform_codes(distances)[:, -1], return_counts=True)[1].max())
+
+    def cell_bounds(self, codes: np.ndarray, level: int = -1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pivot-distance bounds of grid cells.
+
+        Args:
+            codes: (m,) packed cell codes.
+            level: grid level the codes belong to (default: leaf level).
+        Returns:
+            lo, hi: (m, k) arrays; a vector in the cell has lo <= d(x, p) <= hi
+                    for every pivot p. Out-of-range bins are unbounded.
+        """
         if self.bin_edges is None:
             raise RuntimeError("Grid has not been fitted yet.")
 
-        n, k = distances.shape
-        all_cells: List[List[Tuple[int, ...]]] = []
-
-        for i in range(n):
-            row = distances[i]
-            row_cells = []
-            # At each level, assign bin indices
-            for l in range(self.levels):
-                bin_indices = []
-                for dim in range(k):
-                    edges = self.bin_edges[dim][l]
-                    idx = np.digitize(row[dim], edges) - 1  # bin index
-                    bin_indices.append(idx)
-                row_cells.append(tuple(bin_indices))
-            all_cells.append(row_cells)
-
-        return all_cells
+        cells = self.decode(codes, level)
+        lo = np.empty(cells.shape, dtype=np.float64)
+        hi = np.empty(cells.shape, dtype=np.float64)
+        for dim in range(cells.shape[1]):
+            edges = np.asarray(self.bin_edges[dim][level], dtype=np.float64)
+            # bin i covers [edges[i], edges[i+1]); digitize also yields -1 and len(edges)-1
+            padded = np.concatenate(([-np.inf], edges, [np.inf]))
+            idx = np.clip(cells[:, dim], -1, len(edges) - 1)
+            lo[:, dim] = padded[idx + 1]
+            hi[:, dim] = padded[idx + 2]
+        return lo, hi
+
+
+def fit_grid(
+    distances: np.ndarray,
+    levels: int,
+    bins: str = "quantile",
+    cell_cap: int = 0,
+    scale: float = 1.0,
+    col_min: np.ndarray | None = None,
+    col_max: np.ndarray | None = None,
+) -> HierarchicalGrid:
+    """
+    Fit a grid, adding levels while its fullest leaf cell holds more than
+    `cell_cap` vectors (0: no cap), cell codes still fit in an int64 and
+    the extra level still shrinks that cell (duplicates never split).
+
+    Args:
+        distances: (n, k) pivot distances of the data or of a sample of it
+        scale: rows represented by each row of `distances` (data / sample size)
+        col_min, col_max: (k,) range of all the data when `distances` is a sample
+    """
+    k = distances.shape[1]
+    fullest = None
+    while True:
+        grid = HierarchicalGrid(levels=levels)
+        if bins == "quantile":
+            grid.fit_quantiles(distances, col_min, col_max)
+        elif col_min is not None:
+            grid.fit_range(np.minimum(distances.min(axis=0), col_min), np.maximum(distances.max(axis=0), col_max))
+        else:
+            grid.fit(distances, bins)
+        if cell_cap <= 0:
+            return grid
+        occupancy = grid.max_occupancy(distances)
+        if fullest is not None and occupancy >= fullest:
+            return previous
+        if levels >= grid.max_levels(k) or occupancy * scale <= cell_cap:
+            return grid
+        previous, fullest = grid, occupancy
+        levels += 1
@@ -0,0 +1,181 @@
+from __future__ import annotations
+import numpy as np
+from typing import Dict, List, Tuple
+
+from index.pivots import PIVOT_BOUND_EPS
+
+
+class GridTree:
+    """
+    Multi-level grid index over HierarchicalGrid packed cell codes.
+
+    Level-1 cells contain their level-2 children and so on down to the
+    leaves (grid levels are nested: every finer edge set contains the
+    coarser one). Each cell keeps the number of vectors below it and the
+    tight min/max of their pivot distances, so a query can prune or accept
+    whole subtrees before descending.
+    """
+
+    def __init__(self, levels: int):
+        self.levels = levels
+        # per level: cell code -> [count, lo, hi, parent cell code]
+        self._nodes: List[Dict[int, list]] = [{} for _ in range(levels)]
+        # finalized arrays, per level
+        self.cells: List[np.ndarray] = []
+        self.counts: List[np.ndarray] = []
+        self.lo: List[np.ndarray] = []
+        self.hi: List[np.ndarray] = []
+        self.parents: List[np.ndarray] = []
+        self._leaf_pos: Dict[int, int] = {}
+
+    def add(self, codes: np.ndarray, dists: np.ndarray):
+        """
+        Add one column's rows to the tree.
+
+        Args:
+            codes: (n, levels) output of HierarchicalGrid.transform_codes.
+            dists: (n, k) pivot distances of the same rows.
+        """
+        if len(codes) == 0:
+            return
+        if self.cells and not any(self._nodes):
+            self._thaw()
+        codes = np.asarray(codes, dtype=np.int64)
+        dists = np.asarray(dists, dtype=np.float64)
+
+        for l in range(self.levels):
+            uniq, first, inverse = np.unique(codes[:, l], return_index=True, return_inverse=True)
+            counts = np.bincount(inverse, minlength=len(uniq))
+            lo = np.full((len(uniq), dists.shape[1]), np.inf)
+            hi = np.full((len(uniq), dists.shape[1]), -np.inf)
+            np.minimum.at(lo, inverse, dists)
+            np.maximum.at(hi, inverse, dists)
+
+            nodes = self._nodes[l]
+            for i, cell in enumerate(uniq.tolist()):
+                node = nodes.get(cell)
+                if node is None:
+                    parent = int(codes[first[i], l - 1]) if l else None
+                    nodes[cell] = [int(counts[i]), lo[i], hi[i], parent]
+                else:
+                    node[0] += int(counts[i])
+                    np.minimum(node[1], lo[i], out=node[1])
+                    np.maximum(node[2], hi[i], out=node[2])
+
+    def _thaw(self):
+        """Rebuild the mutable nodes of a finalized tree so more rows can be added."""
+        for l in range(self.levels):
+            parents = self.cells[l - 1][self.parents[l]].tolist() if l else [None] * len(self.cells[l])
+            self._nodes[l] = {
+                cell: [count, lo.copy(), hi.copy(), parent]
+                for cell, count, lo, hi, parent in zip(
+                    self.cells[l].tolist(), self.counts[l].tolist(),
+                    np.asarray(self.lo[l], dtype=np.float64), np.asarray(self.hi[l], dtype=np.float64), parents,
+                )
+            }
+
+    def finalize(self):
+        """Freeze the tree into per-level arrays used by search()."""
+        self.cells, self.counts, self.lo, self.hi, self.parents = [], [], [], [], []
+        prev_pos: Dict[int, int] = {}
+        for l in range(self.levels):
+            keys = sorted(self._nodes[l])
+            nodes = [self._nodes[l][c] for c in keys]
+            k = len(nodes[0][1]) if nodes else 0
+            self.cells.append(np.array(keys, dtype=np.int64))
+            self.counts.append(np.array([n[0] for n in nodes], dtype=np.int64))
+            self.lo.append(np.array([n[1] for n in nodes]).reshape(-1, k))
+            self.hi.append(np.array([n[2] for n in nodes]).reshape(-1, k))
+            self.parents.append(np.array([prev_pos[n[3]] if l else -1 for n in nodes], dtype=np.int64))
+            prev_pos = {c: i for i, c in enumerate(keys)}
+        self._leaf_pos = prev_pos
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Flatten the finalized tree for np.savez."""
+        out = {"levels": np.array(self.levels)}
+        for l in range(self.levels):
+            out[f"cells_{l}"] = self.cells[l]
+            out[f"counts_{l}"] = self.counts[l]
+            out[f"lo_{l}"] = self.lo[l]
+            out[f"hi_{l}"] = self.hi[l]
+            out[f"parents_{l}"] = self.parents[l]
+        return out
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "GridTree":
+        """Rebuild a finalized tree from to_arrays() output (or a loaded npz)."""
+        tree = cls(levels=int(arrays["levels"]))
+        for l in range(tree.levels):
+            tree.cells.append(np.asarray(arrays[f"cells_{l}"]))
+            tree.counts.append(np.asarray(arrays[f"counts_{l}"]))
+            tree.lo.append(np.asarray(arrays[f"lo_{l}"]))
+            tree.hi.append(np.asarray(arrays[f"hi_{l}"]))
+            tree.parents.append(np.asarray(arrays[f"parents_{l}"]))
+        tree._leaf_pos = {c: i for i, c in enumerate(tree.cells[-1].tolist())}
+        return tree
+
+    def leaf_bounds(self, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Tight pivot-distance bounds of leaf cells (unbounded if unknown)."""
+        codes = np.asarray(codes, dtype=np.int64).reshape(-1)
+        k = self.lo[-1].shape[1]
+        lo = np.full((len(codes), k), -np.inf)
+        hi = np.full((len(codes), k), np.inf)
+        for i, cell in enumerate(codes.tolist()):
+            pos = self._leaf_pos.get(cell)
+            if pos is not None:
+                lo[i] = self.lo[-1][pos]
+                hi[i] = self.hi[-1][pos]
+        return lo, hi
+
+    def search(self, query_dists: np.ndarray, tau: float) -> Tuple[List[int], int]:
+        """
+        Top-down τ-ball range query.
+
+        A subtree is pruned for a query vector once its bounds miss the
+        query's [d(q, p) - τ, d(q, p) + τ] rectangle, and accepted (no more
+        bound checks below it) once d(q, p) + hi <= τ for some pivot.
+
+        Args:
+            query_dists: (n_q, k) pivot distances of the query vectors.
+            tau: distance threshold.
+        Returns:
+            leaves: leaf cell codes reached by at least one query vector.
+            visited: number of cells whose bounds were evaluated.
+        """
+        query_dists = np.asarray(query_dists, dtype=np.float64)
+        n_q = len(query_dists)
+        if n_q == 0 or not self.cells or len(self.cells[0]) == 0:
+            return [], 0
+
+        visited = 0
+        idx = np.arange(len(self.cells[0]))
+        undecided = np.ones((n_q, len(idx)), dtype=bool)
+        accepted = np.zeros((n_q, len(idx)), dtype=bool)
+
+        for l in range(self.levels):
+            if l:
+                # expand children of cells still reached by some query vector
+                pos = np.full(len(self.cells[l - 1]), -1, dtype=np.int64)
+                pos[idx] = np.arange(len(idx))
+                child_pos = pos[self.parents[l]]
+                idx = np.flatnonzero(child_pos >= 0)
+                undecided = undecided[:, child_pos[idx]]
+                accepted = accepted[:, child_pos[idx]]
+
+            visited += len(idx)
+            lo, hi = self.lo[l][idx], self.hi[l][idx]
+            hit = np.ones(undecided.shape, dtype=bool)
+            accept = np.zeros(undecided.shape, dtype=bool)
+            slack = tau + PIVOT_BOUND_EPS
+            for p in range(query_dists.shape[1]):
+                qd = query_dists[:, p, None]
+                hit &= (lo[None, :, p] <= qd + slack) & (hi[None, :, p] >= qd - slack)
+                accept |= qd + hi[None, :, p] <= tau - PIVOT_BOUND_EPS
+
+            accepted |= undecided & hit & accept
+            undecided &= hit & ~accept
+
+            keep = (undecided | accepted).any(axis=0)
+            idx, undecided, accepted = idx[keep], undecided[:, keep], accepted[:, keep]
+
+        return self.cells[-1][idx].tolist(), visited
@@ -1,7 +1,7 @@
 # pexeso/index/index.py
 from __future__ import annotations
 import numpy as np
-from typing import Dict, Tuple
+from typing import Dict
 
 from index.pivots import PivotSelector
 from index.grid import HierarchicalGrid
@@ -26,7 +26,7 @@ class PEXESOIndex:
     def fit(self, embeddings: np.ndarray):
         """Fit pivots and hierarchical grid globally."""
         pivots = self.selector.fit(embeddings)
-        self.grid.fit(embeddings)
+        self.grid.fit(self.selector.transform(embeddings))
         self.fitted = True
         return pivots
 
@@ -43,15 +43,14 @@ class PEXESOIndex:
             raise RuntimeError("PEXESOIndex must be fitted with fit() first.")
 
         dists = self.selector.transform(vectors)
-        cells = self.grid.transform(dists)
-        self.inv_index.add(cells, table, column)
+        codes = self.grid.transform_codes(dists)
+        self.inv_index.add(codes[:, -1], table, column)
 
-    def lookup(self, vector: np.ndarray) -> Dict[Tuple[int, ...], list]:
+    def lookup(self, vector: np.ndarray) -> Dict[int, list]:
         """
         Given a single embedding vector, return candidate postings
-        from its grid cell.
+        from its leaf grid cell.
         """
         dists = self.selector.transform(vector.reshape(1, -1))
-        cells = self.grid.transform(dists)[0]
-        postings = {cell: self.inv_index.query(cell) for cell in cells}
-        return postings
+        cell = int(self.grid.transform_codes(dists)[0, -1])
+        return {cell: self.inv_index.query(cell)}
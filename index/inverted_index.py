@@ -1,37 +1,234 @@
 # pexeso/index/inverted_index.py
 from __future__ import annotations
-from collections import defaultdict
-from typing import Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Sequence, Tuple
 
 import numpy as np
 from utils.types import TableId, ColumnId
 
 
+@dataclass
+class PostingsBlock:
+    """
+    Postings of a set of cells in array form.
+    Posting i belongs to cells[cell_pos[i]] and points at row row_ids[i]
+    of column columns[col_ids[i]].
+    """
+    cells: np.ndarray                        # (m,) int64 cell codes
+    cell_pos: np.ndarray                     # (p,) int64
+    col_ids: np.ndarray                      # (p,) int32
+    row_ids: np.ndarray                      # (p,) int32
+    columns: List[Tuple[TableId, ColumnId]]  # catalog: col_id -> (table, column)
+
+    def __len__(self):
+        return len(self.row_ids)
+
+    @classmethod
+    def from_dict(
+        cls,
+        postings: Dict[int, List[Tuple[TableId, ColumnId, int]]],
+    ) -> "PostingsBlock":
+        """Convert {cell: [(table, column, row_id), ...]} into array form."""
+        catalog: Dict[Tuple[TableId, ColumnId], int] = {}
+        cell_pos, col_ids, row_ids = [], [], []
+        for pos, plist in enumerate(postings.values()):
+            for (table, col, row_id) in plist:
+                cell_pos.append(pos)
+                col_ids.append(catalog.setdefault((table, col), len(catalog)))
+                row_ids.append(row_id)
+        return cls(
+            cells=np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+            cell_pos=np.asarray(cell_pos, dtype=np.int64),
+            col_ids=np.asarray(col_ids, dtype=np.int32),
+            row_ids=np.asarray(row_ids, dtype=np.int32),
+            columns=list(catalog),
+        )
+
+
 class InvertedIndex:
     """
     Inverted index mapping grid cell IDs → postings list.
     Each posting is (table_id, column_id, row_id).
+
+    Postings are stored CSR-style: sorted distinct cell codes, an offsets
+    array (postings of cells[i] are [offsets[i], offsets[i+1])), and
+    parallel int32 arrays of column ids and row ids. Column ids index the
+    catalog `columns`. Cell IDs are packed int64 codes
+    (HierarchicalGrid.transform_codes).
     """
 
     def __init__(self):
-        # keys = cell_id (tuple of ints)
-        # values = list of postings
-        self.index: Dict[Tuple[int, ...], List[Tuple[TableId, ColumnId, int]]] = defaultdict(list)
+        self.columns: List[Tuple[TableId, ColumnId]] = []
+        self._catalog: Dict[Tuple[TableId, ColumnId], int] = {}
+
+        self._cells = np.empty(0, dtype=np.int64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._col_ids = np.empty(0, dtype=np.int32)
+        self._row_ids = np.empty(0, dtype=np.int32)
+
+        # columns added since the last compaction: (cell codes, col_id)
+        self._pending: List[Tuple[np.ndarray, int]] = []
+
+    @property
+    def cells(self) -> np.ndarray:
+        self._compact()
+        return self._cells
+
+    @property
+    def offsets(self) -> np.ndarray:
+        self._compact()
+        return self._offsets
+
+    @property
+    def col_ids(self) -> np.ndarray:
+        self._compact()
+        return self._col_ids
 
-    def add(self, cells: List[Tuple[int, ...]], table: TableId, column: ColumnId):
+    @property
+    def row_ids(self) -> np.ndarray:
+        self._compact()
+        return self._row_ids
+
+    @classmethod
+    def from_postings(
+        cls,
+        cells: np.ndarray,
+        col_ids: np.ndarray,
+        row_ids: np.ndarray,
+        columns: List[Tuple[TableId, ColumnId]],
+    ) -> "InvertedIndex":
+        """Build an index from flat posting arrays (one entry per posting)."""
+        inv = cls()
+        inv.columns = list(columns)
+        inv._catalog = {key: i for i, key in enumerate(inv.columns)}
+        inv._build(
+            np.asarray(cells, dtype=np.int64),
+            np.asarray(col_ids, dtype=np.int32),
+            np.asarray(row_ids, dtype=np.int32),
+        )
+        return inv
+
+    @classmethod
+    def from_csr(
+        cls,
+        cells: np.ndarray,
+        offsets: np.ndarray,
+        col_ids: np.ndarray,
+        row_ids: np.ndarray,
+        columns: List[Tuple[TableId, ColumnId]],
+    ) -> "InvertedIndex":
+        """Wrap existing CSR arrays (e.g. memory maps) without copying or sorting."""
+        inv = cls()
+        inv.columns = list(columns)
+        inv._catalog = {key: i for i, key in enumerate(inv.columns)}
+        inv._cells, inv._offsets = cells, offsets
+        inv._col_ids, inv._row_ids = col_ids, row_ids
+        return inv
+
+    def add(self, cells: Sequence[int] | np.ndarray, table: TableId, column: ColumnId):
         """
         Add all rows from one column into the inverted index.
         Args:
-            cells: list of grid cell IDs for each row.
+            cells: grid cell code for each row (e.g. leaf column of transform_codes).
             table: table identifier
             column: column identifier
         """
-        for row_id, cell in enumerate(cells):
-            self.index[cell].append((table, column, row_id))
+        key = (table, column)
+        col_id = self._catalog.get(key)
+        if col_id is None:
+            col_id = self._catalog[key] = len(self.columns)
+            self.columns.append(key)
+        self._pending.append((np.asarray(cells, dtype=np.int64).reshape(-1), col_id))
+
+    def _compact(self):
+        """Merge pending columns into the CSR arrays."""
+        if not self._pending:
+            return
+        cells = [np.repeat(self._cells, np.diff(self._offsets))]
+        col_ids = [self._col_ids]
+        row_ids = [self._row_ids]
+        for codes, col_id in self._pending:
+            cells.append(codes)
+            col_ids.append(np.full(len(codes), col_id, dtype=np.int32))
+            row_ids.append(np.arange(len(codes), dtype=np.int32))
+        self._pending = []
+        self._build(np.concatenate(cells), np.concatenate(col_ids), np.concatenate(row_ids))
+
+    def _build(self, cells: np.ndarray, col_ids: np.ndarray, row_ids: np.ndarray):
+        # stable sort keeps insertion order of postings within a cell
+        order = np.argsort(cells, kind="stable")
+        cells = cells[order]
+        self._col_ids = col_ids[order]
+        self._row_ids = row_ids[order]
+        self._cells, starts = np.unique(cells, return_index=True)
+        self._offsets = np.append(starts, len(cells)).astype(np.int64)
+
+    def _positions(self, cells: np.ndarray) -> np.ndarray:
+        """Index into self.cells of each requested cell, -1 if absent."""
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1)
+        if len(self.cells) == 0:
+            return np.full(len(cells), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.cells, cells), len(self.cells) - 1)
+        return np.where(self.cells[pos] == cells, pos, -1)
+
+    def gather(self, cells: Sequence[int] | np.ndarray) -> PostingsBlock:
+        """Postings of several cells at once, in array form (absent cells are dropped)."""
+        pos = self._positions(cells)
+        pos = pos[pos >= 0]
+        starts, ends = self.offsets[pos], self.offsets[pos + 1]
+        lengths = ends - starts
+        cell_pos = np.repeat(np.arange(len(pos)), lengths)
+        # posting indices: starts[i] .. ends[i] for each cell, concatenated
+        idx = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        idx += np.repeat(starts, lengths)
+        return PostingsBlock(
+            cells=self.cells[pos],
+            cell_pos=cell_pos,
+            col_ids=self.col_ids[idx],
+            row_ids=self.row_ids[idx],
+            columns=self.columns,
+        )
 
-    def query(self, cell: Tuple[int, ...]) -> List[Tuple[TableId, ColumnId, int]]:
+    def query(self, cell: int) -> List[Tuple[TableId, ColumnId, int]]:
         """Return postings for a given cell ID."""
-        return self.index.get(cell, [])
+        pos = self._positions([cell])[0]
+        if pos < 0:
+            return []
+        s, e = self.offsets[pos], self.offsets[pos + 1]
+        return [
+            (*self.columns[c], r)
+            for c, r in zip(self.col_ids[s:e].tolist(), self.row_ids[s:e].tolist())
+        ]
+
+    def items(self) -> Iterator[Tuple[int, List[Tuple[TableId, ColumnId, int]]]]:
+        """Iterate (cell, postings) pairs in cell order."""
+        for cell in self.cells.tolist():
+            yield cell, self.query(cell)
+
+    def length_stats(self) -> Dict[str, float]:
+        """
+        Distribution of posting list lengths: a few very long lists mean
+        skewed cells, which blocking pays for on every query hitting them.
+
+        Returns:
+            {"cells", "mean", "max", "p99", "gini"}; gini is 0 for equal
+            lengths and tends to 1 when one cell holds everything.
+        """
+        lengths = np.sort(np.diff(self.offsets))
+        if len(lengths) == 0 or lengths.sum() == 0:
+            return {"cells": 0, "mean": 0.0, "max": 0, "p99": 0.0, "gini": 0.0}
+        n = len(lengths)
+        gini = 2.0 * np.dot(np.arange(1, n + 1), lengths) / (n * lengths.sum()) - (n + 1) / n
+        return {
+            "cells": n,
+            "mean": float(lengths.mean()),
+            "max": int(lengths[-1]),
+            "p99": float(np.percentile(lengths, 99)),
+            "gini": float(gini),
+        }
+
+    def __contains__(self, cell: int) -> bool:
+        return bool(self._positions([cell])[0] >= 0)
 
     def __len__(self):
-        return sum(len(v) for v in self.index.values())
+        return int(self._offsets[-1]) + sum(len(codes) for codes, _ in self._pending)
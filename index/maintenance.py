@@ -0,0 +1,308 @@
+# pexeso/index/maintenance.py
+"""
+Incremental maintenance of an index directory.
+
+- IndexUpdater appends columns under the frozen pivots and grid and
+  tombstones removed ones. Embeddings and pivot distances are appended to
+  their files in place; the (16 bytes per row) postings arrays are merged
+  and rewritten.
+- compact_index drops tombstoned rows and rebuilds the grid tree bounds.
+- Both write a new version of the index directory and publish it in one
+  step (index.storage), so readers never see a half-applied commit.
+- IVF lists, when the index has them, follow both: new vectors go to the
+  list of their nearest (frozen) centroid and list radii only grow.
+  Embedding codes likewise use the frozen quantizer.
+- Column summaries (index.summaries) are appended with each column and
+  written for every column of an index that predates them.
+- index_drift measures how far data added since the last full fit has
+  moved away from the distribution the pivots and grid were fitted on.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from index.candidates import IVFCandidates
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex
+from index.storage import IndexReader, IndexWriter, append_codes, append_summary, write_ivf, write_summaries
+from index.summaries import SUMMARY_ARRAYS
+from utils.config import Config
+from utils.types import TableId, ColumnId
+
+
+def _catalog(columns: List[dict]) -> List[tuple]:
+    return [(TableId(m["table"]), ColumnId(m["column"])) for m in columns]
+
+
+class IndexUpdater:
+    """Applies table additions and removals to an existing index directory."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # the writer lock is taken first, so no other commit lands after the version read here
+        self.writer = IndexWriter.reopen(path)
+        self.reader = IndexReader(path)
+        self.selector = self.reader.selector()
+        self.grid = self.reader.grid()
+        self.tree = self.reader.grid_tree()
+        self.columns: List[dict] = [dict(m) for m in self.reader.manifest["columns"]]
+        self.offsets: List[int] = self.reader.array("column_offsets").tolist()
+        # postings of columns added in this session
+        self._cells: List[np.ndarray] = []
+        self._col_ids: List[np.ndarray] = []
+        self.ivf = self.reader.ivf() if self.reader.has("ivf_centroids") else None
+        if self.ivf is not None:
+            self.ivf.radii = np.array(self.ivf.radii)  # grown in place by add_column
+        self._lists: List[np.ndarray] = []
+        self.quantizer = self.reader.quantizer()
+        # indexes written before column summaries get them at commit
+        self._summaries = all(self.reader.has(name) for name in SUMMARY_ARRAYS)
+
+    def abandon(self):
+        """Drop the changes made so far and release the index for other writers."""
+        self.writer.abandon()
+
+    def remove_table(self, table: str) -> int:
+        """Tombstone every live column of a table; returns the number of columns removed."""
+        removed = 0
+        for m in self.columns:
+            if m["table"] == table and not m.get("deleted"):
+                m["deleted"] = True
+                removed += 1
+        return removed
+
+    def add_column(self, table: str, column: str, vecs: np.ndarray, counts: np.ndarray | None = None):
+        """Append one column, assigning it to cells of the frozen grid."""
+        # distances and IVF lists of the rows as stored (after any float16 rounding)
+        stored = np.asarray(vecs, dtype=np.float32).astype(self.reader.manifest["embedding_dtype"])
+        dists = self.selector.transform(stored)
+        codes = self.grid.transform_codes(dists)
+        self.writer.append("embeddings", stored)
+        if self.quantizer is not None:
+            append_codes(self.writer, self.quantizer, stored)
+        self.writer.append("pivot_dists", dists)
+        if self._summaries:
+            append_summary(self.writer, stored, dists)
+        if "value_counts" not in self.writer.arrays:
+            # index written before value counts were stored: one row per vector
+            self.writer.append("value_counts", np.ones(self.offsets[-1], dtype=np.int32))
+        self.writer.append("value_counts", np.ones(len(vecs), dtype=np.int32) if counts is None
+                           else np.asarray(counts, dtype=np.int32))
+        self.tree.add(codes, dists)
+        if self.ivf is not None:
+            list_ids, center_dists = IVFCandidates.assign(self.ivf.centroids, stored)
+            self._lists.append(list_ids)
+            if len(vecs):
+                np.maximum.at(self.ivf.radii, list_ids, center_dists)
+
+        self._cells.append(codes[:, -1])
+        self._col_ids.append(np.full(len(vecs), len(self.columns), dtype=np.int32))
+        self.columns.append({"table": table, "column": column})
+        self.offsets.append(self.offsets[-1] + len(vecs))
+
+    def _merge(self, inv: InvertedIndex, new_cells: List[np.ndarray], live: np.ndarray) -> InvertedIndex:
+        """Postings of `inv` plus those of the added columns, without tombstoned columns."""
+        cells = np.concatenate([np.repeat(inv.cells, np.diff(inv.offsets)), *new_cells])
+        col_ids = np.concatenate([inv.col_ids, *self._col_ids]).astype(np.int32)
+        row_ids = np.concatenate([
+            inv.row_ids,
+            *[np.arange(len(c), dtype=np.int32) for c in new_cells],
+        ]).astype(np.int32)
+        keep = live[col_ids] if len(col_ids) else np.zeros(0, dtype=bool)
+        return InvertedIndex.from_postings(cells[keep], col_ids[keep], row_ids[keep], _catalog(self.columns))
+
+    def commit(self, sources: Dict[str, dict]):
+        """Merge postings, drop postings of tombstoned columns and publish the new manifest."""
+        live = np.array([not m.get("deleted") for m in self.columns], dtype=bool)
+        merged = self._merge(self.reader.inverted_index(), self._cells, live)
+        if self.ivf is not None:
+            lists = self._merge(self.ivf.lists, self._lists, live)
+            write_ivf(self.writer, IVFCandidates(self.ivf.centroids, self.ivf.radii, lists))
+
+        self.writer.write("postings_cells", merged.cells)
+        self.writer.write("postings_offsets", merged.offsets)
+        self.writer.write("postings_col_ids", merged.col_ids)
+        self.writer.write("postings_row_ids", merged.row_ids)
+        self.writer.write("column_offsets", np.array(self.offsets, dtype=np.int64))
+        if not self._summaries:
+            write_summaries(self.writer, self.writer.open_array("embeddings"), self.writer.open_array("pivot_dists"),
+                            self.offsets)
+        if self._cells:
+            self.tree.finalize()
+            for name, arr in self.tree.to_arrays().items():
+                self.writer.write(f"tree_{name}", arr)
+
+        manifest = self.reader.manifest
+        self.writer.close(
+            grid_levels=manifest["grid_levels"],
+            embedding_dtype=manifest["embedding_dtype"],
+            columns=self.columns,
+            sources=sources,
+            fit=manifest["fit"],
+            shard=manifest.get("shard"),
+        )
+
+
+def _compact_postings(inv: InvertedIndex, remap: np.ndarray, catalog: List[tuple]) -> InvertedIndex:
+    col_ids = remap[inv.col_ids] if len(inv.col_ids) else np.asarray(inv.col_ids)
+    keep = col_ids >= 0
+    return InvertedIndex.from_postings(
+        np.repeat(inv.cells, np.diff(inv.offsets))[keep], col_ids[keep], np.asarray(inv.row_ids)[keep], catalog,
+    )
+
+
+def compact_index(path: str) -> Dict[str, int]:
+    """
+    Rewrite an index without its tombstoned columns.
+
+    The compacted index is written as a new version of the directory and
+    published when complete. Grid tree bounds are recomputed from live rows
+    only, so they are as tight as after a fresh build; pivots and grid stay
+    frozen.
+    """
+    writer = IndexWriter(path)
+    reader = IndexReader(path)
+    manifest = reader.manifest
+    columns = manifest["columns"]
+    if not columns:  # empty shard of a sharded index
+        writer.abandon()
+        return {"columns_removed": 0, "rows_removed": 0}
+    offsets = reader.array("column_offsets").tolist()
+    live = [i for i, m in enumerate(columns) if not m.get("deleted")]
+
+    for name in manifest["arrays"]:
+        if name == "pivots" or name.startswith(("grid_edges_", "sq8_", "pq_")):
+            writer.write(name, reader.array(name))
+
+    embeddings, dists = reader.array("embeddings"), reader.array("pivot_dists")
+    counts = reader.array("value_counts") if reader.has("value_counts") else None
+    codes = (reader.array("codes"), reader.array("code_errors")) if reader.has("codes") else None
+    grid = reader.grid()
+    tree = GridTree(levels=grid.levels)
+    new_offsets = [0]
+    fit_rows = int(manifest["fit"]["rows"])
+    fit_rows_kept = 0
+    for i in live:
+        s, e = offsets[i], offsets[i + 1]
+        writer.append("embeddings", embeddings[s:e])
+        writer.append("pivot_dists", dists[s:e])
+        if counts is not None:
+            writer.append("value_counts", counts[s:e])
+        if codes is not None:
+            writer.append("codes", codes[0][s:e])
+            writer.append("code_errors", codes[1][s:e])
+        tree.add(grid.transform_codes(dists[s:e]), dists[s:e])
+        new_offsets.append(new_offsets[-1] + (e - s))
+        fit_rows_kept += max(0, min(e, fit_rows) - s)
+    tree.finalize()
+    for name, arr in tree.to_arrays().items():
+        writer.write(f"tree_{name}", arr)
+
+    remap = np.full(len(columns), -1, dtype=np.int32)
+    remap[live] = np.arange(len(live), dtype=np.int32)
+    catalog = _catalog([columns[i] for i in live])
+    compacted = _compact_postings(reader.inverted_index(), remap, catalog)
+    if reader.has("ivf_centroids"):
+        # radii stay as they are: still upper bounds, and refitting needs a rebuild anyway
+        ivf = reader.ivf()
+        write_ivf(writer, IVFCandidates(ivf.centroids, ivf.radii, _compact_postings(ivf.lists, remap, catalog)))
+    writer.write("postings_cells", compacted.cells)
+    writer.write("postings_offsets", compacted.offsets)
+    writer.write("postings_col_ids", compacted.col_ids)
+    writer.write("postings_row_ids", compacted.row_ids)
+    writer.write("column_offsets", np.array(new_offsets, dtype=np.int64))
+    if all(reader.has(name) for name in SUMMARY_ARRAYS):
+        for name in SUMMARY_ARRAYS:
+            writer.write(name, np.asarray(reader.array(name))[live])
+    else:
+        write_summaries(writer, writer.open_array("embeddings"), writer.open_array("pivot_dists"), new_offsets)
+
+    fit = dict(manifest["fit"], rows=fit_rows_kept)
+    writer.close(
+        grid_levels=manifest["grid_levels"],
+        embedding_dtype=manifest["embedding_dtype"],
+        columns=[columns[i] for i in live],
+        sources=manifest.get("sources", {}),
+        fit=fit,
+        shard=manifest.get("shard"),
+    )
+    return {"columns_removed": len(columns) - len(live), "rows_removed": offsets[-1] - new_offsets[-1]}
+
+
+@dataclass
+class DriftReport:
+    """How well the frozen pivots and grid still describe the indexed data."""
+    fit_rows: int = 0          # rows present when pivots and grid were fitted
+    added_rows: int = 0        # live rows appended since then
+    dead_rows: int = 0         # tombstoned rows awaiting compaction
+    total_rows: int = 0
+    out_of_range: float = 0.0  # share of added rows outside the fitted grid range
+    shift: float = 0.0         # total variation distance of level-1 cell occupancy, fit vs added
+
+    @property
+    def dead_fraction(self) -> float:
+        return self.dead_rows / max(1, self.total_rows)
+
+    @property
+    def drift(self) -> float:
+        return max(self.out_of_range, self.shift)
+
+    def needs_refit(self, cfg: Config) -> bool:
+        return self.added_rows > 0 and self.drift > cfg.refit_drift_threshold
+
+    def needs_compaction(self, cfg: Config) -> bool:
+        return self.dead_fraction > cfg.compact_dead_fraction
+
+
+def index_drift(path: str, chunk_rows: int = 1 << 16) -> DriftReport:
+    """
+    Compare rows appended since the last full fit against the fit-time data.
+
+    Rows outside the range of the outermost grid edges all land in the
+    overflow bins, and a changed level-1 cell histogram means cells (and
+    so posting lists) get unevenly loaded; either one degrades pruning.
+    """
+    reader = IndexReader(path)
+    manifest = reader.manifest
+    columns = manifest["columns"]
+    offsets = reader.array("column_offsets")
+    fit = manifest["fit"]
+
+    lengths = np.diff(offsets)
+    dead = np.array([bool(m.get("deleted")) for m in columns], dtype=bool)
+    report = DriftReport(
+        fit_rows=int(fit["rows"]),
+        dead_rows=int(lengths[dead].sum()) if len(lengths) else 0,
+        total_rows=int(offsets[-1]),
+    )
+
+    grid = reader.grid()
+    lo = np.array([edges[0][0] for edges in grid.bin_edges])
+    hi = np.array([edges[0][-1] for edges in grid.bin_edges])
+    dists = reader.array("pivot_dists")
+    hist: Dict[int, int] = {}
+    outside = 0
+    for i in range(len(columns)):
+        # rows are appended in order, so everything past the fitted prefix is new
+        if dead[i] or offsets[i + 1] <= report.fit_rows:
+            continue
+        s = max(int(offsets[i]), report.fit_rows)
+        for c0 in range(s, int(offsets[i + 1]), chunk_rows):
+            block = np.asarray(dists[c0:min(c0 + chunk_rows, int(offsets[i + 1]))])
+            outside += int(((block < lo) | (block > hi)).any(axis=1).sum())
+            cells, counts = np.unique(grid.transform_codes(block)[:, 0], return_counts=True)
+            for cell, count in zip(cells.tolist(), counts.tolist()):
+                hist[cell] = hist.get(cell, 0) + count
+            report.added_rows += len(block)
+
+    if report.added_rows and report.fit_rows:
+        report.out_of_range = outside / report.added_rows
+        base = dict(zip(fit["cells"], fit["counts"]))
+        base_total = sum(base.values())
+        report.shift = 0.5 * sum(
+            abs(base.get(c, 0) / base_total - hist.get(c, 0) / report.added_rows)
+            for c in set(base) | set(hist)
+        )
+    return report
@@ -1,28 +1,66 @@
 from __future__ import annotations
+import argparse
+import time
+from typing import Dict, List, Sequence, Tuple
+
 import numpy as np
-from typing import Tuple
 from sklearn.decomposition import PCA
 
+# pca: principal directions (unit vectors, not data points) -- the original choice
+# pca_outlier: data points with the most extreme projection on each principal component
+# farthest_first: greedy traversal, each pivot the point farthest from those chosen
+# max_variance: best of random k-subsets by total variance of pivot distances
+PIVOT_STRATEGIES = ("pca", "pca_outlier", "farthest_first", "max_variance")
+
+# random k-subsets tried by max_variance, and the points they are scored on
+_VARIANCE_TRIALS = 32
+_VARIANCE_POINTS = 2000
+
+# vectors per matrix product in PivotSelector.transform (16 MB of float32
+# input at d = 1024)
+TRANSFORM_CHUNK_ROWS = 4096
+# squared pivot distances below this are recomputed from the difference
+_EXACT_BELOW_SQ = 1e-2
+# slack of every pivot lemma (reject above τ + eps, accept at most τ - eps):
+# transform() is within ~4e-7 of float64 on unit vectors, and a bound adds
+# the errors of two distances, so pairs at τ are left to the exact check
+PIVOT_BOUND_EPS = 1e-5
+
 
 class PivotSelector:
     """
-    Selects pivots from a matrix of embeddings using PCA.
+    Selects pivots from a matrix of embeddings (see PIVOT_STRATEGIES).
     """
 
-    def __init__(self, k: int = 3, seed: int = 42):
+    def __init__(self, k: int = 3, seed: int = 42, strategy: str = "pca"):
+        if strategy not in PIVOT_STRATEGIES:
+            raise ValueError(f"Unknown pivot strategy: {strategy}")
         self.k = k
         self.seed = seed
+        self.strategy = strategy
         self.pivots: np.ndarray | None = None
 
     def fit(self, vectors: np.ndarray) -> np.ndarray:
         """
-        Select k pivots using PCA principal components.
+        Select k pivots with the configured strategy.
 
         Args:
-            vectors: (n, d) matrix of embeddings.
+            vectors: (n, d) matrix of embeddings (typically a sample of the lake).
         Returns:
-            pivots: (k, d) matrix of selected pivots (principal directions).
+            pivots: (k, d) matrix of selected pivots.
         """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.strategy == "pca":
+            self.pivots = self._fit_pca(vectors)
+        elif self.strategy == "pca_outlier":
+            self.pivots = vectors[self._pca_outliers(vectors)]
+        elif self.strategy == "farthest_first":
+            self.pivots = vectors[self._farthest_first(vectors, self.k)]
+        else:
+            self.pivots = vectors[self._max_variance(vectors)]
+        return self.pivots
+
+    def _fit_pca(self, vectors: np.ndarray) -> np.ndarray:
         n, d = vectors.shape
         n_components = min(self.k, d)
 
@@ -30,24 +68,93 @@ class PivotSelector:
         pca.fit(vectors)
 
         # pivots are the top principal component directions
-        self.pivots = pca.components_
-        return self.pivots
+        return pca.components_
 
-    def transform(self, vectors: np.ndarray) -> np.ndarray:
+    def _pca_outliers(self, vectors: np.ndarray) -> np.ndarray:
+        """PEXESO's choice: for each top principal component, the point projecting farthest along it."""
+        n_components = min(self.k, *vectors.shape)
+        proj = PCA(n_components=n_components, random_state=self.seed).fit_transform(vectors)
+        chosen: List[int] = []
+        for j in range(n_components):
+            for i in np.argsort(-np.abs(proj[:, j])):
+                if i not in chosen:
+                    chosen.append(int(i))
+                    break
+        if len(chosen) < self.k:
+            # fewer components than pivots: fill up farthest-first
+            chosen = self._farthest_first(vectors, self.k, chosen)
+        return np.array(chosen)
+
+    def _farthest_first(self, vectors: np.ndarray, k: int, chosen: Sequence[int] = ()) -> np.ndarray:
+        """Greedy k-center traversal; starts from the point farthest from a random one."""
+        rng = np.random.default_rng(self.seed)
+        chosen = list(chosen)
+        if not chosen:
+            start = vectors[rng.integers(len(vectors))]
+            chosen = [int(np.argmax(np.linalg.norm(vectors - start, axis=1)))]
+        nearest = np.min([np.linalg.norm(vectors - vectors[c], axis=1) for c in chosen], axis=0)
+        while len(chosen) < min(k, len(vectors)):
+            nxt = int(np.argmax(nearest))
+            chosen.append(nxt)
+            np.minimum(nearest, np.linalg.norm(vectors - vectors[nxt], axis=1), out=nearest)
+        return np.array(chosen)
+
+    def _max_variance(self, vectors: np.ndarray) -> np.ndarray:
+        """Random k-subsets scored by the summed variance of their pivot distances over a subsample."""
+        rng = np.random.default_rng(self.seed)
+        k = min(self.k, len(vectors))
+        points = vectors[rng.choice(len(vectors), min(len(vectors), _VARIANCE_POINTS), replace=False)]
+        best, best_score = None, -np.inf
+        for _ in range(_VARIANCE_TRIALS):
+            idx = rng.choice(len(vectors), k, replace=False)
+            score = _distances(points, vectors[idx]).var(axis=0).sum()
+            if score > best_score:
+                best, best_score = idx, score
+        return best
+
+    def transform(self, vectors: np.ndarray, out: np.ndarray | None = None,
+                  chunk_rows: int = TRANSFORM_CHUNK_ROWS) -> np.ndarray:
         """
         Map vectors into pivot space (distances to pivots).
 
+        Distances come from the norm expansion ||v||² + ||p||² - 2 v·p, one
+        (chunk_rows, d) @ (d, k) product at a time in float32, so the only
+        temporaries are a few (chunk_rows, k) arrays and one float32 chunk
+        of the input.
+
         Args:
-            vectors: (n, d) input vectors.
+            vectors: (n, d) input vectors (any float dtype, e.g. a memmap).
+            out: optional (n, k) float32 array the distances are written to.
+            chunk_rows: input rows per matrix product.
         Returns:
-            distances: (n, k) distances to each pivot.
+            distances: (n, k) float32 distances to each pivot (out, if given).
         """
         if self.pivots is None:
             raise RuntimeError("PivotSelector has not been fitted yet.")
+        pivots = np.asarray(self.pivots, dtype=np.float32)
+        n = len(vectors)
+        if out is None:
+            out = np.empty((n, len(pivots)), dtype=np.float32)
+        elif out.shape != (n, len(pivots)) or out.dtype != np.float32:
+            raise ValueError(f"out must be a ({n}, {len(pivots)}) float32 array, got {out.shape} {out.dtype}")
 
-        # compute L2 distances from each vector to each pivot direction
-        dists = np.linalg.norm(vectors[:, None, :] - self.pivots[None, :, :], axis=2)
-        return dists
+        p_sq = np.einsum("ij,ij->i", pivots, pivots)
+        pivots_t = np.ascontiguousarray(pivots.T)
+        for s in range(0, n, max(1, chunk_rows)):
+            chunk = np.asarray(vectors[s:s + chunk_rows], dtype=np.float32)
+            d_sq = out[s:s + len(chunk)]
+            np.matmul(chunk, pivots_t, out=d_sq)
+            d_sq *= -2.0
+            d_sq += np.einsum("ij,ij->i", chunk, chunk)[:, None]
+            d_sq += p_sq[None, :]
+            # cancellation leaves an absolute error of ~1e-7 (||v||² + ||p||²),
+            # large relative to small distances: take those exactly
+            i, j = np.nonzero(d_sq < _EXACT_BELOW_SQ)
+            if len(i):
+                diff = chunk[i] - pivots[j]
+                d_sq[i, j] = np.einsum("ij,ij->i", diff, diff)
+            np.sqrt(np.maximum(d_sq, 0.0, out=d_sq), out=d_sq)
+        return out
 
     def fit_transform(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -56,3 +163,89 @@ class PivotSelector:
         pivots = self.fit(vectors)
         dists = self.transform(vectors)
         return pivots, dists
+
+
+def _distances(vectors: np.ndarray, pivots: np.ndarray) -> np.ndarray:
+    d_sq = (np.einsum("ij,ij->i", vectors, vectors)[:, None] + np.einsum("ij,ij->i", pivots, pivots)[None, :]
+            - 2.0 * vectors @ pivots.T)
+    return np.sqrt(np.maximum(d_sq, 0.0))
+
+
+def pruning_power(
+    pivots: np.ndarray,
+    vectors: np.ndarray,
+    tau: float,
+    n_pairs: int = 200_000,
+    seed: int = 42,
+) -> Tuple[float, float]:
+    """
+    How well pivot bounds filter random pairs of `vectors` at threshold τ.
+
+    Returns:
+        pruned: fraction of pairs with max_p |d(x, p) - d(y, p)| > τ
+            (rejected by the pivot lower bound, no exact distance needed)
+        prunable: fraction of pairs with d(x, y) > τ (the ceiling)
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    a = rng.integers(0, len(vectors), n_pairs)
+    b = rng.integers(0, len(vectors), n_pairs)
+    dists = _distances(vectors, np.asarray(pivots, dtype=np.float32))
+    lower = np.abs(dists[a] - dists[b]).max(axis=1)
+    true = np.linalg.norm(vectors[a] - vectors[b], axis=1)
+    return float((lower > tau + PIVOT_BOUND_EPS).mean()), float((true > tau).mean())
+
+
+def evaluate_pivots(
+    sample: np.ndarray,
+    tau: float,
+    ks: Sequence[int] = (2, 3, 5, 7),
+    strategies: Sequence[str] = PIVOT_STRATEGIES,
+    seed: int = 42,
+) -> List[Dict]:
+    """
+    Pruning power of every (strategy, k) on a sample of the lake.
+
+    Pivots are fitted on one half of the sample and evaluated on the
+    other, so strategies picking sample points are not flattered.
+
+    Returns:
+        one {"strategy", "k", "pruned", "prunable", "fit_s"} dict per combination
+    """
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(sample))
+    fit_part, eval_part = sample[order[:len(order) // 2]], sample[order[len(order) // 2:]]
+    rows = []
+    for strategy in strategies:
+        for k in ks:
+            t0 = time.perf_counter()
+            pivots = PivotSelector(k=k, seed=seed, strategy=strategy).fit(fit_part)
+            fit_s = time.perf_counter() - t0
+            pruned, prunable = pruning_power(pivots, eval_part, tau, seed=seed)
+            rows.append({"strategy": strategy, "k": k, "pruned": pruned, "prunable": prunable, "fit_s": fit_s})
+    return rows
+
+
+if __name__ == "__main__":
+    from index.storage import IndexReader
+    from utils.config import Config
+
+    parser = argparse.ArgumentParser(description="Pruning power of pivot strategies on an index's embeddings.")
+    parser.add_argument("index_dir")
+    parser.add_argument("--tau_ratio", type=float, default=Config.tau_ratio)
+    parser.add_argument("--k", type=int, nargs="+", default=[2, 3, 5, 7])
+    parser.add_argument("--sample", type=int, default=20_000, help="embeddings sampled from the index")
+    args = parser.parse_args()
+
+    embeddings = IndexReader(args.index_dir).array("embeddings")
+    rng = np.random.default_rng(Config.seed)
+    idx = np.sort(rng.choice(len(embeddings), min(len(embeddings), args.sample), replace=False))
+    tau = args.tau_ratio * 2.0
+    rows = evaluate_pivots(np.asarray(embeddings[idx], dtype=np.float32), tau, args.k)
+    print(f"{len(idx)} sampled embeddings, tau = {tau:.3f}, "
+          f"pairs farther than tau: {rows[0]['prunable']:.3f}")
+    print(f"{'strategy':>15} {'k':>3} {'pruned':>7} {'fit s':>6}")
+    for row in rows:
+        print(f"{row['strategy']:>15} {row['k']:>3} {row['pruned']:>7.3f} {row['fit_s']:>6.2f}")
+    best = max(rows, key=lambda r: (r["pruned"], -r["k"]))
+    print(f"best: --pivot_strategy {best['strategy']} with k = {best['k']}")
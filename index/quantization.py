@@ -0,0 +1,223 @@
+# pexeso/index/quantization.py
+"""
+Compact codes for the stored embeddings.
+
+Blocking scans candidate vectors far more often than it finds matches, so
+candidates can be compared through a lossy code and only pairs near τ
+need the stored vectors. Every vector keeps the norm of its
+reconstruction error e = ||x - decode(code(x))||; by the triangle
+inequality |d(q, x) - d(q, x̂)| <= e, so
+
+    d(q, x̂) + e <= τ   match
+    d(q, x̂) - e >  τ   no match
+    otherwise          re-ranked on the stored vector
+
+and results are the same as on the stored vectors.
+
+- ScalarQuantizer (sq8): one byte per dimension, per-dimension range.
+- ProductQuantizer (pq): one byte per subspace, 256 k-means centroids per
+  subspace.
+"""
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Tuple
+
+import numpy as np
+
+from index.candidates import IVFCandidates
+
+# Vectors encoded per block (bounds the PQ distance matrices).
+_ENCODE_BLOCK = 4096
+
+# PQ centroids per subspace (codes are uint8).
+_PQ_CENTROIDS = 256
+
+
+class Quantizer(ABC):
+    """Maps float vectors to uint8 codes and back."""
+
+    name: str
+
+    @abstractmethod
+    def fit(self, sample: np.ndarray) -> "Quantizer":
+        """Fit code parameters on a (n, d) sample of vectors."""
+
+    @abstractmethod
+    def encode(self, vecs: np.ndarray) -> np.ndarray:
+        """(n, d) vectors -> (n, code_size) uint8 codes."""
+
+    @abstractmethod
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """(n, code_size) codes -> (n, d) float32 reconstructions."""
+
+    @abstractmethod
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Parameters as named arrays (stored as `<name>_<key>`)."""
+
+    def encode_with_errors(self, vecs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Codes plus each vector's reconstruction error norm.
+
+        Returns:
+            codes: (n, code_size) uint8
+            errors: (n,) float32 ||x - decode(code(x))||
+        """
+        vecs = np.asarray(vecs, dtype=np.float32)
+        codes = self.encode(vecs)
+        errors = np.empty(len(vecs), dtype=np.float32)
+        for s in range(0, len(vecs), _ENCODE_BLOCK):
+            block = slice(s, s + _ENCODE_BLOCK)
+            errors[block] = np.linalg.norm(vecs[block] - self.decode(codes[block]), axis=1)
+        return codes, errors
+
+
+class ScalarQuantizer(Quantizer):
+    """8-bit scalar quantization over each dimension's [min, max] in the sample."""
+
+    name = "sq8"
+
+    def __init__(self, lo: np.ndarray | None = None, scale: np.ndarray | None = None):
+        self.lo = lo
+        self.scale = scale
+
+    def fit(self, sample):
+        sample = np.asarray(sample, dtype=np.float32)
+        self.lo = sample.min(axis=0)
+        # constant dimensions get a unit step so codes stay 0
+        self.scale = np.where(sample.max(axis=0) > self.lo, (sample.max(axis=0) - self.lo) / 255.0, 1.0)
+        self.scale = self.scale.astype(np.float32)
+        return self
+
+    def encode(self, vecs):
+        vecs = np.asarray(vecs, dtype=np.float32)
+        return np.clip(np.rint((vecs - self.lo) / self.scale), 0, 255).astype(np.uint8)
+
+    def decode(self, codes):
+        return self.lo + np.asarray(codes, dtype=np.float32) * self.scale
+
+    def to_arrays(self):
+        return {"lo": self.lo, "scale": self.scale}
+
+
+class ProductQuantizer(Quantizer):
+    """
+    Product quantization: dimensions are split into m contiguous subspaces
+    (np.array_split) and each sub-vector is replaced by the nearest of 256
+    k-means centroids. Codebooks are stored zero-padded to the widest
+    subspace.
+    """
+
+    name = "pq"
+
+    def __init__(self, m: int = 30, seed: int = 42,
+                 codebooks: np.ndarray | None = None, bounds: np.ndarray | None = None):
+        self.m = m
+        self.seed = seed
+        self.codebooks = codebooks  # (m, 256, width) float32
+        self.bounds = bounds        # (m + 1,) int64 subspace boundaries
+        if bounds is not None:
+            self.m = len(bounds) - 1
+
+    def fit(self, sample):
+        sample = np.asarray(sample, dtype=np.float32)
+        d = sample.shape[1]
+        self.m = max(1, min(self.m, d))
+        self.bounds = np.array([len(p) for p in np.array_split(np.arange(d), self.m)]).cumsum()
+        self.bounds = np.concatenate([[0], self.bounds]).astype(np.int64)
+        width = int(np.diff(self.bounds).max())
+        self.codebooks = np.zeros((self.m, _PQ_CENTROIDS, width), dtype=np.float32)
+        for j in range(self.m):
+            s, e = self.bounds[j], self.bounds[j + 1]
+            centroids = IVFCandidates.fit_centroids(sample[:, s:e], _PQ_CENTROIDS, self.seed + j)
+            # fewer distinct sample rows than centroids: repeat the last one
+            self.codebooks[j, :len(centroids), :e - s] = centroids
+            self.codebooks[j, len(centroids):, :e - s] = centroids[-1]
+        return self
+
+    def encode(self, vecs):
+        vecs = np.asarray(vecs, dtype=np.float32)
+        codes = np.empty((len(vecs), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            s, e = self.bounds[j], self.bounds[j + 1]
+            codes[:, j] = IVFCandidates.nearest(self.codebooks[j, :, :e - s], vecs[:, s:e])
+        return codes
+
+    def decode(self, codes):
+        codes = np.asarray(codes)
+        out = np.empty((len(codes), self.bounds[-1]), dtype=np.float32)
+        for j in range(self.m):
+            s, e = self.bounds[j], self.bounds[j + 1]
+            out[:, s:e] = self.codebooks[j, codes[:, j], :e - s]
+        return out
+
+    def to_arrays(self):
+        return {"codebooks": self.codebooks, "bounds": self.bounds}
+
+
+QUANTIZERS = {"sq8": ScalarQuantizer, "pq": ProductQuantizer}
+
+
+def make_quantizer(kind: str, pq_subspaces: int = 30, seed: int = 42) -> Quantizer | None:
+    """Unfitted quantizer for Config.embedding_codes (None for "none")."""
+    if kind == "none":
+        return None
+    if kind == "pq":
+        return ProductQuantizer(m=pq_subspaces, seed=seed)
+    if kind == "sq8":
+        return ScalarQuantizer()
+    raise ValueError(f"Unknown embedding code type: {kind}")
+
+
+def quantizer_from_arrays(kind: str, arrays: Dict[str, np.ndarray]) -> Quantizer:
+    """Inverse of Quantizer.to_arrays()."""
+    if kind == "sq8":
+        return ScalarQuantizer(lo=arrays["lo"], scale=arrays["scale"])
+    if kind == "pq":
+        return ProductQuantizer(codebooks=arrays["codebooks"], bounds=arrays["bounds"])
+    raise ValueError(f"Unknown embedding code type: {kind}")
+
+
+@dataclass
+class CodeBlock:
+    """Rows of one candidate column as reconstructions, with what re-ranking needs."""
+    approx: np.ndarray   # (n, d) float32 decoded codes
+    errors: np.ndarray   # (n,) reconstruction error norms
+    exact: np.ndarray    # the column's stored vectors (memory map)
+    rows: np.ndarray     # (n,) row of each reconstruction in `exact`
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, idx) -> "CodeBlock":
+        return CodeBlock(self.approx[idx], self.errors[idx], self.exact, self.rows[idx])
+
+    def exact_rows(self, idx: np.ndarray) -> np.ndarray:
+        """Stored vectors of rows idx (each distinct row read once)."""
+        rows, inverse = np.unique(self.rows[idx], return_inverse=True)
+        return np.asarray(self.exact[rows], dtype=np.float32)[inverse]
+
+
+class QuantizedColumn:
+    """
+    One indexed column seen through its codes; a drop-in for the column's
+    embeddings in Blocker's cand_vecs_map. Only re-ranked rows of the
+    stored vectors are ever read.
+    """
+
+    def __init__(self, quantizer: Quantizer, codes: np.ndarray, errors: np.ndarray, exact: np.ndarray):
+        self.quantizer = quantizer
+        self.codes = codes
+        self.errors = errors
+        self.exact = exact
+
+    def __len__(self):
+        return len(self.codes)
+
+    def block(self, rows: np.ndarray) -> CodeBlock:
+        return CodeBlock(
+            approx=self.quantizer.decode(self.codes[rows]),
+            errors=np.asarray(self.errors[rows], dtype=np.float32),
+            exact=self.exact,
+            rows=np.asarray(rows),
+        )
@@ -0,0 +1,98 @@
+# pexeso/index/shards.py
+"""
+Sharded index layout.
+
+With cfg.shards = n > 1, tables are partitioned into n shards by a stable
+hash of their file name, and shard i is an ordinary output directory
+<out_dir>/shard-00i (index, embedding cache) that QueryEngine can also
+open on its own. Every shard uses the pivots and grid of shard 0: shard 0
+is built first and fits them, the others are built under them frozen (as
+incremental updates are), so a query is embedded and transformed once
+for all shards (search.shards). Each shard's manifest records
+{"index": i, "count": n} under "shard".
+
+Shards can be built one at a time, e.g. on different hosts, with
+cfg.shard = i once shard 0 is available.
+"""
+from __future__ import annotations
+import hashlib
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from index.grid import HierarchicalGrid
+from index.pivots import PivotSelector
+from index.storage import INDEX_DIRNAME, IndexReader, IndexWriter, index_exists
+from utils.config import Config
+
+SHARD_DIRNAME = "shard-{:03d}"
+
+
+def shard_of(table: str, shards: int) -> int:
+    """Shard of a table (by file name; the same on every host and run)."""
+    digest = hashlib.blake2b(table.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % shards
+
+
+def shard_dir(out_dir: str, shard: int) -> str:
+    return os.path.join(out_dir, SHARD_DIRNAME.format(shard))
+
+
+def shard_meta(cfg: Config) -> dict | None:
+    """Manifest entry of the shard cfg builds (None when not sharded)."""
+    if cfg.shards <= 1:
+        return None
+    return {"index": cfg.shard, "count": cfg.shards}
+
+
+def is_sharded(out_dir: str) -> bool:
+    return index_exists(os.path.join(shard_dir(out_dir, 0), INDEX_DIRNAME))
+
+
+def shard_count(out_dir: str) -> int:
+    """Number of shards recorded by shard 0 (1 for an unsharded output directory)."""
+    if not is_sharded(out_dir):
+        return 1
+    return IndexReader(os.path.join(shard_dir(out_dir, 0), INDEX_DIRNAME)).manifest["shard"]["count"]
+
+
+def index_paths(out_dir: str) -> List[str]:
+    """Index directories under out_dir: one, or one per shard."""
+    if not is_sharded(out_dir):
+        return [os.path.join(out_dir, INDEX_DIRNAME)]
+    return [os.path.join(shard_dir(out_dir, i), INDEX_DIRNAME) for i in range(shard_count(out_dir))]
+
+
+def reference_fit(out_dir: str) -> Tuple[PivotSelector, HierarchicalGrid]:
+    """
+    Pivots and grid of shard 0, under which the other shards are built.
+
+    Raises:
+        FileNotFoundError: shard 0 has not been built yet
+    """
+    path = os.path.join(shard_dir(out_dir, 0), INDEX_DIRNAME)
+    if not index_exists(path):
+        raise FileNotFoundError(f"Shard 0 is not built in {out_dir}; build it first (it fits pivots and grid).")
+    reader = IndexReader(path)
+    selector = reader.selector()
+    selector.pivots = np.array(selector.pivots)
+    grid = reader.grid()
+    grid.bin_edges = [[np.array(e) for e in per_dim] for per_dim in grid.bin_edges]
+    return selector, grid
+
+
+def write_empty_shard(path: str, selector: PivotSelector, grid: HierarchicalGrid, cfg: Config, sources: dict):
+    """Index of a shard without indexable columns: the shared pivots and grid edges only."""
+    writer = IndexWriter(path)
+    writer.write("pivots", selector.pivots)
+    for l in range(grid.levels):
+        writer.write(f"grid_edges_{l}", np.array([edges[l] for edges in grid.bin_edges], dtype=np.float64))
+    writer.close(
+        grid_levels=grid.levels,
+        embedding_dtype=np.dtype(cfg.dtype).name,
+        columns=[],
+        sources=sources,
+        fit={"rows": 0, "cells": [], "counts": []},
+        shard=shard_meta(cfg),
+    )
@@ -0,0 +1,592 @@
+# pexeso/index/storage.py
+"""
+Binary, memory-mapped index artifact format.
+
+An index version holds one raw little-endian file per array plus a
+small `manifest.json` (format version, dtype and shape of every array,
+column catalog). Readers open the arrays with np.memmap, so startup cost
+does not depend on lake size and only the pages a query touches are read.
+
+An index directory holds its versions as sub-directories (v000001, ...)
+and a `CURRENT` file naming the live one. Every build, update and
+compaction writes a new version and publishes it by replacing CURRENT
+(one atomic rename), so a reader opening the index mid-commit sees the
+old version or the new one, never a mix. Updates hard-link the arrays
+they keep unchanged from the previous version and copy those they append
+to, so the files of a published version are never modified. Writers hold
+the directory's `LOCK` file (flock) from opening to publishing or
+abandoning their version, so commits never overlap. The version a commit
+replaces is kept until the next commit, for readers that resolved it
+just before the switch; older ones are deleted. Directories written
+before versioning (manifest.json directly in the index directory) are
+still read.
+
+Arrays:
+    pivots              (k, d)
+    grid_edges_{l}      (k, 2**(l+1) + 1)       bin edges of level l+1
+    tree_*              GridTree.to_arrays()
+    postings_cells      (m,)   int64            sorted leaf cell codes
+    postings_offsets    (m+1,) int64
+    postings_col_ids    (p,)   int32
+    postings_row_ids    (p,)   int32
+    embeddings          (N, d) float32/float16  all columns, contiguous; one row
+                                                per distinct value of a column
+    pivot_dists         (N, k) float32
+    value_counts        (N,)   int32            rows holding each distinct value
+                                                (optional: absent means 1 each)
+    column_offsets      (C+1,) int64            rows of column i: [off[i], off[i+1])
+    ivf_*               IVFCandidates.to_arrays() (optional IVF lists:
+                        centroids, radii and CSR postings keyed by list)
+    codes               (N, c) uint8            optional quantized embeddings,
+                                                encoded from the stored rows
+    code_errors         (N,)   float32          ||embedding - decode(code)||
+    sq8_* / pq_*        Quantizer.to_arrays() of the quantizer the codes use
+    col_*               (C, ...)                per-column summaries (index.summaries):
+                                                centroid, radius, pivot distance range,
+                                                MinHash (optional: absent in older indexes)
+
+Manifest keys besides the array table:
+    columns     catalog in storage order; {"deleted": true} marks a
+                tombstoned column whose rows stay on disk until compaction
+    sources     file name -> {"size", "mtime_ns", "hash"} of the lake files
+                the index was built from (used by incremental updates)
+    fit         rows present when pivots and grid were fitted, and their
+                level-1 cell histogram (baseline of the drift metric)
+    shard       {"index", "count"} of a shard of a sharded index, else null;
+                a shard without indexable columns stores only pivots and
+                grid edges (see index.shards)
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import shutil
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not locked
+    fcntl = None
+
+from index.candidates import IVFCandidates
+from index.quantization import QUANTIZERS, QuantizedColumn, Quantizer, quantizer_from_arrays
+from index.grid import HierarchicalGrid
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex
+from index.pivots import PivotSelector
+from index.summaries import SUMMARY_ARRAYS, ColumnSummaries, summarize
+from utils.types import TableId, ColumnId, GREEN, RESET
+
+FORMAT_NAME = "pexeso-index"
+FORMAT_VERSION = 1
+INDEX_DIRNAME = "index"
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+LOCK = "LOCK"
+_VERSION_PREFIX = "v"
+# attempts to open a version deleted between reading CURRENT and its manifest
+_OPEN_RETRIES = 3
+
+
+def resolve_index(path: str) -> str:
+    """Directory of the live version of the index at `path` (path itself for an unversioned index)."""
+    try:
+        with open(os.path.join(path, CURRENT)) as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        return path
+
+
+def index_exists(path: str) -> bool:
+    return os.path.exists(os.path.join(resolve_index(path), MANIFEST))
+
+
+def _versions(path: str) -> List[str]:
+    if not os.path.isdir(path):
+        return []
+    return sorted(d for d in os.listdir(path) if d.startswith(_VERSION_PREFIX) and d[1:].isdigit())
+
+
+def _new_version(path: str) -> str:
+    versions = _versions(path)
+    number = int(versions[-1][1:]) + 1 if versions else 1
+    version = os.path.join(path, f"{_VERSION_PREFIX}{number:06d}")
+    shutil.rmtree(version, ignore_errors=True)
+    os.makedirs(version)
+    return version
+
+
+def _publish(path: str, version: str):
+    """Make `version` the live version of the index at `path`, then delete versions older than the one it replaces."""
+    previous = resolve_index(path)
+    tmp = os.path.join(path, CURRENT + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(os.path.basename(version))
+    os.replace(tmp, os.path.join(path, CURRENT))
+    keep = {os.path.basename(version), os.path.basename(previous)}
+    try:
+        for name in _versions(path):
+            if name not in keep:
+                shutil.rmtree(os.path.join(path, name))
+        if previous != path:
+            # files of an unversioned index, replaced at least one commit ago
+            for name in os.listdir(path):
+                if name == MANIFEST or name.endswith((".bin", ".tmp")):
+                    os.remove(os.path.join(path, name))
+    except OSError:
+        pass  # e.g. still mapped on Windows: removed by a later commit
+
+
+class IndexWriter:
+    """
+    Writes a new version of an index directory: its arrays, then its
+    manifest, published as the live version by close().
+    """
+
+    def __init__(self, path: str):
+        self.root = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = open(os.path.join(path, LOCK), "ab")
+        if fcntl is not None:
+            fcntl.flock(self._lock, fcntl.LOCK_EX)  # until close() or abandon()
+        self.path = _new_version(path)
+        self.arrays: Dict[str, dict] = {}
+        # arrays still hard-linked to the previous version
+        self._linked = set()
+
+    @classmethod
+    def reopen(cls, path: str) -> "IndexWriter":
+        """
+        Writer of a new version holding the arrays of the live one (hard
+        links, or copies where links are unsupported); arrays can be
+        appended to or replaced without touching the live version. The
+        live version is read once the writer lock is held.
+        """
+        writer = cls(path)
+        live = resolve_index(path)
+        with open(os.path.join(live, MANIFEST)) as f:
+            writer.arrays = json.load(f)["arrays"]
+        for name in writer.arrays:
+            src, dst = os.path.join(live, f"{name}.bin"), writer._file(name)
+            try:
+                os.link(src, dst)
+                writer._linked.add(name)
+            except OSError:
+                shutil.copyfile(src, dst)
+        return writer
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, f"{name}.bin")
+
+    def write(self, name: str, arr: np.ndarray):
+        """Write a whole array (replaced atomically; open memory maps keep the old data)."""
+        arr = np.asarray(arr)
+        arr = arr.astype(arr.dtype.newbyteorder("<"), order="C", copy=False)
+        tmp = self._file(name) + ".tmp"
+        arr.tofile(tmp)
+        os.replace(tmp, self._file(name))
+        self._linked.discard(name)
+        self.arrays[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape)}
+
+    def append(self, name: str, arr: np.ndarray):
+        """Append rows to an array (row shape and dtype fixed by the first call)."""
+        arr = np.asarray(arr)
+        entry = self.arrays.get(name)
+        if entry is None:
+            arr = arr.astype(arr.dtype.newbyteorder("<"), order="C", copy=False)
+            entry = self.arrays[name] = {"dtype": arr.dtype.str, "shape": [0, *arr.shape[1:]]}
+            self._unlink(name)
+            open(self._file(name), "wb").close()
+        else:
+            arr = arr.astype(np.dtype(entry["dtype"]), order="C", copy=False)
+            self._detach(name)
+        with open(self._file(name), "ab") as f:
+            arr.tofile(f)
+        entry["shape"][0] += len(arr)
+
+    def allocate(self, name: str, shape: Tuple[int, ...], dtype) -> np.ndarray:
+        """Create a zero-filled array of the given shape and memory-map it for writing in any order."""
+        dtype = np.dtype(dtype).newbyteorder("<")
+        self._unlink(name)
+        with open(self._file(name), "wb") as f:
+            f.truncate(int(np.prod(shape)) * dtype.itemsize)
+        self.arrays[name] = {"dtype": dtype.str, "shape": list(shape)}
+        if int(np.prod(shape)) == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode="r+", shape=shape)
+
+    def remove(self, name: str):
+        """Drop an array (e.g. scratch data of a build) from the version and its manifest."""
+        if self.arrays.pop(name, None) is not None:
+            self._unlink(name)
+
+    def _unlink(self, name: str):
+        # a file hard-linked from the previous version must not be truncated in place
+        self._linked.discard(name)
+        if os.path.exists(self._file(name)):
+            os.remove(self._file(name))
+
+    def _detach(self, name: str):
+        """Replace a hard link to the previous version's file by a copy this version owns."""
+        if name not in self._linked:
+            return
+        entry = self.arrays[name]
+        tmp = self._file(name) + ".tmp"
+        shutil.copyfile(self._file(name), tmp)
+        # bytes past the manifest's shape are not part of the version (older writers appended in place)
+        size = int(np.prod(entry["shape"])) * np.dtype(entry["dtype"]).itemsize
+        if os.path.getsize(tmp) > size:
+            os.truncate(tmp, size)
+        os.replace(tmp, self._file(name))
+        self._linked.discard(name)
+
+    def open_array(self, name: str) -> np.ndarray:
+        """Memory-map an array written so far (read-only)."""
+        entry = self.arrays[name]
+        shape = tuple(entry["shape"])
+        if int(np.prod(shape)) == 0:
+            return np.empty(shape, dtype=np.dtype(entry["dtype"]))
+        return np.memmap(self._file(name), dtype=np.dtype(entry["dtype"]), mode="r", shape=shape)
+
+    def close(self, **meta):
+        """Write the manifest and publish the version; readers see it only once this returns."""
+        manifest = {"format": FORMAT_NAME, "version": FORMAT_VERSION, "arrays": self.arrays, **meta}
+        with open(os.path.join(self.path, MANIFEST), "w") as f:
+            json.dump(manifest, f)
+        _publish(self.root, self.path)
+        self._unlock()
+
+    def abandon(self):
+        """Delete the unpublished version and release the writer lock; the live version is unchanged."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        self._unlock()
+
+    def _unlock(self):
+        if fcntl is not None:
+            fcntl.flock(self._lock, fcntl.LOCK_UN)
+        self._lock.close()
+
+
+class IndexReader:
+    """Opens the live version of an index directory written by IndexWriter."""
+
+    def __init__(self, path: str):
+        for attempt in range(_OPEN_RETRIES):
+            # arrays are read from this version even if another one is published meanwhile
+            self.path = resolve_index(path)
+            try:
+                with open(os.path.join(self.path, MANIFEST)) as f:
+                    self.manifest = json.load(f)
+                break
+            except FileNotFoundError:
+                if attempt == _OPEN_RETRIES - 1 or self.path == resolve_index(path):
+                    raise
+        if self.manifest.get("format") != FORMAT_NAME:
+            raise ValueError(f"{path} is not a PEXESO index directory.")
+        if self.manifest.get("version") != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported index format version {self.manifest.get('version')} "
+                f"(expected {FORMAT_VERSION}); rebuild or convert the index."
+            )
+
+    def has(self, name: str) -> bool:
+        return name in self.manifest["arrays"]
+
+    def array(self, name: str) -> np.ndarray:
+        """Memory-map an array read-only."""
+        entry = self.manifest["arrays"][name]
+        dtype, shape = np.dtype(entry["dtype"]), tuple(entry["shape"])
+        if int(np.prod(shape)) == 0:
+            return np.empty(shape, dtype=dtype)  # mmap cannot map empty files
+        arr = np.memmap(os.path.join(self.path, f"{name}.bin"), dtype=dtype, mode="r", shape=shape)
+        return arr.reshape(shape)  # np.memmap maps shape () as (1,)
+
+    @property
+    def col_meta(self) -> Dict[str, dict]:
+        return {str(i): meta for i, meta in enumerate(self.manifest["columns"])}
+
+    def selector(self, seed: int = 42) -> PivotSelector:
+        pivots = self.array("pivots")
+        selector = PivotSelector(k=len(pivots), seed=seed)
+        selector.pivots = pivots
+        return selector
+
+    def grid(self) -> HierarchicalGrid:
+        levels = self.manifest["grid_levels"]
+        grid = HierarchicalGrid(levels=levels)
+        edges = [self.array(f"grid_edges_{l}") for l in range(levels)]
+        grid.bin_edges = [[edges[l][dim] for l in range(levels)] for dim in range(len(edges[0]))]
+        return grid
+
+    def grid_tree(self) -> GridTree:
+        prefix = "tree_"
+        arrays = {n[len(prefix):]: self.array(n) for n in self.manifest["arrays"] if n.startswith(prefix)}
+        return GridTree.from_arrays(arrays)
+
+    def inverted_index(self) -> InvertedIndex:
+        return InvertedIndex.from_csr(
+            self.array("postings_cells"),
+            self.array("postings_offsets"),
+            self.array("postings_col_ids"),
+            self.array("postings_row_ids"),
+            [(TableId(m["table"]), ColumnId(m["column"])) for m in self.manifest["columns"]],
+        )
+
+    def ivf(self, nprobe: int = 0) -> IVFCandidates:
+        """IVF lists stored with the index (built with candidate_generator="ivf")."""
+        if not self.has("ivf_centroids"):
+            raise ValueError(
+                f"{self.path} has no IVF lists; rebuild it with candidate_generator=\"ivf\"."
+            )
+        lists = InvertedIndex.from_csr(
+            self.array("ivf_cells"),
+            self.array("ivf_offsets"),
+            self.array("ivf_col_ids"),
+            self.array("ivf_row_ids"),
+            [(TableId(m["table"]), ColumnId(m["column"])) for m in self.manifest["columns"]],
+        )
+        return IVFCandidates(self.array("ivf_centroids"), self.array("ivf_radii"), lists, nprobe)
+
+    def _per_column(self, name: str) -> Dict[Tuple[str, str], np.ndarray]:
+        data, offsets = self.array(name), self.array("column_offsets")
+        return {
+            (m["table"], m["column"]): data[offsets[i]:offsets[i + 1]]
+            for i, m in enumerate(self.manifest["columns"])
+            if not m.get("deleted")
+        }
+
+    def cand_vecs_map(self) -> Dict[Tuple[str, str], np.ndarray]:
+        """(table, column) -> embedding rows (views into the memory map)."""
+        return self._per_column("embeddings")
+
+    def cand_dists_map(self) -> Dict[Tuple[str, str], np.ndarray]:
+        """(table, column) -> per-vector pivot distances (views into the memory map)."""
+        return self._per_column("pivot_dists")
+
+    def quantizer(self) -> Quantizer | None:
+        """Quantizer of the stored codes (None if the index has no codes)."""
+        for kind in QUANTIZERS:
+            prefix = f"{kind}_"
+            names = [n for n in self.manifest["arrays"] if n.startswith(prefix)]
+            if names:
+                return quantizer_from_arrays(kind, {n[len(prefix):]: self.array(n) for n in names})
+        return None
+
+    def cand_codes_map(self, kind: str) -> Dict[Tuple[str, str], QuantizedColumn]:
+        """(table, column) -> the column's codes, error bounds and stored rows for re-ranking."""
+        quantizer = self.quantizer()
+        if quantizer is None or quantizer.name != kind:
+            raise ValueError(
+                f"{self.path} has no {kind} codes; rebuild it with embedding_codes=\"{kind}\"."
+            )
+        vecs, codes, errors = self.cand_vecs_map(), self._per_column("codes"), self._per_column("code_errors")
+        return {key: QuantizedColumn(quantizer, codes[key], errors[key], vecs[key]) for key in vecs}
+
+    def column_summaries(self) -> ColumnSummaries | None:
+        """Per-column summaries (None for an index written before they were stored)."""
+        if not all(self.has(name) for name in SUMMARY_ARRAYS):
+            return None
+        return ColumnSummaries(
+            self.manifest["columns"], {name: self.array(name) for name in SUMMARY_ARRAYS},
+            self.array("column_offsets"), self.manifest["embedding_dtype"],
+        )
+
+    def cand_counts_map(self) -> Dict[Tuple[str, str], np.ndarray]:
+        """(table, column) -> number of rows holding each vector's value."""
+        if self.has("value_counts"):
+            return self._per_column("value_counts")
+        offsets = self.array("column_offsets")
+        return {
+            (m["table"], m["column"]): np.ones(offsets[i + 1] - offsets[i], dtype=np.int32)
+            for i, m in enumerate(self.manifest["columns"])
+            if not m.get("deleted")
+        }
+
+
+def write_index(
+    path: str,
+    pivots: np.ndarray,
+    grid: HierarchicalGrid,
+    tree: GridTree,
+    inv: InvertedIndex,
+    col_meta: Dict[int, dict],
+    col_embeddings: Dict[int, np.ndarray],
+    col_dists: Dict[int, np.ndarray],
+    dtype: str = "float32",
+    sources: Dict[str, dict] | None = None,
+    col_counts: Dict[int, np.ndarray] | None = None,
+    ivf: IVFCandidates | None = None,
+    quantizer: Quantizer | None = None,
+    shard: dict | None = None,
+):
+    """
+    Write a complete index directory.
+
+    Columns are stored in col_meta key order; postings column ids are
+    remapped to that order. col_counts gives the rows per vector of each
+    column (default: 1, i.e. one vector per row). IVF lists, if given, use
+    the column ids of `inv` and are remapped the same way. With a (fitted)
+    quantizer, codes of the stored embeddings are written too. `shard` is
+    the manifest entry of a shard of a sharded index (see index.shards).
+
+    col_dists (and IVF radii) must be those of the embeddings as stored,
+    i.e. after rounding to `dtype`, or pivot lemmas and list bounds would
+    describe other points than the rows queries are verified against.
+    """
+    writer = IndexWriter(path)
+    writer.write("pivots", pivots)
+    for l in range(grid.levels):
+        writer.write(f"grid_edges_{l}", np.array([edges[l] for edges in grid.bin_edges], dtype=np.float64))
+    for name, arr in tree.to_arrays().items():
+        writer.write(f"tree_{name}", arr)
+
+    cids = sorted(col_meta)
+    position = {(col_meta[c]["table"], col_meta[c]["column"]): i for i, c in enumerate(cids)}
+    remap = np.array([position[(t.name, c.name)] for t, c in inv.columns], dtype=np.int32)
+    writer.write("postings_cells", inv.cells)
+    writer.write("postings_offsets", inv.offsets)
+    writer.write("postings_col_ids", remap[inv.col_ids] if len(remap) else inv.col_ids)
+    writer.write("postings_row_ids", inv.row_ids)
+    if ivf is not None:
+        write_ivf(writer, ivf, remap)
+    if quantizer is not None:
+        write_quantizer(writer, quantizer)
+
+    offsets = [0]
+    for cid in cids:
+        stored = np.asarray(col_embeddings[cid], dtype=dtype)
+        writer.append("embeddings", stored)
+        if quantizer is not None:
+            append_codes(writer, quantizer, stored)
+        writer.append("pivot_dists", np.asarray(col_dists[cid], dtype=np.float32))
+        append_summary(writer, stored, col_dists[cid])
+        counts = None if col_counts is None else col_counts.get(cid)
+        if counts is None:
+            counts = np.ones(len(col_embeddings[cid]), dtype=np.int32)
+        writer.append("value_counts", np.asarray(counts, dtype=np.int32))
+        offsets.append(offsets[-1] + len(col_embeddings[cid]))
+    writer.write("column_offsets", np.array(offsets, dtype=np.int64))
+
+    writer.close(
+        grid_levels=grid.levels,
+        embedding_dtype=np.dtype(dtype).name,
+        columns=[col_meta[c] for c in cids],
+        sources=sources or {},
+        fit=fit_summary(tree),
+        shard=shard,
+    )
+
+
+def write_ivf(writer: IndexWriter, ivf: IVFCandidates, remap: np.ndarray | None = None):
+    """Write IVF lists, optionally remapping their column ids to storage order."""
+    for name, arr in ivf.to_arrays().items():
+        if name == "col_ids" and remap is not None and len(remap):
+            arr = remap[arr]
+        writer.write(f"ivf_{name}", arr)
+
+
+def write_quantizer(writer: IndexWriter, quantizer: Quantizer):
+    for name, arr in quantizer.to_arrays().items():
+        writer.write(f"{quantizer.name}_{name}", arr)
+
+
+def append_codes(writer: IndexWriter, quantizer: Quantizer, stored: np.ndarray):
+    """Append codes and error bounds of embeddings as stored (after any float16 rounding)."""
+    codes, errors = quantizer.encode_with_errors(stored)
+    writer.append("codes", codes)
+    writer.append("code_errors", errors)
+
+
+def append_summary(writer: IndexWriter, stored: np.ndarray, dists: np.ndarray):
+    """Append the summary row of the next column (index.summaries) from its rows as stored."""
+    for name, row in summarize(stored, dists).items():
+        writer.append(name, np.asarray(row)[None])
+
+
+def write_summaries(writer: IndexWriter, stored: np.ndarray, dists: np.ndarray, offsets: List[int]):
+    """Write the summaries of every column from the stored rows of all columns, column by column."""
+    rows = [summarize(stored[offsets[i]:offsets[i + 1]], dists[offsets[i]:offsets[i + 1]])
+            for i in range(len(offsets) - 1)]
+    if rows:
+        for name in SUMMARY_ARRAYS:
+            writer.write(name, np.stack([np.asarray(r[name]) for r in rows]))
+
+
+def fit_summary(tree: GridTree) -> dict:
+    """Manifest entry describing the data the pivots and grid were fitted on."""
+    return {
+        "rows": int(tree.counts[0].sum()) if tree.levels else 0,
+        "cells": tree.cells[0].tolist() if tree.levels else [],
+        "counts": tree.counts[0].tolist() if tree.levels else [],
+    }
+
+
+def convert_legacy(artifact_dir: str, out_path: str | None = None, dtype: str = "float32") -> str:
+    """
+    Convert JSON/npz artifacts (pivots.npy, grid.json, inverted_index.json,
+    col_meta.json, embeddings.npz and, if present, pivot_dists.npz and
+    grid_tree.npz) into an index directory. Missing pivot distances and
+    grid tree are recomputed from the embeddings.
+    """
+    out_path = out_path or os.path.join(artifact_dir, INDEX_DIRNAME)
+    pivots = np.load(os.path.join(artifact_dir, "pivots.npy"))
+    with open(os.path.join(artifact_dir, "grid.json")) as f:
+        grid_cfg = json.load(f)
+    with open(os.path.join(artifact_dir, "inverted_index.json")) as f:
+        inv_data = json.load(f)
+    with open(os.path.join(artifact_dir, "col_meta.json")) as f:
+        col_meta = {int(k): v for k, v in json.load(f).items()}
+    emb_data = np.load(os.path.join(artifact_dir, "embeddings.npz"))
+    col_embeddings = {cid: emb_data[str(cid)] for cid in col_meta}
+
+    selector = PivotSelector(k=len(pivots))
+    selector.pivots = pivots
+    grid = HierarchicalGrid(levels=grid_cfg["levels"])
+    grid.bin_edges = [[np.asarray(e) for e in per_dim] for per_dim in grid_cfg["bin_edges"]]
+
+    # saved distances and tree are of float32 rows; rounded rows need their own
+    rounded = np.dtype(dtype) != np.float32
+    dists_path = os.path.join(artifact_dir, "pivot_dists.npz")
+    if os.path.exists(dists_path) and not rounded:
+        dist_data = np.load(dists_path)
+        col_dists = {cid: dist_data[str(cid)] for cid in col_meta}
+    else:
+        col_dists = {cid: selector.transform(np.asarray(v).astype(dtype)) for cid, v in col_embeddings.items()}
+
+    tree_path = os.path.join(artifact_dir, "grid_tree.npz")
+    if os.path.exists(tree_path) and not rounded:
+        tree = GridTree.from_arrays(np.load(tree_path))
+    else:
+        tree = GridTree(levels=grid.levels)
+        for cid, dists in col_dists.items():
+            tree.add(grid.transform_codes(dists), dists)
+        tree.finalize()
+
+    catalog: Dict[Tuple[TableId, ColumnId], int] = {}
+    cells: List[int] = []
+    col_ids: List[int] = []
+    row_ids: List[int] = []
+    for entry in inv_data:
+        cell = entry["cell"]
+        if isinstance(cell, list):  # tuple cell IDs predate packed codes
+            cell = int(grid.encode(np.array([cell]))[0])
+        for p in entry["postings"]:
+            cells.append(cell)
+            col_ids.append(catalog.setdefault((TableId(p["table"]), ColumnId(p["column"])), len(catalog)))
+            row_ids.append(p["row_id"])
+    inv = InvertedIndex.from_postings(cells, col_ids, row_ids, list(catalog))
+
+    write_index(out_path, pivots, grid, tree, inv, col_meta, col_embeddings, col_dists, dtype)
+    return out_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert JSON/npz artifacts into a memory-mapped index.")
+    parser.add_argument("artifact_dir")
+    parser.add_argument("--out", default=None, help=f"index directory (default: <artifact_dir>/{INDEX_DIRNAME})")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    args = parser.parse_args()
+    path = convert_legacy(args.artifact_dir, args.out, args.dtype)
+    print(f"{GREEN}Wrote {path}{RESET}")
@@ -0,0 +1,165 @@
+# pexeso/index/summaries.py
+"""
+Per-column summaries, stored with the index as one row per catalog column
+(the order of manifest["columns"] and column_offsets):
+
+    col_centroids   (C, d) float32   mean of the column's stored embeddings
+    col_radii       (C,)   float32   largest distance of a row to the centroid
+    col_pivot_min   (C, k) float32   smallest pivot distance, per pivot
+    col_pivot_max   (C, k) float32   largest pivot distance, per pivot
+    col_minhash     (C, MINHASH_SIZE) uint32  MinHash of the distinct values
+
+A column's distinct count is its row count in column_offsets.
+
+Both bounds follow from the triangle inequality: a query vector q can
+only be within τ of a row of the column if d(q, centroid) <= radius + τ
+and min_p - τ <= d(q, p) <= max_p + τ for every pivot p. Summing the
+weights of the query vectors that pass bounds a column's matches from
+above without touching its rows (search.blocking, search.topk).
+
+The MinHash is taken over the stored embedding rows (one per distinct
+normalized value, and equal for equal values), so it needs no strings
+and is kept up to date by incremental updates and compaction like the
+rows themselves. It estimates the share of a query's distinct values
+that occur verbatim in a column: a cheap joinability estimate for
+ranking, never for pruning.
+"""
+from __future__ import annotations
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+MINHASH_SIZE = 64
+SUMMARY_ARRAYS = ("col_centroids", "col_radii", "col_pivot_min", "col_pivot_max", "col_minhash")
+
+# rows hashed at a time
+_HASH_CHUNK = 4096
+# slack on the bounds for float32 rounding of distances and summaries
+_BOUND_EPS = 1e-4
+
+_rng = np.random.default_rng(0x5EED)
+# multipliers mixing the 32-bit words of a row into one 64-bit fingerprint
+_ROW_MIX = _rng.integers(1, 2**63, size=4096, dtype=np.uint64) | np.uint64(1)
+# MinHash functions: (a * fingerprint + b) mod 2**64, top 32 bits
+_MINHASH_A = _rng.integers(1, 2**63, size=MINHASH_SIZE, dtype=np.uint64) | np.uint64(1)
+_MINHASH_B = _rng.integers(0, 2**63, size=MINHASH_SIZE, dtype=np.uint64)
+_EMPTY_MINHASH = np.full(MINHASH_SIZE, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+
+def fingerprints(vecs: np.ndarray) -> np.ndarray:
+    """(n,) uint64 hash of each row's float32 bit pattern."""
+    words = np.ascontiguousarray(vecs, dtype=np.float32).view(np.uint32).astype(np.uint64)
+    mix = np.tile(_ROW_MIX, -(-words.shape[1] // len(_ROW_MIX)))[:words.shape[1]]
+    with np.errstate(over="ignore"):
+        h = words @ mix
+        h ^= h >> np.uint64(31)
+        h *= np.uint64(0x9E3779B97F4A7C15)
+        h ^= h >> np.uint64(29)
+    return h
+
+
+def minhash(vecs: np.ndarray) -> np.ndarray:
+    """(MINHASH_SIZE,) uint32 MinHash of the distinct rows of vecs."""
+    sketch = _EMPTY_MINHASH.copy()
+    for s in range(0, len(vecs), _HASH_CHUNK):
+        h = fingerprints(vecs[s:s + _HASH_CHUNK])
+        with np.errstate(over="ignore"):
+            values = ((h[:, None] * _MINHASH_A[None, :] + _MINHASH_B[None, :]) >> np.uint64(32)).astype(np.uint32)
+        np.minimum(sketch, values.min(axis=0), out=sketch)
+    return sketch
+
+
+def summarize(vecs: np.ndarray, dists: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Summary row of one column.
+
+    Args:
+        vecs: (n, d) the column's embeddings as stored (after any float16 rounding)
+        dists: (n, k) their pivot distances
+    Returns:
+        array name (SUMMARY_ARRAYS) -> this column's row
+    """
+    vecs = np.asarray(vecs)
+    dists = np.asarray(dists, dtype=np.float32)
+    d, k = vecs.shape[1], dists.shape[1]
+    if len(vecs) == 0:
+        return {
+            "col_centroids": np.zeros(d, dtype=np.float32),
+            "col_radii": np.float32(0.0),  # never a candidate: it has no postings
+            "col_pivot_min": np.full(k, np.inf, dtype=np.float32),
+            "col_pivot_max": np.full(k, -np.inf, dtype=np.float32),
+            "col_minhash": _EMPTY_MINHASH.copy(),
+        }
+    centroid = np.zeros(d, dtype=np.float64)
+    for s in range(0, len(vecs), _HASH_CHUNK):
+        centroid += np.asarray(vecs[s:s + _HASH_CHUNK], dtype=np.float64).sum(axis=0)
+    centroid = (centroid / len(vecs)).astype(np.float32)
+    radius = max(
+        float(np.linalg.norm(np.asarray(vecs[s:s + _HASH_CHUNK], dtype=np.float32) - centroid, axis=1).max())
+        for s in range(0, len(vecs), _HASH_CHUNK)
+    )
+    return {
+        "col_centroids": centroid,
+        "col_radii": np.float32(radius),
+        "col_pivot_min": dists.min(axis=0),
+        "col_pivot_max": dists.max(axis=0),
+        "col_minhash": minhash(vecs),
+    }
+
+
+class ColumnSummaries:
+    """Summaries of the live columns of an index, looked up by (table, column) name."""
+
+    def __init__(self, columns: List[dict], arrays: Dict[str, np.ndarray], offsets: np.ndarray, dtype: str):
+        """
+        Args:
+            columns: the manifest's column catalog
+            arrays: SUMMARY_ARRAYS by name
+            offsets: column_offsets
+            dtype: dtype of the stored embeddings
+        """
+        self.rows = {(m["table"], m["column"]): i for i, m in enumerate(columns) if not m.get("deleted")}
+        self.centroids = np.asarray(arrays["col_centroids"], dtype=np.float32)
+        self.c_sq = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        self.radii = np.asarray(arrays["col_radii"], dtype=np.float32)
+        self.pivot_min = np.asarray(arrays["col_pivot_min"], dtype=np.float32)
+        self.pivot_max = np.asarray(arrays["col_pivot_max"], dtype=np.float32)
+        self.minhash = np.asarray(arrays["col_minhash"])
+        self.distinct = np.diff(np.asarray(offsets))
+        self.dtype = dtype
+
+    def positions(self, keys: Sequence[Tuple[str, str]]) -> np.ndarray:
+        return np.array([self.rows[key] for key in keys], dtype=np.int64)
+
+    def reachable(
+        self,
+        rows: np.ndarray,              # (m,) summary rows (positions())
+        query_vecs: np.ndarray,        # (n_q, d)
+        q_sq: np.ndarray,              # (n_q,) squared norms
+        query_dists: np.ndarray | None,  # (n_q, k)
+        tau: float,
+    ) -> np.ndarray:
+        """(n_q, m) the query vector may be within τ of some row of the column."""
+        c_sq = self.c_sq[rows]
+        d_sq = q_sq[:, None] + c_sq[None, :] - 2.0 * query_vecs @ self.centroids[rows].T
+        limit = self.radii[rows] + tau + _BOUND_EPS
+        ok = d_sq <= (limit * limit)[None, :] + _BOUND_EPS * (q_sq[:, None] + c_sq[None, :])
+        if query_dists is not None:
+            for p in range(query_dists.shape[1]):
+                qd = query_dists[:, p, None]
+                ok &= qd >= self.pivot_min[rows, p][None, :] - tau - _BOUND_EPS
+                ok &= qd <= self.pivot_max[rows, p][None, :] + tau + _BOUND_EPS
+        return ok
+
+    def estimate(self, rows: np.ndarray, query_vecs: np.ndarray) -> np.ndarray:
+        """
+        (m,) estimated share of the (distinct) query vectors that occur in
+        each column, from the Jaccard similarity of the MinHashes.
+        """
+        stored = np.asarray(query_vecs, dtype=self.dtype)  # rounded as the columns' rows are
+        sketch = minhash(stored)
+        jaccard = (self.minhash[rows] == sketch[None, :]).mean(axis=1)
+        n_q, n_c = len(query_vecs), self.distinct[rows]
+        overlap = jaccard * (n_q + n_c) / (1.0 + jaccard)
+        return np.minimum(1.0, overlap / max(1, n_q))
+
@@ -1,105 +1,465 @@
+import itertools
 import os
 import sys
-import json
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields, replace
+from typing import Iterator, List, Tuple
+
 import numpy as np
+import pandas as pd
 
 # project imports
 from data.adapters import CSVFolderAdapter
 from data.preprocess import normalize_column
-from embedding.embedder import FastTextEmbedder
+from embedding.embedder import EmbeddingModel, FastTextEmbedder, make_embedder
+from embedding.cache import CacheStats, EmbeddingCache, with_cache
 from index.pivots import PivotSelector
-from index.grid import HierarchicalGrid
+from index.grid import fit_grid
+from index.grid_tree import GridTree
 from index.inverted_index import InvertedIndex
+from index.builder import StreamingIndexBuilder
+from index.candidates import IVFCandidates, build_ivf_lists
+from index.quantization import make_quantizer
+from index.maintenance import IndexUpdater, index_drift
+from index.shards import reference_fit, shard_count, shard_dir, shard_meta, shard_of, write_empty_shard
+from index.storage import INDEX_DIRNAME, IndexReader, index_exists, write_index
 from utils.config import Config
+from utils.metrics import NULL_METRICS, Metrics
 from utils.types import TableId, ColumnId, GREEN, RED, YELLOW, RESET
 
 
-def _to_serializable(obj):
-    if isinstance(obj, np.ndarray):
-        return obj.tolist()
-    if isinstance(obj, (list, tuple)):
-        return [_to_serializable(x) for x in obj]
-    return obj
+def _embed_table(
+    adapter: CSVFolderAdapter,
+    df: pd.DataFrame,
+    embedder: EmbeddingModel,
+    cfg: Config,
+) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """
+    Normalize one table, pick its key columns and embed their distinct
+    values; returns (column, vectors, row count per vector) per column.
+    """
+    distinct = {}
+    for c in df.columns:
+        values, inverse = normalize_column(df[c], return_inverse=True)
+        distinct[c] = values, inverse
+        df[c] = np.asarray(values, dtype=object)[inverse]
+
+    columns = []
+    key_cols = adapter.detect_key_columns(df)
+    for cid in key_cols:
+        col_name = cid.name
+        values, inverse = distinct[col_name]
+        if len(inverse) < cfg.min_col_len:
+            continue
+        counts = np.bincount(inverse, minlength=len(values)).astype(np.int32)
+        columns.append((col_name, embedder.embed(values), counts))
+    return columns
+
+
+def _adapter(dataset_dir: str, cfg: Config) -> CSVFolderAdapter:
+    return CSVFolderAdapter(
+        dataset_dir, engine=cfg.csv_engine, sniff_rows=cfg.ingest_sniff_rows, max_rows=cfg.ingest_max_rows,
+    )
+
+
+def _table_names(adapter: CSVFolderAdapter, cfg: Config) -> List[str]:
+    """Tables of the lake, or of the shard cfg builds."""
+    names = adapter.table_names()
+    if cfg.shards <= 1:
+        return names
+    return [fname for fname in names if shard_of(fname, cfg.shards) == cfg.shard]
+
+
+# per-process state of offline build workers
+_worker: dict = {}
+
+
+def _init_worker(model: EmbeddingModel | None, dataset_dir: str, out_dir: str, cfg: Config):
+    if model is None:
+        model = make_embedder(cfg.embedding_model)
+    _worker["adapter"] = _adapter(dataset_dir, cfg)
+    # workers only read the persistent cache; new vectors go back to the parent
+    _worker["embedder"] = with_cache(model, cfg, out_dir, persist=False)
+    _worker["cfg"] = cfg
+
+
+def _worker_table(fname: str):
+    adapter, embedder = _worker["adapter"], _worker["embedder"]
+    df = adapter.load_table(fname)
+    columns = [] if df is None else _embed_table(adapter, df, embedder, _worker["cfg"])
+    if isinstance(embedder, EmbeddingCache):
+        stats, embedder.stats = embedder.stats, CacheStats()
+        return columns, embedder.take_new(), stats, adapter.last_load
+    return columns, None, None, adapter.last_load
+
+
+def _iter_embedded_tables(
+    adapter: CSVFolderAdapter,
+    model: EmbeddingModel,
+    embedder: EmbeddingModel,
+    dataset_dir: str,
+    out_dir: str,
+    cfg: Config,
+    names: List[str] | None = None,
+    metrics: Metrics = NULL_METRICS,
+) -> Iterator[Tuple[TableId, List[Tuple[str, np.ndarray, np.ndarray]]]]:
+    """
+    Yield (table, [(column, vectors, counts)]) in sorted table order (all tables, or just `names`).
+
+    With cfg.workers > 1 tables are sharded across a process pool. Where
+    fork is available the already loaded model is inherited copy-on-write
+    instead of being loaded again in every worker. Results come back in
+    submission order, so column ids do not depend on the worker count, and
+    only a bounded number of tables is in flight at a time.
+    """
+    names = adapter.table_names() if names is None else sorted(names)
+    if cfg.workers <= 1:
+        for fname in names:
+            print(f"Processing table: {fname}")
+            df = adapter.load_table(fname)
+            if df is not None:
+                print(f"  {adapter.last_load}")
+                _count_table(metrics, adapter.last_load)
+                yield TableId(fname), _embed_table(adapter, df, embedder, cfg)
+        return
+
+    if "fork" in mp.get_all_start_methods():
+        ctx, shared = mp.get_context("fork"), model
+    else:
+        ctx = mp.get_context("spawn")
+        shared = None if isinstance(model, FastTextEmbedder) else model
+    with ProcessPoolExecutor(
+        max_workers=cfg.workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(shared, dataset_dir, out_dir, cfg),
+    ) as pool:
+        # keep at most 2 tables per worker in flight so finished columns
+        # do not pile up in memory faster than the caller consumes them
+        pending: deque = deque()
+        todo = iter(names)
+        for fname in itertools.islice(todo, 2 * cfg.workers):
+            pending.append((fname, pool.submit(_worker_table, fname)))
+        while pending:
+            fname, future = pending.popleft()
+            columns, new, stats, load = future.result()
+            for nxt in itertools.islice(todo, 1):
+                pending.append((nxt, pool.submit(_worker_table, nxt)))
+            print(f"Processed table: {fname}" + (f" ({load})" if load is not None else ""))
+            _count_table(metrics, load)
+            if isinstance(embedder, EmbeddingCache) and new is not None:
+                embedder.store(*new)
+                for field in fields(stats):
+                    setattr(embedder.stats, field.name,
+                            getattr(embedder.stats, field.name) + getattr(stats, field.name))
+            yield TableId(fname), columns
+
+
+def _count_table(metrics: Metrics, load):
+    metrics.count("tables")
+    if load is not None:
+        metrics.count("bytes_read", load.bytes_read)
+        metrics.count("parse_s", load.parse_s)
+
+
+def _count_columns(metrics: Metrics, columns: List[Tuple[str, np.ndarray, np.ndarray]]):
+    for _, vecs, counts in columns:
+        metrics.count("columns")
+        metrics.count("rows", int(counts.sum()))
+        metrics.count("values_embedded", len(vecs))
+
 
 # OFFLINE PHASE
-def run_offline(dataset_dir: str, out_dir: str, cfg: Config):
+def run_offline(dataset_dir: str, out_dir: str, cfg: Config, model: EmbeddingModel | None = None):
+    """
+    Build the index of `dataset_dir` in `out_dir`.
+
+    With cfg.shards > 1, builds shard cfg.shard (see index.shards) in
+    <out_dir>/shard-NNN, or every shard, shard 0 first, if cfg.shard is None.
+    """
+    frozen = None
+    if cfg.shards > 1:
+        if cfg.shard is None:
+            model = model or make_embedder(cfg.embedding_model)
+            for shard in range(cfg.shards):
+                run_offline(dataset_dir, out_dir, replace(cfg, shard=shard), model)
+            return
+        if cfg.shard != 0:
+            try:
+                frozen = reference_fit(out_dir)
+            except FileNotFoundError as e:
+                print(f"{RED}{e}{RESET}")
+                sys.exit(1)
+        out_dir = shard_dir(out_dir, cfg.shard)
+        print(f"\nBuilding shard {cfg.shard} of {cfg.shards}" + (" (pivots and grid of shard 0)" if frozen else ""))
+
     os.makedirs(out_dir, exist_ok=True)
-    adapter = CSVFolderAdapter(dataset_dir)
-    embedder = FastTextEmbedder(dim=300)
+    adapter = _adapter(dataset_dir, cfg)
+    model = model or make_embedder(cfg.embedding_model)
+    embedder = with_cache(model, cfg, out_dir)
+    # fingerprints are taken before reading, so later edits show up as changes
+    sources = {fname: adapter.fingerprint(fname) for fname in _table_names(adapter, cfg)}
+
+    metrics = Metrics.from_config(cfg, "build", dataset_dir)
+    if cfg.streaming_build:
+        _run_offline_streaming(adapter, model, embedder, dataset_dir, out_dir, cfg, sources, metrics, frozen)
+    else:
+        _run_offline_in_memory(adapter, model, embedder, dataset_dir, out_dir, cfg, sources, metrics, frozen)
+
+    _print_cache_stats(embedder)
+    if hasattr(embedder, "stats"):
+        metrics.count_fields(embedder.stats, "cache_")
+    metrics.finish()
+    print(f"{GREEN}OFFLINE PHASE COMPLETED{RESET}")
+
 
+def _print_cache_stats(embedder: EmbeddingModel):
+    if hasattr(embedder, "stats"):
+        st = embedder.stats
+        print(f"Embedding cache: {st.requested} values, {st.memory_hits} memory hits, "
+              f"{st.disk_hits} disk hits, {st.misses} embedded")
+
+
+def _run_offline_streaming(adapter, model, embedder, dataset_dir: str, out_dir: str, cfg: Config, sources: dict,
+                           metrics: Metrics = NULL_METRICS, frozen=None):
+    """Bounded-memory build: columns go to disk as they are embedded."""
+    index_dir = os.path.join(out_dir, INDEX_DIRNAME)
+    builder = StreamingIndexBuilder(index_dir, cfg, dim=embedder.dim, frozen=frozen)
+
+    print(f"\nScanning dataset for offline phase ({cfg.workers} worker(s), streaming)...")
+    tables = _iter_embedded_tables(adapter, model, embedder, dataset_dir, out_dir, cfg, list(sources), metrics)
+    with metrics.stage("ingest_embed"):
+        for table_id, columns in tables:
+            _count_columns(metrics, columns)
+            for col_name, vecs, counts in columns:
+                builder.add_column(table_id.name, col_name, vecs, counts)
+
+    if len(builder) == 0:
+        builder.abandon()
+        if frozen is not None:
+            return _write_empty_shard(out_dir, cfg, frozen, sources)
+        _no_embeddings(cfg)
+
+    print(f"Collected embeddings: ({len(builder)}, {builder.dim})")
+    summary = builder.finish(sources, metrics)
+    metrics.count("postings", summary["postings"])
+    fitted = "shard 0's pivots and grid" if frozen else f"pivots fitted on {summary['sampled']} sampled vectors"
+    print(f"{GREEN}Saved index to {index_dir} ({summary['postings']} postings, {fitted}){RESET}")
+    _print_posting_stats(summary["grid_levels"], summary["posting_lists"])
+
+
+def _run_offline_in_memory(adapter, model, embedder, dataset_dir: str, out_dir: str, cfg: Config, sources: dict,
+                           metrics: Metrics = NULL_METRICS, frozen=None):
     all_embeddings = []
     col_embeddings = {}
+    col_counts = {}
     col_meta = {}
     col_id_counter = 0
 
-    print(f"\nScanning dataset for offline phase...")
-    for table_id, df in adapter.iter_tables():
-        print(f"Processing table: {table_id.name}")
-        for c in df.columns:
-            df[c] = normalize_column(df[c])
-
-        key_cols = adapter.detect_key_columns(df)
-        for cid in key_cols:
-            col_name = cid.name
-            values = df[col_name].tolist()
-            if len(values) < cfg.min_col_len:
-                continue
-            vecs = embedder.embed(values)
-            col_embeddings[col_id_counter] = vecs
-            col_meta[col_id_counter] = {"table": table_id.name, "column": col_name}
-            all_embeddings.append(vecs)
-            col_id_counter += 1
+    print(f"\nScanning dataset for offline phase ({cfg.workers} worker(s))...")
+    tables = _iter_embedded_tables(adapter, model, embedder, dataset_dir, out_dir, cfg, list(sources), metrics)
+    with metrics.stage("ingest_embed"):
+        for table_id, columns in tables:
+            _count_columns(metrics, columns)
+            for col_name, vecs, counts in columns:
+                # rounded to the stored dtype now, so pivot distances, summaries and IVF
+                # radii describe the rows queries will verify against
+                stored = np.asarray(vecs).astype(cfg.dtype, copy=False)
+                col_embeddings[col_id_counter] = stored
+                col_counts[col_id_counter] = counts
+                col_meta[col_id_counter] = {"table": table_id.name, "column": col_name}
+                all_embeddings.append(stored)
+                col_id_counter += 1
 
     if not all_embeddings:
-        print(f"{RED}No embeddings found!{RESET}")
-        sys.exit(1)
+        if frozen is not None:
+            return _write_empty_shard(out_dir, cfg, frozen, sources)
+        _no_embeddings(cfg)
 
     all_embeddings = np.vstack(all_embeddings)
     print(f"Collected embeddings: {all_embeddings.shape}")
 
-    # pivots
-    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
-    pivots = selector.fit(all_embeddings)
-    np.save(os.path.join(out_dir, "pivots.npy"), pivots)
-    print(f"{GREEN}Saved pivots.npy{RESET}")
+    if frozen is None:
+        # pivots, fitted on a sample
+        with metrics.stage("pivots"):
+            selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed, strategy=cfg.pivot_strategy)
+            pivots = selector.fit(_fit_sample(cfg, all_embeddings))
 
-    # grid
-    grid = HierarchicalGrid(levels=cfg.grid_levels)
-    grid.fit(selector.transform(all_embeddings))
-    grid_config = {"levels": grid.levels, "bin_edges": _to_serializable(grid.bin_edges)}
-    with open(os.path.join(out_dir, "grid.json"), "w") as f:
-        json.dump(grid_config, f)
-    print(f"{GREEN}Saved grid.json{RESET}")
+    else:
+        selector, grid = frozen
+        pivots = selector.pivots
+
+    # pivot distances of all rows, computed once for the grid and the postings
+    with metrics.stage("transform"):
+        all_dists = selector.transform(all_embeddings)
+
+    if frozen is None:
+        # grid
+        with metrics.stage("grid"):
+            grid = fit_grid(all_dists, cfg.grid_levels, cfg.grid_bins, cfg.grid_cell_cap)
 
     # inverted index
-    inv = InvertedIndex()
-    for cid, vecs in col_embeddings.items():
-        dists = selector.transform(vecs)
-        cells_per_row = grid.transform(dists)
-        leaf_cells = [row[-1] for row in cells_per_row]
-        t = TableId(col_meta[cid]["table"])
-        c = ColumnId(col_meta[cid]["column"])
-        inv.add(leaf_cells, t, c)
-
-    inv_serializable = []
-    for cell, postings in inv.index.items():
-        inv_serializable.append({
-            "cell": [int(x) for x in cell],
-            "postings": [
-                {"table": p[0].name, "column": p[1].name, "row_id": int(p[2])}
-                for p in postings
-            ]
-        })
-    with open(os.path.join(out_dir, "inverted_index.json"), "w") as f:
-        json.dump(inv_serializable, f)
-    print(f"{GREEN}Saved inverted_index.json{RESET}")
-
-    # save embeddings for lookup in online phase
-    np.savez_compressed(
-        os.path.join(out_dir, "embeddings.npz"),
-        **{str(cid): vecs for cid, vecs in col_embeddings.items()}
+    with metrics.stage("postings"):
+        inv = InvertedIndex()
+        tree = GridTree(levels=grid.levels)
+        col_dists = {}
+        offset = 0
+        for cid, vecs in col_embeddings.items():
+            dists = all_dists[offset:offset + len(vecs)]
+            offset += len(vecs)
+            col_dists[cid] = dists
+            codes = grid.transform_codes(dists)
+            t = TableId(col_meta[cid]["table"])
+            c = ColumnId(col_meta[cid]["column"])
+            inv.add(codes[:, -1], t, c)
+            tree.add(codes, dists)
+        tree.finalize()
+
+    ivf = None
+    if cfg.candidate_generator == "ivf":
+        with metrics.stage("ivf"):
+            ivf = _build_ivf(cfg, all_embeddings, [len(col_embeddings[cid]) for cid in col_meta], inv.columns)
+    quantizer = make_quantizer(cfg.embedding_codes, cfg.pq_subspaces, cfg.seed)
+    if quantizer is not None:
+        with metrics.stage("quantizer"):
+            quantizer.fit(_fit_sample(cfg, all_embeddings))
+
+    # pivots, grid, postings, embeddings and pivot distances as one memory-mapped index
+    index_dir = os.path.join(out_dir, INDEX_DIRNAME)
+    with metrics.stage("write"):
+        write_index(index_dir, pivots, grid, tree, inv, col_meta, col_embeddings, col_dists, cfg.dtype, sources,
+                    col_counts, ivf, quantizer, shard_meta(cfg))
+    metrics.count("postings", len(inv))
+    print(f"{GREEN}Saved index to {index_dir} ({len(inv)} postings){RESET}")
+    _print_posting_stats(grid.levels, inv.length_stats())
+
+
+def _no_embeddings(cfg: Config):
+    print(f"{RED}No embeddings found!{RESET}")
+    if cfg.shards > 1:
+        print(f"{YELLOW}Shard 0 fits pivots and grid for all shards and needs indexable tables; "
+              f"try fewer shards.{RESET}")
+    sys.exit(1)
+
+
+def _write_empty_shard(out_dir: str, cfg: Config, frozen, sources: dict):
+    """Index of a shard without indexable columns: shard 0's pivots and grid, no rows."""
+    selector, grid = frozen
+    write_empty_shard(os.path.join(out_dir, INDEX_DIRNAME), selector, grid, cfg, sources)
+    print(f"{YELLOW}Shard {cfg.shard} has no indexable columns; wrote an empty index.{RESET}")
+
+
+def _print_posting_stats(levels: int, stats: dict):
+    print(f"Posting lists: {stats['cells']} cells ({levels} grid levels), mean {stats['mean']:.1f}, "
+          f"p99 {stats['p99']:.0f}, max {stats['max']}, Gini {stats['gini']:.2f}")
+
+
+def _fit_sample(cfg: Config, embeddings: np.ndarray) -> np.ndarray:
+    """At most pivot_sample_size rows to fit pivots, IVF centroids and quantizers on."""
+    if len(embeddings) <= cfg.pivot_sample_size:
+        return embeddings
+    rng = np.random.default_rng(cfg.seed)
+    return embeddings[rng.choice(len(embeddings), cfg.pivot_sample_size, replace=False)]
+
+
+def _build_ivf(cfg: Config, embeddings: np.ndarray, lengths: List[int], columns: list) -> IVFCandidates:
+    """IVF lists over all embeddings (stacked column by column), centroids fitted on a sample."""
+    sample = _fit_sample(cfg, embeddings)
+    centroids = IVFCandidates.fit_centroids(
+        sample, cfg.ivf_lists or IVFCandidates.default_lists(len(embeddings)), cfg.seed,
     )
-    with open(os.path.join(out_dir, "col_meta.json"), "w") as f:
-        json.dump(col_meta, f)
+    list_ids, center_dists = IVFCandidates.assign(centroids, embeddings)
+    col_ids = np.repeat(np.arange(len(lengths), dtype=np.int32), lengths)
+    row_ids = np.concatenate([np.arange(n, dtype=np.int32) for n in lengths])
+    print(f"IVF: {len(centroids)} lists fitted on {len(sample)} vectors")
+    return build_ivf_lists(centroids, columns, list_ids, col_ids, row_ids, center_dists)
+
+
+# INCREMENTAL UPDATE
+def run_update(dataset_dir: str, out_dir: str, cfg: Config, model: EmbeddingModel | None = None):
+    """
+    Bring an existing index in line with `dataset_dir` without a full rebuild.
+
+    Files are compared with the source manifest stored in the index: same
+    size and mtime means unchanged, otherwise the content hash decides.
+    Added and modified files are embedded and appended under the frozen
+    pivots and grid; columns of modified and removed files are tombstoned.
+    Falls back to run_offline when there is no index (or it predates
+    source manifests). A sharded index is updated shard by shard (all of
+    them unless cfg.shard is set; the shard count is read from the index).
+    """
+    if cfg.shards <= 1 and shard_count(out_dir) > 1:
+        cfg = replace(cfg, shards=shard_count(out_dir))
+    if cfg.shards > 1:
+        if cfg.shard is None:
+            model = model or make_embedder(cfg.embedding_model)
+            for shard in range(cfg.shards):
+                run_update(dataset_dir, out_dir, replace(cfg, shard=shard), model)
+            return
+        index_dir = os.path.join(shard_dir(out_dir, cfg.shard), INDEX_DIRNAME)
+    else:
+        index_dir = os.path.join(out_dir, INDEX_DIRNAME)
+    if not index_exists(index_dir):
+        print(f"{YELLOW}No index in {out_dir}, running a full build.{RESET}")
+        return run_offline(dataset_dir, out_dir, cfg, model)
+    if not IndexReader(index_dir).manifest["columns"]:
+        print(f"{YELLOW}Shard {cfg.shard} has no indexed columns, rebuilding it.{RESET}")
+        return run_offline(dataset_dir, out_dir, cfg, model)
+    updater = IndexUpdater(index_dir)
+    old_sources = updater.reader.manifest.get("sources")
+    if not old_sources:
+        print(f"{YELLOW}Index has no source manifest, running a full build.{RESET}")
+        updater.abandon()
+        return run_offline(dataset_dir, out_dir, cfg, model)
+    if cfg.shards > 1:
+        out_dir = shard_dir(out_dir, cfg.shard)
+
+    adapter = _adapter(dataset_dir, cfg)
+    sources, changed = {}, []
+    for fname in _table_names(adapter, cfg):
+        old = old_sources.get(fname)
+        fp = adapter.fingerprint(fname, with_hash=False)
+        if old and old["size"] == fp["size"] and old["mtime_ns"] == fp["mtime_ns"]:
+            sources[fname] = old
+            continue
+        fp["hash"] = adapter.content_hash(fname)
+        sources[fname] = fp
+        if not old or old["hash"] != fp["hash"]:
+            changed.append(fname)
+    removed = sorted(set(old_sources) - set(sources))
+    added = [f for f in changed if f not in old_sources]
+    where = f" of shard {cfg.shard}" if cfg.shards > 1 else ""
+    print(f"\nIncremental update{where}: {len(added)} added, {len(changed) - len(added)} modified, "
+          f"{len(removed)} removed, {len(sources) - len(changed)} unchanged")
+
+    metrics = Metrics.from_config(cfg, "update", dataset_dir)
+    metrics.count("tables_removed", len(removed))
+    for fname in removed + changed:
+        updater.remove_table(fname)
+    if changed:
+        model = model or make_embedder(cfg.embedding_model)
+        embedder = with_cache(model, cfg, out_dir)
+        tables = _iter_embedded_tables(adapter, model, embedder, dataset_dir, out_dir, cfg, changed, metrics)
+        with metrics.stage("ingest_embed"):
+            for table_id, columns in tables:
+                _count_columns(metrics, columns)
+                for col_name, vecs, counts in columns:
+                    updater.add_column(table_id.name, col_name, vecs, counts)
+        _print_cache_stats(embedder)
+        if hasattr(embedder, "stats"):
+            metrics.count_fields(embedder.stats, "cache_")
+    with metrics.stage("commit"):
+        updater.commit(sources)
+    metrics.finish()
 
-    print(f"{GREEN}OFFLINE PHASE COMPLETED{RESET}")
\ No newline at end of file
+    report = index_drift(index_dir)
+    print(f"Rows: {report.total_rows} ({report.added_rows} added since last fit, "
+          f"{report.dead_rows} tombstoned); drift: {report.drift:.3f} "
+          f"(out of range {report.out_of_range:.3f}, cell shift {report.shift:.3f})")
+    if report.needs_compaction(cfg):
+        print(f"{YELLOW}{report.dead_fraction:.0%} of rows are tombstoned; consider compacting the index.{RESET}")
+    if report.needs_refit(cfg):
+        print(f"{YELLOW}Data has drifted from the fitted pivots/grid; consider a full rebuild.{RESET}")
+    print(f"{GREEN}INCREMENTAL UPDATE COMPLETED{RESET}")
@@ -1,80 +1,92 @@
+from __future__ import annotations
 import os
-import json
 import csv
-import numpy as np
 import pandas as pd
+from typing import Iterator, List, Tuple
 
-from data.preprocess import normalize_column
-from embedding.embedder import FastTextEmbedder
-from index.pivots import PivotSelector
-from index.grid import HierarchicalGrid
-from index.inverted_index import InvertedIndex
-from search.blocking import Blocker
-from search.verify import Verifier
+from embedding.embedder import EmbeddingModel
+from search.engine import QueryEngine
+from search.shards import open_engine
 from utils.config import Config
-from utils.types import TableId, ColumnId, GREEN, RED, YELLOW, RESET
+from utils.metrics import Metrics
+from utils.types import GREEN, RED, YELLOW, RESET
 
 
-# ONLINE PHASE
-def run_online(query_dir: str, out_dir: str, cfg: Config):
-    print(f"\nStarting ONLINE PHASE...")
-    embedder = FastTextEmbedder(dim=300)
+def _query_batches(query_dir: str, query_files: List[str], max_rows: int) -> Iterator[List[Tuple[str, str, pd.Series]]]:
+    """Group (file, column, values) of all query files into batches of about max_rows values."""
+    batch, batch_rows = [], 0
+    for qf in query_files:
+        df = pd.read_csv(os.path.join(query_dir, qf))
+        for qcol in df.columns:
+            if batch and batch_rows + len(df) > max_rows:
+                yield batch
+                batch, batch_rows = [], 0
+            batch.append((qf, qcol, df[qcol]))
+            batch_rows += len(df)
+    if batch:
+        yield batch
 
-    # load artifacts
-    pivots = np.load(os.path.join(out_dir, "pivots.npy"))
-    with open(os.path.join(out_dir, "grid.json")) as f:
-        grid_cfg = json.load(f)
-    with open(os.path.join(out_dir, "inverted_index.json")) as f:
-        inv_data = json.load(f)
-    with open(os.path.join(out_dir, "col_meta.json")) as f:
-        col_meta = json.load(f)
-    emb_data = np.load(os.path.join(out_dir, "embeddings.npz"))
 
-    # rebuild structures
-    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
-    selector.pivots = pivots
-    grid = HierarchicalGrid(levels=grid_cfg["levels"])
-    grid.bin_edges = grid_cfg["bin_edges"]
-    inv_index = InvertedIndex()
-    for entry in inv_data:
-        cell = tuple(entry["cell"])
-        for p in entry["postings"]:
-            inv_index.index[cell].append((TableId(p["table"]), ColumnId(p["column"]), p["row_id"]))
+def _query_all(engine: QueryEngine, batches) -> List[list]:
+    """Joinable (file, column, score) rows of every query column, batch by batch."""
+    rows = []
+    for batch in batches:
+        for qf, qcol, _ in batch:
+            print(f"{YELLOW}Querying column: {qcol} in {qf}{RESET}")
+        metrics = Metrics.from_config(engine.cfg, "query", ", ".join(f"{qf}:{qcol}" for qf, qcol, _ in batch))
+        verified_per_column, st = engine.query_batch(batch, metrics)
+        metrics.finish()
+        print(f"  cells visited: {st.cells_visited}, pairs pruned: {st.pairs_pruned}, "
+              f"accepted by lemma: {st.pairs_accepted}, verified exactly: {st.pairs_verified}, "
+              f"matched: {st.pairs_matched}")
+        print(f"  candidate columns: {st.columns_reached}, pruned by column summaries: {st.columns_pruned_summary}, "
+              f"by cells: {st.columns_pruned_cells}, scanned: {st.columns_scanned}")
+        if engine.cfg.embedding_codes != "none":
+            print(f"  distances on {engine.cfg.embedding_codes} codes, re-ranked on stored vectors: {st.pairs_reranked}")
 
-    # rebuild cand_vecs_map
-    cand_vecs_map = {}
-    for cid_str, meta in col_meta.items():
-        vecs = emb_data[cid_str]
-        key = (meta["table"], meta["column"])
-        cand_vecs_map[key] = vecs
+        for verified in verified_per_column:
+            for res in verified:
+                if res.is_joinable:
+                    rows.append([res.candidate_table.name, res.candidate_column.name, res.joinability])
+    return rows
 
-    # query
-    query_files = [f for f in os.listdir(query_dir) if f.endswith(".csv") or f.endswith(".tsv")]
-    results_out = []
-    for qf in query_files:
-        qpath = os.path.join(query_dir, qf)
-        df = pd.read_csv(qpath)
-        for qcol in df.columns:
-            print(f"{YELLOW}Querying column: {qcol} in {qf}{RESET}")
-            values = normalize_column(df[qcol])
-            q_vecs = embedder.embed(values)
 
-            q_dists = selector.transform(q_vecs)
-            q_cells = grid.transform(q_dists)
-            leaf_cells = [row[-1] for row in q_cells]
+def _query_top_k(engine: QueryEngine, batches, k: int) -> List[list]:
+    """As _query_all, keeping only the k best joinable columns per query column."""
+    rows = []
+    for batch in batches:
+        for qf, qcol, values in batch:
+            print(f"{YELLOW}Querying column: {qcol} in {qf} (top {k}){RESET}")
+            metrics = Metrics.from_config(engine.cfg, "query", f"{qf}:{qcol}")
+            best, st, tk = engine.query_top_k(qf, qcol, values, k, metrics)
+            metrics.finish()
+            print(f"  candidate columns: {tk.columns}, pruned by column summaries: {st.columns_pruned_summary}, "
+                  f"by cells: {st.columns_pruned_cells}, scored: {tk.columns_scored}, "
+                  f"abandoned: {tk.columns_abandoned}, skipped: {tk.columns_skipped}, "
+                  f"pairs pruned: {st.pairs_pruned}, verified exactly: {st.pairs_verified}")
+            if engine.cfg.embedding_codes != "none":
+                print(f"  distances on {engine.cfg.embedding_codes} codes, re-ranked on stored vectors: {st.pairs_reranked}")
+            for res in best:
+                rows.append([res.candidate_table.name, res.candidate_column.name, res.joinability])
+    return rows
 
-            postings = {}
-            for cell in leaf_cells:
-                postings[cell] = inv_index.query(cell)
 
-            blocker = Blocker(cfg)
-            verifier = Verifier(cfg)
-            candidates = blocker.block(q_vecs, postings, cand_vecs_map)
-            verified = verifier.verify(TableId(qf), ColumnId(qcol), len(values), candidates)
+# ONLINE PHASE
+def run_online(query_dir: str, out_dir: str, cfg: Config, model: EmbeddingModel | None = None):
+    print(f"\nStarting ONLINE PHASE...")
+    engine = open_engine(out_dir, cfg, model)
+
+    query_files = [f for f in os.listdir(query_dir) if f.endswith(".csv") or f.endswith(".tsv")]
+    batches = _query_batches(query_dir, query_files, cfg.query_batch_rows)
+    if cfg.top_k > 0:
+        results_out = _query_top_k(engine, batches, cfg.top_k)
+    else:
+        results_out = _query_all(engine, batches)
 
-            for res in verified:
-                if res.is_joinable:
-                    results_out.append([res.candidate_table.name, res.candidate_column.name, res.joinability])
+    if hasattr(engine.embedder, "stats"):
+        st = engine.embedder.stats
+        print(f"Embedding cache: {st.requested} values, {st.memory_hits} memory hits, "
+              f"{st.disk_hits} disk hits, {st.misses} embedded")
 
     out_csv = os.path.join(out_dir, "joinable.csv")
     with open(out_csv, "w", newline="", encoding="utf-8") as f:
@@ -1,17 +1,161 @@
 import argparse
+import sys
 
 from utils.config import Config
-from offline import run_offline
+from embedding.embedder import EMBEDDING_MODELS, make_embedder
+from index.maintenance import compact_index
+from index.shards import index_paths
+from offline import run_offline, run_update
 from online import run_online
+from search.shards import run_shard_server
+from server import serve
+
+COMMANDS = ("build", "query", "serve", "shard", "run")
+
+
+def build(args, cfg: Config, model=None):
+    if args.update:
+        run_update(args.dataset_dir, args.output_dir, cfg, model)
+    else:
+        run_offline(args.dataset_dir, args.output_dir, cfg, model)
+    if args.compact:
+        for path in index_paths(args.output_dir):
+            stats = compact_index(path)
+            print(f"Compaction of {path} removed {stats['columns_removed']} columns ({stats['rows_removed']} rows)")
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--dataset_dir", required=True)
-    parser.add_argument("--query_dir", required=True)
-    parser.add_argument("--output_dir", required=True)
-    args = parser.parse_args()
-
-    cfg = Config()
-    run_offline(args.dataset_dir, args.output_dir, cfg)
-    run_online(args.query_dir, args.output_dir, cfg)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--output_dir", required=True)
+    common.add_argument("--embedding_cache_dir", default=None,
+                        help="persistent embedding cache shared across runs (default: <output_dir>/embedding_cache)")
+    common.add_argument("--embedder", choices=EMBEDDING_MODELS, default="fasttext",
+                        help="embedding model; hashing: hashed character n-grams, no download (for tests/benchmarks)")
+    common.add_argument("--metrics", default=None, metavar="PATH",
+                        help="append stage timings and counters per build/query batch to this JSON lines file")
+    common.add_argument("--profile", default=None, metavar="DIR",
+                        help="write a cProfile dump per build/query batch to this directory")
+    common.add_argument("--candidates", choices=("grid", "ivf"), default="grid",
+                        help="candidate generator; ivf also builds IVF lists at index time")
+    common.add_argument("--ivf_nprobe", type=int, default=0,
+                        help="IVF lists probed per query vector (0: all reachable lists, exact)")
+    common.add_argument("--codes", choices=("none", "sq8", "pq"), default="none",
+                        help="quantized embedding codes; blocking estimates distances on them and "
+                             "re-ranks pairs near tau on the stored vectors")
+
+    build_args = argparse.ArgumentParser(add_help=False)
+    build_args.add_argument("--dataset_dir", required=True)
+    build_args.add_argument("--workers", type=int, default=1,
+                            help="worker processes for the offline build")
+    build_args.add_argument("--streaming", action="store_true",
+                            help="bounded-memory offline build (see --memory_budget_mb)")
+    build_args.add_argument("--memory_budget_mb", type=int, default=1024,
+                            help="memory budget of the streaming build")
+    build_args.add_argument("--update", action="store_true",
+                            help="apply added/modified/removed dataset files to the existing index")
+    build_args.add_argument("--compact", action="store_true",
+                            help="drop tombstoned columns from the index")
+    build_args.add_argument("--pivot_strategy", default="pca",
+                            choices=("pca", "pca_outlier", "farthest_first", "max_variance"),
+                            help="how pivots are picked (compare with python -m index.pivots <index_dir>)")
+    build_args.add_argument("--pivots_k", type=int, default=3, help="number of pivots")
+    build_args.add_argument("--grid_bins", choices=("uniform", "quantile"), default="quantile",
+                            help="grid bin edges: equal width, or equal depth (quantiles of the data)")
+    build_args.add_argument("--grid_cell_cap", type=int, default=0,
+                            help="add grid levels until no cell holds more rows (0: fixed levels)")
+    build_args.add_argument("--csv_engine", choices=("c", "pyarrow"), default="c",
+                            help="CSV parser (pyarrow must be installed)")
+    build_args.add_argument("--sniff_rows", type=int, default=0,
+                            help="pick key columns on the first n rows of each file and parse only those (0: off)")
+    build_args.add_argument("--max_rows", type=int, default=0,
+                            help="index only the first n rows of each file (0: all)")
+    build_args.add_argument("--embedding_dtype", choices=("float32", "float16"), default="float32",
+                            help="precision of the stored embeddings")
+    build_args.add_argument("--shards", type=int, default=1,
+                            help="partition tables into n shards by a hash of their name (<output_dir>/shard-NNN)")
+    build_args.add_argument("--shard", type=int, default=None,
+                            help="with --shards: build only this shard (shard 0 must be built first)")
+
+    shard_args = argparse.ArgumentParser(add_help=False)
+    shard_args.add_argument("--shard_mode", choices=("thread", "process"), default="thread",
+                            help="sharded index: search shards on threads, or in one local process each")
+    shard_args.add_argument("--shard_hosts", default=None, metavar="HOST:PORT,...",
+                            help="sharded index: shard servers (pexeso.py shard), shard 0 first; "
+                                 "needs PEXESO_SHARD_KEY")
+
+    query_args = argparse.ArgumentParser(add_help=False)
+    query_args.add_argument("--query_dir", required=True)
+    query_args.add_argument("--top_k", type=int, default=0,
+                            help="report only the k best joinable columns per query column (0: all)")
+    query_args.add_argument("--no_column_prefilter", action="store_true",
+                            help="read the rows of every candidate column, even those whose column "
+                                 "summaries rule out T_ratio")
+
+    parser = argparse.ArgumentParser(
+        description="PEXESO joinable table search. Without a command, builds the index and runs the queries."
+    )
+    sub = parser.add_subparsers(dest="command")
+    sub.add_parser("build", parents=[common, build_args], help="build or update the index")
+    sub.add_parser("query", parents=[common, query_args, shard_args],
+                   help="query an existing index with a folder of CSVs")
+    serve_parser = sub.add_parser("serve", parents=[common, shard_args],
+                                  help="answer queries over HTTP with a resident index")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--socket", default=None, help="listen on this Unix socket instead of TCP")
+    shard_parser = sub.add_parser("shard", parents=[common],
+                                  help="serve one shard of a sharded index to remote coordinators")
+    shard_parser.add_argument("--shard", type=int, required=True)
+    shard_parser.add_argument("--host", default="127.0.0.1")
+    shard_parser.add_argument("--port", type=int, default=8800)
+    sub.add_parser("run", parents=[common, build_args, query_args, shard_args], help="build, then query (default)")
+
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv = ["run", *argv]  # original flag-only invocation
+    args = parser.parse_args(argv)
+
+    cfg = Config(
+        embedding_cache_dir=args.embedding_cache_dir,
+        candidate_generator=args.candidates,
+        ivf_nprobe=args.ivf_nprobe,
+        embedding_codes=args.codes,
+        embedding_model=args.embedder,
+        metrics_path=args.metrics,
+        profile_dir=args.profile,
+    )
+    if args.command in ("build", "run"):
+        cfg.workers = args.workers
+        cfg.streaming_build = args.streaming
+        cfg.memory_budget_mb = args.memory_budget_mb
+        cfg.dtype = args.embedding_dtype
+        cfg.pivot_strategy = args.pivot_strategy
+        cfg.pivots_k = args.pivots_k
+        cfg.grid_bins = args.grid_bins
+        cfg.grid_cell_cap = args.grid_cell_cap
+        cfg.csv_engine = args.csv_engine
+        cfg.ingest_sniff_rows = args.sniff_rows
+        cfg.ingest_max_rows = args.max_rows
+        if args.shard is not None and not 0 <= args.shard < args.shards:
+            parser.error("--shard must be in [0, --shards)")
+        cfg.shards = args.shards
+        cfg.shard = args.shard
+    if args.command in ("query", "run"):
+        cfg.top_k = args.top_k
+        cfg.column_prefilter = not args.no_column_prefilter
+    if args.command in ("query", "serve", "run"):
+        cfg.shard_mode = args.shard_mode
+        cfg.shard_hosts = tuple(args.shard_hosts.split(",")) if args.shard_hosts else ()
+
+    if args.command == "build":
+        build(args, cfg)
+    elif args.command == "query":
+        run_online(args.query_dir, args.output_dir, cfg)
+    elif args.command == "serve":
+        serve(args.output_dir, cfg, args.host, args.port, args.socket)
+    elif args.command == "shard":
+        run_shard_server(args.output_dir, args.shard, cfg, args.host, args.port)
+    else:
+        model = make_embedder(cfg.embedding_model)  # loaded once for both phases
+        build(args, cfg, model)
+        run_online(args.query_dir, args.output_dir, cfg, model)
@@ -1,56 +1,619 @@
 from __future__ import annotations
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Dict, List, Sequence, Tuple
 import numpy as np
 
+from index.candidates import CandidateGenerator, GridCandidates
+from index.grid import HierarchicalGrid
+from index.grid_tree import GridTree
+from index.inverted_index import InvertedIndex, PostingsBlock
+from index.pivots import PIVOT_BOUND_EPS
+from index.quantization import CodeBlock, QuantizedColumn
+from index.summaries import ColumnSummaries
 from utils.types import TableId, ColumnId
-from utils.config import Config
+from utils.config import Config, EarlyStop
+
+# Pairs whose GEMM-based squared distance lies this close to τ² are
+# re-checked with the exact difference norm, so float32 rounding in the
+# norm expansion never flips a match decision.
+_EXACT_RECHECK_EPS = 1e-4
+
+# Above this fraction of undecided pairs in a tile, a full GEMM is cheaper
+# than gathering the undecided pairs one by one.
+_DENSE_EXACT_FRACTION = 0.25
+
+# Query vectors scanned between two checks of whether a candidate column's
+# joinability is already decided.
+_STOP_CHECK_ROWS = 256
+
+# Slack on code error bounds for float32 rounding of estimated distances.
+_CODE_SLACK = 1e-3
+
+# Candidate columns whose summaries are tested against the query vectors at
+# once (working memory: 4 bytes per query column entry and column).
+_PREFILTER_COLUMNS = 256
+
+
+@dataclass
+class BlockingStats:
+    """Per-query counters of candidate column and (query vector, candidate vector) pair decisions."""
+    cells_visited: int = 0
+    columns_reached: int = 0         # candidate columns with postings in the cells searched
+    columns_pruned_summary: int = 0  # cannot reach T_ratio by their column summaries, no row read
+    columns_pruned_cells: int = 0    # cannot reach T_ratio by the query vectors reaching their cells
+    columns_scanned: int = 0         # compared row by row
+    pairs_pruned: int = 0      # rejected by a pivot lemma (cell or vector level) or with their column
+    pairs_accepted: int = 0    # accepted by a pivot lemma, no exact distance needed
+    pairs_verified: int = 0    # 300-d distance computed (on codes when candidates are quantized)
+    pairs_reranked: int = 0    # code distance too close to τ: recomputed on the stored vector
+    pairs_matched: int = 0     # within τ (accepted + verified matches)
+    pairs_skipped: int = 0     # never decided: query vector already matched, or column decided early
+
+
+@dataclass
+class QueryGroups:
+    """
+    Query columns of a batch over a set of (distinct) query vectors.
+
+    Entry i says that query vector vec_ids[i] occurs weights[i] times in
+    query column col_ids[i]; entries are sorted by vec_id. A vector shared
+    by several query columns is blocked once and its matches are credited
+    to every column it occurs in.
+    """
+    vec_ids: np.ndarray   # (e,) int64, sorted
+    col_ids: np.ndarray   # (e,) int64
+    weights: np.ndarray   # (e,) int64
+    n_columns: int
+
+    @classmethod
+    def from_offsets(cls, offsets: Sequence[int]) -> "QueryGroups":
+        """Column j owns query vectors [offsets[j], offsets[j+1])."""
+        offsets = np.asarray(offsets, dtype=np.int64)
+        n = int(offsets[-1])
+        return cls(
+            vec_ids=np.arange(n, dtype=np.int64),
+            col_ids=np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)),
+            weights=np.ones(n, dtype=np.int64),
+            n_columns=len(offsets) - 1,
+        )
+
+    @classmethod
+    def from_inverse(cls, inverse: np.ndarray, offsets: Sequence[int]) -> "QueryGroups":
+        """Column j holds values [offsets[j], offsets[j+1]); value i is distinct vector inverse[i]."""
+        offsets = np.asarray(offsets, dtype=np.int64)
+        n_columns = len(offsets) - 1
+        cols = np.repeat(np.arange(n_columns), np.diff(offsets))
+        pairs, weights = np.unique(np.asarray(inverse, dtype=np.int64) * n_columns + cols, return_counts=True)
+        return cls(vec_ids=pairs // n_columns, col_ids=pairs % n_columns, weights=weights, n_columns=n_columns)
+
+    def subset(self, rows: np.ndarray, n_vecs: int) -> "QueryGroups":
+        """Groups over query_vecs[rows] (rows sorted) instead of all n_vecs vectors."""
+        pos = np.full(n_vecs, -1, dtype=np.int64)
+        pos[rows] = np.arange(len(rows))
+        new = pos[self.vec_ids]
+        keep = new >= 0
+        return QueryGroups(new[keep], self.col_ids[keep], self.weights[keep], self.n_columns)
 
 
 class Blocker:
     """
     Blocking step:
-    - Find candidate columns in the same grid cell as query.
-    - Apply τ-based distance filtering to prune dissimilar vectors.
+    - Find candidate columns in cells within τ of the query: grid cells in
+      pivot space (range_query), or the cells of any CandidateGenerator
+      (candidates(), e.g. IVF lists).
+    - Apply pivot-based lemmas, then τ-based distance filtering, to prune
+      dissimilar vectors.
+
+    Pivot lemmas (triangle inequality, any pivot p):
+    - reject: |d(q, p) - d(x, p)| > τ  ⇒  d(q, x) > τ
+    - accept: d(q, p) + d(x, p) <= τ   ⇒  d(q, x) <= τ
+    Both are applied with a PIVOT_BOUND_EPS margin for float32 pivot
+    distances; pairs within it of τ get an exact distance.
+
+    With cfg.column_prefilter, whole candidate columns are dropped before
+    their rows are read when the query weight that could match them is
+    below T_ratio for every query column: first by the column summaries
+    (index.summaries), then by the query vectors reaching their cells.
     """
 
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Config,
+        grid: HierarchicalGrid | None = None,
+        tree: GridTree | None = None,
+        generator: CandidateGenerator | None = None,
+        summaries: ColumnSummaries | None = None,
+    ):
         self.cfg = config
+        self.grid = grid
+        self.tree = tree
+        self.summaries = summaries
+        # grid cells by default; cell-level lemmas come from the generator
+        if generator is None and (grid is not None or tree is not None):
+            generator = GridCandidates(grid, tree)
+        self.generator = generator
+        self.stats = BlockingStats()
+
+    @property
+    def tau(self) -> float:
+        # max distance in normalized L2 space (≈ 2.0)
+        return self.cfg.tau_ratio * 2.0
+
+    def range_query(
+        self,
+        query_dists: np.ndarray,             # (n_q, k)
+        inv_index: InvertedIndex,
+    ) -> PostingsBlock:
+        """
+        τ-ball range query in pivot space: return the postings of every leaf
+        cell that intersects the hyper-rectangle [d(q, p) - τ, d(q, p) + τ]
+        of at least one query vector.
+
+        With a GridTree the cells are found top-down, pruning and accepting
+        whole subtrees at coarse levels; otherwise every leaf cell of the
+        inverted index is tested. Starts a new self.stats.
+        """
+        if self.grid is None and self.tree is None:
+            raise RuntimeError("Blocker needs a grid or grid tree for range queries.")
+        self.stats = BlockingStats()
+        postings, self.stats.cells_visited = GridCandidates(self.grid, self.tree, inv_index).search(
+            None, query_dists, self.tau,
+        )
+        return postings
+
+    def candidates(
+        self,
+        query_vecs: np.ndarray,              # (n_q, d)
+        query_dists: np.ndarray | None,      # (n_q, k)
+    ) -> PostingsBlock:
+        """
+        Range query through the candidate generator (cfg.candidate_generator):
+        postings of every cell that may hold a vector within τ of at least
+        one query vector. Starts a new self.stats.
+        """
+        if self.generator is None:
+            raise RuntimeError("Blocker needs a candidate generator for candidates().")
+        self.stats = BlockingStats()
+        postings, self.stats.cells_visited = self.generator.search(query_vecs, query_dists, self.tau)
+        return postings
 
     def block(
         self,
         query_vecs: np.ndarray,              # (n_q, d)
-        candidate_postings: Dict[Tuple[int, ...], List[Tuple[TableId, ColumnId, int]]],
+        candidate_postings: PostingsBlock | Dict[int, List[Tuple[TableId, ColumnId, int]]],
         cand_vecs_map: Dict[Tuple[str, str], np.ndarray],  # (table, col) -> embeddings
-    ) -> Dict[Tuple[TableId, ColumnId], List[Tuple[np.ndarray, np.ndarray]]]:
+        query_dists: np.ndarray | None = None,             # (n_q, k) pivot distances
+        cand_dists_map: Dict[Tuple[str, str], np.ndarray] | None = None,  # (table, col) -> (n, k)
+    ) -> Dict[Tuple[TableId, ColumnId], int]:
         """
         Given query embeddings and postings from inverted index,
         return candidate column matches after τ filtering.
 
+        Postings (a PostingsBlock, or a {cell: [(table, col, row_id)]} dict)
+        are grouped by candidate column, the referenced rows are gathered
+        into one contiguous block and compared against all query vectors in
+        tiles. When pivot distances are supplied, each (query vector,
+        candidate) pair is first decided by the pivot lemmas at cell level
+        (needs a grid or grid tree) and then at vector level; only the
+        undecided pairs pay for an exact distance. Counters are accumulated
+        in self.stats.
+
+        Each candidate column keeps a bitset over the query vectors: once a
+        query vector has a match, the column's remaining vectors are not
+        compared with it, and the scan ends as soon as the column's
+        joinability is decided (cfg.verify_early_stop).
+
         Returns:
-            Dict[(table, col)] -> list of (q_vec, c_vec) pairs
+            Dict[(table, col)] -> number of query vectors with at least one
+            candidate row within τ (columns without matches are left out)
         """
-        candidates: Dict[Tuple[TableId, ColumnId], List[Tuple[np.ndarray, np.ndarray]]] = {}
+        query_vecs = np.asarray(query_vecs)
+        return self.block_batch(
+            query_vecs, QueryGroups.from_offsets([0, len(query_vecs)]),
+            candidate_postings, cand_vecs_map, query_dists, cand_dists_map,
+        )[0]
 
-        # Precompute max distance in normalized L2 space (≈ 2.0)
-        tau_threshold = self.cfg.tau_ratio * 2.0
+    def block_batch(
+        self,
+        query_vecs: np.ndarray,              # (n_q, d), all query columns' vectors
+        groups: QueryGroups,                 # query column(s) of each vector
+        candidate_postings: PostingsBlock | Dict[int, List[Tuple[TableId, ColumnId, int]]],
+        cand_vecs_map: Dict[Tuple[str, str], np.ndarray],
+        query_dists: np.ndarray | None = None,
+        cand_dists_map: Dict[Tuple[str, str], np.ndarray] | None = None,
+        workers: int = 1,
+    ) -> List[Dict[Tuple[TableId, ColumnId], int]]:
+        """
+        block() for several query columns at once.
 
-        for cell, postings in candidate_postings.items():
-            for (table, col, row_id) in postings:
-                key = (table, col)
-                cand_vecs = cand_vecs_map[(table.name, col.name)]
+        Every candidate column's rows are gathered once and compared against
+        the query vectors of all query columns in the same tiles (only the
+        vectors whose τ-rectangle reaches one of its cells); matched vectors
+        are then credited, with their weights, to the query columns they
+        occur in through `groups`. A query column's size is the sum of its
+        weights, so it counts repeated values. With
+        workers > 1 candidate columns are processed on a thread pool (the
+        distance GEMMs release the GIL). Pair counters in self.stats count
+        (query vector, candidate) pairs of the batch.
 
-                # Ensure row index is valid
-                if row_id >= len(cand_vecs):
-                    continue
+        Returns:
+            one block() result per query column
+        """
+        candidates: List[Dict[Tuple[TableId, ColumnId], int]] = [{} for _ in range(groups.n_columns)]
+        if isinstance(candidate_postings, dict):
+            candidate_postings = PostingsBlock.from_dict(candidate_postings)
+
+        query_vecs = np.asarray(query_vecs)
+        if len(query_vecs) == 0:
+            return candidates
 
-                c_vec = cand_vecs[row_id]
-                for q_vec in query_vecs:
-                    dist = np.linalg.norm(q_vec - c_vec)
+        use_pivots = query_dists is not None and cand_dists_map is not None
+        if use_pivots:
+            query_dists = np.asarray(query_dists)
+        cell_reject = cell_accept = None
+        if use_pivots and self.generator is not None and len(candidate_postings.cells):
+            hit, cell_accept = self._masks(query_vecs, query_dists, candidate_postings.cells)
+            cell_reject = ~hit
 
-                    # τ-based pruning
-                    if dist <= tau_threshold:
-                        if key not in candidates:
-                            candidates[key] = []
-                        candidates[key].append(row_id)
+        sizes = np.bincount(groups.col_ids, weights=groups.weights, minlength=groups.n_columns)
+        needed = np.ceil(self.cfg.T_ratio * sizes - 1e-9).astype(np.int64)
+        q_sq = np.einsum("ij,ij->i", query_vecs, query_vecs)
+        # with early stopping, columns that cannot reach T_ratio need no exact counts
+        prefilter = self.cfg.column_prefilter and self.cfg.verify_early_stop != "none"
+
+        def column_counts(item):
+            key, (row_ids, row_cells) = item
+            table, col = key
+            name_key = (table.name, col.name)
+            stats = BlockingStats()
+            if prefilter and cell_reject is not None:
+                active = np.flatnonzero(~cell_reject[:, row_cells].all(axis=1))
+                sub = groups.subset(active, len(query_vecs))
+                if (np.bincount(sub.col_ids, weights=sub.weights, minlength=groups.n_columns) < needed).all():
+                    stats.columns_pruned_cells += 1
+                    stats.pairs_pruned += len(query_vecs) * len(row_ids)
+                    return key, np.zeros(groups.n_columns, dtype=np.int64), stats
+            stats.columns_scanned += 1
+            cand_block, codes = self._gather(cand_vecs_map[name_key], row_ids)
+            cand_dists = cand_dists_map[name_key][row_ids] if use_pivots else None
+            if cell_reject is None:
+                matched, _ = self._column_matches(
+                    query_vecs, q_sq, query_dists, cand_block, cand_dists,
+                    None, None, groups, needed, stats, codes=codes,
+                )
+                return key, matched, stats
+
+            # only query vectors whose τ-rectangle reaches one of this column's cells
+            reject = cell_reject[:, row_cells]
+            active = np.flatnonzero(~reject.all(axis=1))
+            stats.pairs_pruned += (len(query_vecs) - len(active)) * len(row_ids)
+            matched, _ = self._column_matches(
+                query_vecs[active], q_sq[active], query_dists[active], cand_block, cand_dists,
+                reject[active], cell_accept[active][:, row_cells],
+                groups.subset(active, len(query_vecs)), needed, stats, codes=codes,
+            )
+            return key, matched, stats
+
+        grouped = self._group_postings(candidate_postings, cand_vecs_map)
+        self.stats.columns_reached += len(grouped)
+        if prefilter and self.summaries is not None:
+            grouped = self._prefilter(query_vecs, q_sq, query_dists if use_pivots else None, groups, needed, grouped)
+        grouped = grouped.items()
+        if workers > 1 and len(grouped) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                done = list(pool.map(column_counts, grouped))
+        else:
+            done = map(column_counts, grouped)
+
+        for key, matched, stats in done:
+            for field in fields(BlockingStats):
+                if field.name != "cells_visited":
+                    setattr(self.stats, field.name, getattr(self.stats, field.name) + getattr(stats, field.name))
+            for j in np.flatnonzero(matched):
+                candidates[j][key] = int(matched[j])
 
         return candidates
+
+    def _prefilter(
+        self,
+        query_vecs: np.ndarray,          # (n_q, d)
+        q_sq: np.ndarray,                # (n_q,)
+        query_dists: np.ndarray | None,  # (n_q, k)
+        groups: QueryGroups,
+        needed: np.ndarray,              # (n_columns,)
+        grouped: Dict[Tuple[TableId, ColumnId], Tuple[np.ndarray, np.ndarray]],
+    ) -> Dict[Tuple[TableId, ColumnId], Tuple[np.ndarray, np.ndarray]]:
+        """
+        Candidate columns of `grouped` that may make some query column
+        joinable: the weight of its query vectors that can reach the column
+        (ColumnSummaries.reachable) is at least `needed`.
+        """
+        if (needed <= 0).any():
+            return grouped  # an empty query column is reached by anything
+        # group entries by query column, so reachable weight is one reduceat per candidate chunk
+        order = np.argsort(groups.col_ids, kind="stable")
+        query_cols, starts = np.unique(groups.col_ids[order], return_index=True)
+        vec_ids = groups.vec_ids[order]
+        weights = groups.weights[order].astype(np.float32)[:, None]
+        keys = list(grouped)
+        rows = self.summaries.positions([(table.name, col.name) for table, col in keys])
+        kept = {}
+        for s in range(0, len(keys), _PREFILTER_COLUMNS):
+            reach = self.summaries.reachable(rows[s:s + _PREFILTER_COLUMNS], query_vecs, q_sq, query_dists, self.tau)
+            bounds = np.add.reduceat(reach[vec_ids] * weights, starts, axis=0)  # (query columns, chunk)
+            possible = (bounds >= needed[query_cols][:, None]).any(axis=0)
+            for key, ok in zip(keys[s:s + _PREFILTER_COLUMNS], possible):
+                if ok:
+                    kept[key] = grouped[key]
+                else:
+                    self.stats.columns_pruned_summary += 1
+                    self.stats.pairs_pruned += len(query_vecs) * len(grouped[key][0])
+        return kept
+
+    def _masks(
+        self,
+        query_vecs: np.ndarray,    # (n_q, d)
+        query_dists: np.ndarray,   # (n_q, k)
+        cells: np.ndarray,         # (m,)
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cell-level lemmas for every (query vector, cell) pair.
+
+        Returns:
+            hit: (n_q, m) the cell may hold vectors within τ of the query
+            accept: (n_q, m) every vector in the cell is within τ of the query
+        """
+        return self.generator.cell_masks(query_vecs, query_dists, cells, self.tau)
+
+    @staticmethod
+    def _gather(
+        vecs: np.ndarray | QuantizedColumn,
+        row_ids: np.ndarray,
+    ) -> Tuple[np.ndarray, CodeBlock | None]:
+        """Float32 rows of one candidate column (decoded codes for a QuantizedColumn)."""
+        if isinstance(vecs, QuantizedColumn):
+            codes = vecs.block(row_ids)
+            return codes.approx, codes
+        return np.asarray(vecs[row_ids], dtype=np.float32), None
+
+    @staticmethod
+    def _group_postings(
+        postings: PostingsBlock,
+        cand_vecs_map: Dict[Tuple[str, str], np.ndarray],
+    ) -> Dict[Tuple[TableId, ColumnId], Tuple[np.ndarray, np.ndarray]]:
+        """
+        Collect valid posting row_ids per candidate column, in posting order,
+        together with the position of the cell each posting came from.
+        """
+        grouped: Dict[Tuple[TableId, ColumnId], Tuple[np.ndarray, np.ndarray]] = {}
+        if len(postings) == 0:
+            return grouped
+
+        order = np.argsort(postings.col_ids, kind="stable")
+        col_ids = postings.col_ids[order]
+        row_ids = postings.row_ids[order].astype(np.int64)
+        cell_pos = postings.cell_pos[order]
+        uniq, starts = np.unique(col_ids, return_index=True)
+        ends = np.append(starts[1:], len(col_ids))
+
+        for col_id, s, e in zip(uniq.tolist(), starts, ends):
+            table, col = postings.columns[col_id]
+            rows = row_ids[s:e]
+            # Ensure row index is valid
+            valid = rows < len(cand_vecs_map[(table.name, col.name)])
+            if valid.any():
+                grouped[(table, col)] = (rows[valid], cell_pos[s:e][valid])
+        return grouped
+
+    def _column_matches(
+        self,
+        query_vecs: np.ndarray,          # (n_q, d)
+        q_sq: np.ndarray,                # (n_q,) squared norms
+        query_dists: np.ndarray | None,  # (n_q, k), None: exact distances only
+        cand_block: np.ndarray,          # (n_c, d) one candidate column
+        cand_dists: np.ndarray | None,   # (n_c, k)
+        cell_reject: np.ndarray | None,  # (n_q, n_c) cell-level lemmas
+        cell_accept: np.ndarray | None,
+        groups: QueryGroups,
+        needed: np.ndarray,              # (n_columns,) matches that make each query column joinable
+        stats: BlockingStats,
+        stop: EarlyStop | None = None,   # None: cfg.verify_early_stop
+        chunk_rows: int = _STOP_CHECK_ROWS,
+        codes: CodeBlock | None = None,  # cand_block holds decoded codes
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Matched query weight per query column against one candidate column.
+
+        A bitset over the query vectors records which ones already have a
+        candidate within τ; they are not compared with the remaining
+        candidate tiles. Query vectors are scanned chunk_rows at a time and
+        after each chunk every query column still open is checked against
+        `needed` (`stop`, by default cfg.verify_early_stop):
+
+        - "unreachable": closed once matched + unscanned weight < needed
+        - "decided": also closed once matched >= needed
+        - "none": never closed early
+
+        Vectors of closed columns only are skipped from then on, so the
+        counts of closed columns are lower bounds.
+
+        With `codes`, distances are estimated on the reconstructions and
+        only pairs within the code error bound of τ are re-ranked on the
+        stored vectors (see index.quantization).
+
+        Returns:
+            matched: (n_columns,) int64 matched query weight
+            complete: (n_columns,) False for columns closed early
+        """
+        n_columns = groups.n_columns
+        vec_ids, col_ids, weights = groups.vec_ids, groups.col_ids, groups.weights
+        matched = np.zeros(n_columns, dtype=np.int64)
+        remaining = np.bincount(col_ids, weights=weights, minlength=n_columns).astype(np.int64)
+        complete = np.ones(n_columns, dtype=bool)
+        stop = stop or self.cfg.verify_early_stop
+        c_sq = np.einsum("ij,ij->i", cand_block, cand_block)
+        tile = max(1, self.cfg.block_tile_size)
+        chunk_rows = min(tile, chunk_rows) if stop != "none" else tile
+
+        for q0 in range(0, len(query_vecs), chunk_rows):
+            e0, e1 = np.searchsorted(vec_ids, [q0, q0 + chunk_rows])
+            entry_cols, entry_vecs = col_ids[e0:e1], vec_ids[e0:e1] - q0
+            # vectors of this chunk that some open query column still needs
+            wanted = np.zeros(min(chunk_rows, len(query_vecs) - q0), dtype=bool)
+            wanted[entry_vecs[complete[entry_cols]]] = True
+            found = np.zeros(len(wanted), dtype=bool)
+            stats.pairs_skipped += int((~wanted).sum()) * len(cand_block)
+
+            for c0 in range(0, len(cand_block), tile):
+                cs = slice(c0, c0 + tile)
+                todo = np.flatnonzero(wanted & ~found)
+                stats.pairs_skipped += (int(wanted.sum()) - len(todo)) * len(cand_block[cs])
+                if len(todo) == 0:
+                    continue
+                q = q0 + todo
+                tile_codes = None if codes is None else codes[cs]
+                if query_dists is None:
+                    within = self._dense_within(query_vecs[q], cand_block[cs], q_sq[q], c_sq[cs], tile_codes, stats)
+                    stats.pairs_verified += within.size
+                else:
+                    within = self._pivot_within(
+                        query_vecs[q], cand_block[cs], q_sq[q], c_sq[cs], query_dists[q], cand_dists[cs],
+                        None if cell_reject is None else cell_reject[q, cs],
+                        None if cell_accept is None else cell_accept[q, cs],
+                        stats, tile_codes,
+                    )
+                stats.pairs_matched += int(within.sum())
+                found[todo] |= within.any(axis=1)
+
+            entry_weights = weights[e0:e1]
+            matched += np.bincount(entry_cols, weights=entry_weights * found[entry_vecs],
+                                   minlength=n_columns).astype(np.int64)
+            remaining -= np.bincount(entry_cols, weights=entry_weights, minlength=n_columns).astype(np.int64)
+            scanned = q0 + len(wanted)
+            if stop != "none" and scanned < len(query_vecs):
+                complete &= matched + remaining >= needed
+                if stop == "decided":
+                    complete &= matched < needed
+                if not complete.any():
+                    stats.pairs_skipped += (len(query_vecs) - scanned) * len(cand_block)
+                    break
+        return matched, complete
+
+    def _pivot_within(
+        self,
+        q_tile: np.ndarray,             # (tile_q, d)
+        c_tile: np.ndarray,             # (tile_c, d)
+        q_sq: np.ndarray,
+        c_sq: np.ndarray,
+        qd: np.ndarray,                 # (tile_q, k) pivot distances
+        cd: np.ndarray,                 # (tile_c, k)
+        reject: np.ndarray | None,      # (tile_q, tile_c) cell-level lemmas
+        accept: np.ndarray | None,
+        stats: BlockingStats,
+        codes: CodeBlock | None = None,
+    ) -> np.ndarray:
+        """(tile_q, tile_c) pairs within τ: pivot lemmas first, exact distances for the rest."""
+        tau = self.tau
+        lower = np.zeros((len(qd), len(cd)))
+        upper = np.full((len(qd), len(cd)), np.inf)
+        for p in range(qd.shape[1]):
+            np.maximum(lower, np.abs(qd[:, p, None] - cd[None, :, p]), out=lower)
+            np.minimum(upper, qd[:, p, None] + cd[None, :, p], out=upper)
+
+        # with slack for float32 pivot distances: pairs at τ get an exact check
+        pruned = lower > tau + PIVOT_BOUND_EPS
+        accepted = upper <= tau - PIVOT_BOUND_EPS
+        if reject is not None:
+            pruned |= reject
+            accepted |= accept
+        accepted &= ~pruned
+        undecided = ~(pruned | accepted)
+
+        n_undecided = int(undecided.sum())
+        stats.pairs_pruned += int(pruned.sum())
+        stats.pairs_accepted += int(accepted.sum())
+        stats.pairs_verified += n_undecided
+
+        within = accepted
+        if n_undecided > _DENSE_EXACT_FRACTION * undecided.size:
+            within |= self._dense_within(q_tile, c_tile, q_sq, c_sq, codes, stats, undecided) & undecided
+        elif n_undecided:
+            qi, ci = np.nonzero(undecided)
+            d_sq = q_sq[qi] + c_sq[ci] - 2.0 * np.einsum("ij,ij->i", q_tile[qi], c_tile[ci])
+            if codes is None:
+                hit = d_sq <= tau * tau
+                for n in np.flatnonzero(np.abs(d_sq - tau * tau) <= _EXACT_RECHECK_EPS):
+                    hit[n] = np.linalg.norm(q_tile[qi[n]] - c_tile[ci[n]]) <= tau
+            else:
+                hit = self._code_within(q_tile, qi, ci, d_sq, codes, stats)
+            within[qi[hit], ci[hit]] = True
+        return within
+
+    def _code_within(
+        self,
+        q_tile: np.ndarray,
+        qi: np.ndarray,
+        ci: np.ndarray,
+        d_sq: np.ndarray,                # (p,) squared distances to the reconstructions
+        codes: CodeBlock,
+        stats: BlockingStats,
+    ) -> np.ndarray:
+        """Decide pairs (qi, ci) from code distances; re-rank those within the error bound of τ."""
+        tau = self.tau
+        d = np.sqrt(np.maximum(d_sq, 0.0))
+        err = codes.errors[ci] + _CODE_SLACK
+        hit = d + err <= tau
+        border = np.flatnonzero(~hit & (d - err <= tau))
+        hit[border] = self._rerank(q_tile, qi[border], ci[border], codes, stats)
+        return hit
+
+    def _rerank(
+        self,
+        q_tile: np.ndarray,
+        qi: np.ndarray,
+        ci: np.ndarray,
+        codes: CodeBlock,
+        stats: BlockingStats | None,
+    ) -> np.ndarray:
+        """Exact test of pairs (qi, ci) on the stored vectors."""
+        if stats is not None:
+            stats.pairs_reranked += len(qi)
+        if len(qi) == 0:
+            return np.zeros(0, dtype=bool)
+        return np.linalg.norm(q_tile[qi] - codes.exact_rows(ci), axis=1) <= self.tau
+
+    def _dense_within(
+        self,
+        q_tile: np.ndarray,
+        c_tile: np.ndarray,
+        q_sq: np.ndarray,
+        c_sq: np.ndarray,
+        codes: CodeBlock | None = None,
+        stats: BlockingStats | None = None,
+        wanted: np.ndarray | None = None,  # (tile_q, tile_c) pairs worth re-ranking (default: all)
+    ) -> np.ndarray:
+        """(tile_q, tile_c) boolean matrix of pairs within τ."""
+        tau = self.tau
+        tau_sq = tau * tau
+        d_sq = q_tile @ c_tile.T
+        d_sq *= -2.0
+        d_sq += q_sq[:, None]
+        d_sq += c_sq[None, :]
+
+        if codes is not None:
+            d = np.sqrt(np.maximum(d_sq, 0.0))
+            err = codes.errors[None, :] + _CODE_SLACK
+            within = d + err <= tau
+            border = ~within & (d - err <= tau)
+            if wanted is not None:
+                border &= wanted
+            qi, ci = np.nonzero(border)
+            within[qi, ci] = self._rerank(q_tile, qi, ci, codes, stats)
+            return within
+
+        within = d_sq <= tau_sq
+        qi, ci = np.nonzero(np.abs(d_sq - tau_sq) <= _EXACT_RECHECK_EPS)
+        for i, j in zip(qi, ci):
+            within[i, j] = np.linalg.norm(q_tile[i] - c_tile[j]) <= tau
+        return within
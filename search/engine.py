@@ -0,0 +1,302 @@
+from __future__ import annotations
+import math
+import os
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data.preprocess import normalize_column
+from embedding.embedder import EmbeddingModel, make_embedder
+from embedding.cache import with_cache
+from index.candidates import GridCandidates
+from index.storage import INDEX_DIRNAME, IndexReader
+from search.blocking import Blocker, BlockingStats, QueryGroups
+from search.topk import TopKSearcher, TopKStats
+from search.verify import Verifier
+from utils.config import Config
+from utils.metrics import NULL_METRICS, Metrics
+from utils.result import JoinableResult
+from utils.types import TableId, ColumnId
+
+
+class IndexSearcher:
+    """
+    One memory-mapped index with its pivots, grid, grid tree, postings,
+    column summaries and candidate vectors (or their codes,
+    cfg.embedding_codes), and the candidate generator picked by
+    cfg.candidate_generator; blocks query
+    vectors that were already embedded and transformed by the pivots.
+
+    QueryEngine searches its index with one; a sharded index has one per
+    shard, in this process or in shard workers (search.shards).
+    """
+
+    def __init__(self, index_dir: str, cfg: Config):
+        self.cfg = cfg
+        # arrays are paged in on demand
+        index = IndexReader(index_dir)
+        self.shard = index.manifest.get("shard")
+        self.selector = index.selector(seed=cfg.seed)
+        self.empty = not index.manifest["columns"]  # a shard may hold no indexable columns
+        if self.empty:
+            self.cand_vecs_map, self.cand_dists_map = {}, {}
+            return
+        self.grid = index.grid()
+        self.tree = index.grid_tree()
+        self.inv_index = index.inverted_index()
+        if cfg.candidate_generator == "ivf":
+            self.generator = index.ivf(cfg.ivf_nprobe)
+        else:
+            self.generator = GridCandidates(self.grid, self.tree, self.inv_index)
+        if cfg.embedding_codes != "none":
+            self.cand_vecs_map = index.cand_codes_map(cfg.embedding_codes)
+        else:
+            self.cand_vecs_map = index.cand_vecs_map()
+        self.cand_dists_map = index.cand_dists_map()
+        self.summaries = index.column_summaries()
+
+    def describe(self) -> dict:
+        """Shard entry of the manifest, indexed column count and pivots."""
+        return {"shard": self.shard, "columns": len(self.cand_vecs_map), "pivots": np.asarray(self.selector.pivots)}
+
+    def block(
+        self,
+        q_vecs: np.ndarray,
+        q_dists: np.ndarray,
+        groups: QueryGroups,
+        metrics: Metrics = NULL_METRICS,
+    ) -> Tuple[List[Dict[Tuple[TableId, ColumnId], int]], BlockingStats, int]:
+        """
+        Candidate columns matched by each query column of a batch (Blocker.block_batch).
+
+        Returns:
+            per_column: (table, column) -> matched query weight, per query column
+            stats: blocking counters
+            postings: postings scanned
+        """
+        if self.empty:
+            return [{} for _ in range(groups.n_columns)], BlockingStats(), 0
+        blocker = Blocker(self.cfg, self.grid, self.tree, self.generator, self.summaries)
+        with metrics.stage("candidates"):
+            postings = blocker.candidates(q_vecs, q_dists)
+        with metrics.stage("block"):
+            per_column = blocker.block_batch(
+                q_vecs, groups, postings,
+                self.cand_vecs_map, q_dists, self.cand_dists_map, workers=self.cfg.query_workers,
+            )
+        return per_column, blocker.stats, len(postings)
+
+    def top_k(
+        self,
+        q_vecs: np.ndarray,
+        q_dists: np.ndarray,
+        weights: np.ndarray,
+        k: int,
+        min_matches: int,
+        metrics: Metrics = NULL_METRICS,
+    ) -> Tuple[List[Tuple[Tuple[TableId, ColumnId], int]], BlockingStats, TopKStats, int]:
+        """
+        The k best candidate columns of one query column (TopKSearcher).
+
+        Returns:
+            best: up to k ((table, column), matched query weight), best first
+            stats: blocking counters
+            topk_stats: top-k search counters
+            postings: postings scanned
+        """
+        if self.empty:
+            return [], BlockingStats(), TopKStats(), 0
+        blocker = Blocker(self.cfg, self.grid, self.tree, self.generator, self.summaries)
+        with metrics.stage("candidates"):
+            postings = blocker.candidates(q_vecs, q_dists)
+        searcher = TopKSearcher(blocker, k, min_matches=min_matches)
+        with metrics.stage("topk"):
+            best = searcher.search(q_vecs, q_dists, weights, postings, self.cand_vecs_map, self.cand_dists_map)
+        return best, blocker.stats, searcher.stats, len(postings)
+
+
+class QueryEngine:
+    """
+    Query-side state loaded once and reused across queries: the embedding
+    model (behind the embedding cache) and an IndexSearcher over the index
+    in out_dir.
+
+    query_column() and query_batch() may be called from several threads at
+    once; only the embedding step is serialized (models and the cache are
+    not thread-safe), blocking and verification run concurrently.
+
+    Each query method takes an optional Metrics (utils.metrics) that gets
+    the time spent per stage (normalize, embed, transform, candidates,
+    block, verify or topk) and the query's counters.
+    """
+
+    def __init__(self, out_dir: str, cfg: Config, model: EmbeddingModel | None = None):
+        self.cfg = cfg
+        self.embedder = with_cache(model or make_embedder(cfg.embedding_model), cfg, out_dir)
+        self._embed_lock = threading.Lock()
+        self.searcher = IndexSearcher(os.path.join(out_dir, INDEX_DIRNAME), cfg)
+        self.selector = self.searcher.selector
+        self.num_columns = len(self.searcher.cand_vecs_map)
+
+    def _block(self, q_vecs: np.ndarray, q_dists: np.ndarray, groups: QueryGroups, metrics: Metrics):
+        return self.searcher.block(q_vecs, q_dists, groups, metrics)
+
+    def _top_k(self, q_vecs: np.ndarray, q_dists: np.ndarray, weights: np.ndarray, k: int, min_matches: int,
+               metrics: Metrics):
+        return self.searcher.top_k(q_vecs, q_dists, weights, k, min_matches, metrics)
+
+    def query_column(
+        self,
+        table: str,
+        column: str,
+        values: Sequence | pd.Series,
+        metrics: Metrics = NULL_METRICS,
+    ) -> Tuple[List[JoinableResult], BlockingStats]:
+        """
+        Find candidate columns joinable with one query column.
+
+        Args:
+            table: name of the query table (reported in the results)
+            column: name of the query column
+            values: raw column values; normalized like lake columns
+        Returns:
+            results: one JoinableResult per candidate column that matched
+            stats: blocking counters of this query
+        """
+        results, stats = self.query_batch([(table, column, values)], metrics)
+        return results[0], stats
+
+    def query_batch(
+        self,
+        queries: Sequence[Tuple[str, str, Sequence | pd.Series]],
+        metrics: Metrics = NULL_METRICS,
+    ) -> Tuple[List[List[JoinableResult]], BlockingStats]:
+        """
+        Answer several query columns together.
+
+        Distinct values of all columns are embedded in one call, the grid is
+        searched once for the union of their cells, and every candidate
+        column is gathered once and compared against the distinct query
+        vectors in the same distance tiles (Blocker.block_batch, on
+        cfg.query_workers threads); matches are then credited to every
+        column a value occurs in, once per row, or once per column with
+        cfg.joinability == "distinct".
+
+        Args:
+            queries: (table, column, raw values) per query column
+        Returns:
+            results: per query column, as query_column()
+            stats: blocking counters of the whole batch
+        """
+        with metrics.stage("normalize"):
+            normalized = [
+                normalize_column(v if isinstance(v, pd.Series) else pd.Series(list(v)), return_inverse=True)
+                for _, _, v in queries
+            ]
+            offsets = np.cumsum([0] + [len(inverse) for _, inverse in normalized])
+            if offsets[-1] == 0:
+                return [[] for _ in queries], BlockingStats()
+
+            # values repeated within or across query columns are embedded and blocked once
+            starts = np.cumsum([0] + [len(values) for values, _ in normalized])
+            distinct, remap = np.unique(
+                np.concatenate([np.asarray(values, dtype=object) for values, _ in normalized]), return_inverse=True,
+            )
+            inverse = np.concatenate([remap[start + inv] for start, (_, inv) in zip(starts, normalized)])
+        with metrics.stage("embed"):
+            with self._embed_lock:
+                q_vecs = self.embedder.embed(distinct.tolist())
+        with metrics.stage("transform"):
+            q_dists = self.selector.transform(q_vecs)
+
+        groups = QueryGroups.from_inverse(inverse, offsets)
+        if self.cfg.joinability == "distinct":
+            groups.weights = np.ones_like(groups.weights)
+        sizes = np.bincount(groups.col_ids, weights=groups.weights, minlength=len(queries)).astype(np.int64)
+
+        per_column, stats, postings = self._block(q_vecs, q_dists, groups, metrics)
+        verifier = Verifier(self.cfg)
+        with metrics.stage("verify"):
+            results = [
+                verifier.verify(TableId(table), ColumnId(column), int(size), candidates)
+                for (table, column, _), size, candidates in zip(queries, sizes, per_column)
+            ]
+        if metrics.enabled:
+            self._count_query(metrics, len(queries), int(offsets[-1]), len(q_vecs), postings, stats)
+            metrics.count("candidates_verified", sum(len(c) for c in per_column))
+            metrics.count("results", sum(r.is_joinable for res in results for r in res))
+        return results, stats
+
+    @staticmethod
+    def _count_query(metrics: Metrics, columns: int, values: int, distinct: int, postings: int,
+                     stats: BlockingStats):
+        metrics.count("query_columns", columns)
+        metrics.count("values", values)
+        metrics.count("values_embedded", distinct)
+        metrics.count("postings_scanned", postings)
+        metrics.count("distance_computations", stats.pairs_verified + stats.pairs_reranked)
+        metrics.count_fields(stats)
+
+    def query_top_k(
+        self,
+        table: str,
+        column: str,
+        values: Sequence | pd.Series,
+        k: int,
+        metrics: Metrics = NULL_METRICS,
+    ) -> Tuple[List[JoinableResult], BlockingStats, TopKStats]:
+        """
+        The k joinable candidate columns with the highest joinability.
+
+        Unlike query_column(), candidates are not all scored: columns are
+        scanned in decreasing upper-bound order and a column is dropped as
+        soon as it can no longer reach T_ratio or beat the current k-th
+        best (see TopKSearcher). Joinability is counted as in
+        query_column() (cfg.joinability).
+
+        Args:
+            table: name of the query table (reported in the results)
+            column: name of the query column
+            values: raw column values; normalized like lake columns
+            k: number of columns to return
+        Returns:
+            results: at most k joinable results, best first
+            stats: blocking counters of this query
+            topk_stats: how many candidate columns were scored, abandoned or skipped
+        """
+        with metrics.stage("normalize"):
+            normalized = normalize_column(values if isinstance(values, pd.Series) else pd.Series(list(values)))
+            if len(normalized) == 0:
+                return [], BlockingStats(), TopKStats()
+            distinct, weights = np.unique(normalized, return_counts=True)
+        if self.cfg.joinability == "distinct":
+            weights = np.ones_like(weights)
+        with metrics.stage("embed"):
+            with self._embed_lock:
+                q_vecs = self.embedder.embed(distinct.tolist())
+        with metrics.stage("transform"):
+            q_dists = self.selector.transform(q_vecs)
+
+        query_size = int(weights.sum())
+        min_matches = math.ceil(self.cfg.T_ratio * query_size - 1e-9)
+        best, stats, topk_stats, postings = self._top_k(q_vecs, q_dists, weights, k, min_matches, metrics)
+        results = [
+            JoinableResult(
+                query_table=TableId(table),
+                candidate_table=cand_table,
+                query_column=ColumnId(column),
+                candidate_column=cand_col,
+                joinability=matches / query_size,
+                is_joinable=True,
+                matches=matches,
+                query_size=query_size,
+            )
+            for (cand_table, cand_col), matches in best
+        ]
+        if metrics.enabled:
+            self._count_query(metrics, 1, len(normalized), len(q_vecs), postings, stats)
+            metrics.count_fields(topk_stats, "topk_")
+            metrics.count("results", len(results))
+        return results, stats, topk_stats
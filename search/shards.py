@@ -0,0 +1,244 @@
+"""
+Scatter-gather queries over a sharded index (see index.shards).
+
+ShardedQueryEngine answers the same calls as QueryEngine. It normalizes,
+embeds and transforms the query values once (all shards share the pivots
+of shard 0), sends the query vectors to every shard, and merges what the
+shards return: candidate columns per query column, which are disjoint
+across shards and verified as usual, or each shard's top k, of which the
+k best are kept. Shards are searched by an IndexSearcher each:
+
+- cfg.shard_mode "thread": in this process, one thread per shard
+- cfg.shard_mode "process": in one local worker process per shard
+- cfg.shard_hosts: by shard servers started with serve_shard
+  (`pexeso.py shard`), one per shard, e.g. on the hosts holding them
+
+Workers are reached through multiprocessing.connection, which pickles
+the calls: the channel is authenticated with a shared key (for remote
+servers, the PEXESO_SHARD_KEY environment variable on both sides) but
+not encrypted, so shard servers belong on a trusted network.
+"""
+from __future__ import annotations
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import fields
+from multiprocessing.connection import Client, Connection, Listener
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from embedding.cache import with_cache
+from embedding.embedder import EmbeddingModel, make_embedder
+from index.pivots import PivotSelector
+from index.shards import index_paths, is_sharded, shard_dir
+from index.storage import INDEX_DIRNAME
+from search.blocking import BlockingStats, QueryGroups
+from search.engine import IndexSearcher, QueryEngine
+from search.topk import TopKStats
+from utils.config import Config
+from utils.metrics import Metrics
+from utils.types import GREEN, RESET
+
+SHARD_KEY_ENV = "PEXESO_SHARD_KEY"
+# IndexSearcher methods a shard server answers
+_METHODS = ("describe", "block", "top_k")
+
+
+def shard_key() -> bytes:
+    """Authentication key of remote shard servers, from PEXESO_SHARD_KEY."""
+    key = os.environ.get(SHARD_KEY_ENV)
+    if not key:
+        raise ValueError(f"Set {SHARD_KEY_ENV} to the same secret for the coordinator and its shard servers.")
+    return key.encode("utf-8")
+
+
+def parse_address(host_port: str) -> Tuple[str, int]:
+    host, _, port = host_port.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _answer(searcher: IndexSearcher, conn: Connection):
+    """Answer calls on one connection until the client closes it."""
+    with conn:
+        while True:
+            try:
+                method, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if method not in _METHODS:
+                    raise ValueError(f"unknown method {method!r}")
+                conn.send(("ok", getattr(searcher, method)(*args)))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+def serve_shard(index_dir: str, cfg: Config, address: Tuple[str, int], authkey: bytes, ready: Connection | None = None):
+    """
+    Answer IndexSearcher calls for the index in index_dir until killed,
+    one thread per client connection.
+
+    Args:
+        address: (host, port) to listen on; port 0 picks a free one
+        authkey: key clients must present
+        ready: if given, receives the bound address once listening
+    """
+    searcher = IndexSearcher(index_dir, cfg)
+    with Listener(address, authkey=authkey) as listener:
+        if ready is not None:
+            ready.send(listener.address)
+            ready.close()
+        while True:
+            try:
+                conn = listener.accept()
+            except mp.AuthenticationError:
+                continue
+            threading.Thread(target=_answer, args=(searcher, conn), daemon=True).start()
+
+
+class RemoteShard:
+    """IndexSearcher of a shard server, called over a pool of connections (one per concurrent call)."""
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes, process: mp.Process | None = None):
+        self.address = address
+        self.authkey = authkey
+        self.process = process  # local worker owned by this proxy
+        self._idle: List[Connection] = []
+        self._lock = threading.Lock()
+
+    def _call(self, method: str, *args):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = Client(self.address, authkey=self.authkey)
+        try:
+            conn.send((method, args))
+            status, value = conn.recv()
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            self._idle.append(conn)
+        if status != "ok":
+            raise RuntimeError(f"shard at {self.address[0]}:{self.address[1]}: {value}")
+        return value
+
+    def describe(self) -> dict:
+        return self._call("describe")
+
+    def block(self, q_vecs: np.ndarray, q_dists: np.ndarray, groups: QueryGroups):
+        return self._call("block", q_vecs, q_dists, groups)
+
+    def top_k(self, q_vecs: np.ndarray, q_dists: np.ndarray, weights: np.ndarray, k: int, min_matches: int):
+        return self._call("top_k", q_vecs, q_dists, weights, k, min_matches)
+
+    def close(self):
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+
+
+def start_local_shards(paths: Sequence[str], cfg: Config) -> List[RemoteShard]:
+    """One worker process per shard index, listening on a free localhost port."""
+    ctx = mp.get_context("spawn")  # the coordinator may already run threads
+    authkey = os.urandom(32)
+    started = []
+    for path in paths:
+        parent, child = ctx.Pipe(duplex=False)
+        process = ctx.Process(target=serve_shard, args=(path, cfg, ("127.0.0.1", 0), authkey, child), daemon=True)
+        process.start()
+        child.close()
+        started.append((parent, process))
+    shards = []
+    for parent, process in started:
+        try:
+            address = parent.recv()
+        except EOFError:
+            raise RuntimeError(f"shard worker {process.pid} exited with code {process.exitcode} while loading")
+        shards.append(RemoteShard(address, authkey, process))
+    return shards
+
+
+def _sum_stats(cls, items):
+    return cls(**{f.name: sum(getattr(s, f.name) for s in items) for f in fields(cls)})
+
+
+class ShardedQueryEngine(QueryEngine):
+    """
+    QueryEngine over the shards of a sharded index, searched in parallel.
+
+    Stages reported to Metrics are normalize, embed, transform, shards
+    (the scatter-gather, wall time of the slowest shard) and verify; the
+    shards' own stages are not recorded. Counters are summed over shards.
+    """
+
+    def __init__(self, out_dir: str, cfg: Config, model: EmbeddingModel | None = None):
+        self.cfg = cfg
+        self.embedder = with_cache(model or make_embedder(cfg.embedding_model), cfg, out_dir)
+        self._embed_lock = threading.Lock()
+        if cfg.shard_hosts:
+            key = shard_key()
+            self.shards = [RemoteShard(parse_address(a), key) for a in cfg.shard_hosts]
+        elif cfg.shard_mode == "process":
+            self.shards = start_local_shards(index_paths(out_dir), cfg)
+        else:
+            self.shards = [IndexSearcher(path, cfg) for path in index_paths(out_dir)]
+        self._pool = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix="shard")
+
+        described = list(self._pool.map(lambda s: s.describe(), self.shards))
+        for i, d in enumerate(described):
+            shard = d["shard"] or {}
+            if shard.get("index") != i or shard.get("count") != len(self.shards):
+                raise ValueError(f"Shard {i} of {len(self.shards)} holds shard {shard.get('index')} "
+                                 f"of {shard.get('count')}; check the shard order and count.")
+            if not np.array_equal(d["pivots"], described[0]["pivots"]):
+                raise ValueError(f"Shard {i} was not built with the pivots of shard 0; rebuild it.")
+        self.selector = PivotSelector(k=len(described[0]["pivots"]), seed=cfg.seed)
+        self.selector.pivots = described[0]["pivots"]
+        self.num_columns = sum(d["columns"] for d in described)
+
+    def _block(self, q_vecs: np.ndarray, q_dists: np.ndarray, groups: QueryGroups, metrics: Metrics):
+        with metrics.stage("shards"):
+            answers = list(self._pool.map(lambda s: s.block(q_vecs, q_dists, groups), self.shards))
+        # in table name order, as an unsharded index stores (and reports) them
+        per_column = []
+        for j in range(len(answers[0][0])):
+            merged = [item for shard_columns, _, _ in answers for item in shard_columns[j].items()]
+            per_column.append(dict(sorted(merged, key=lambda item: item[0][0].name)))
+        return per_column, _sum_stats(BlockingStats, [a[1] for a in answers]), sum(a[2] for a in answers)
+
+    def _top_k(self, q_vecs: np.ndarray, q_dists: np.ndarray, weights: np.ndarray, k: int, min_matches: int,
+               metrics: Metrics):
+        with metrics.stage("shards"):
+            answers = list(self._pool.map(lambda s: s.top_k(q_vecs, q_dists, weights, k, min_matches), self.shards))
+        # shards hold disjoint columns, so the k best overall are among the shards' k best; ties by table name
+        best = sorted((entry for a in answers for entry in a[0]), key=lambda entry: (-entry[1], entry[0][0].name))[:k]
+        return (best, _sum_stats(BlockingStats, [a[1] for a in answers]),
+                _sum_stats(TopKStats, [a[2] for a in answers]), sum(a[3] for a in answers))
+
+    def close(self):
+        """Stop local shard workers and close connections."""
+        self._pool.shutdown()
+        for shard in self.shards:
+            if isinstance(shard, RemoteShard):
+                shard.close()
+
+
+def open_engine(out_dir: str, cfg: Config, model: EmbeddingModel | None = None) -> QueryEngine:
+    """ShardedQueryEngine if out_dir holds a sharded index (or cfg.shard_hosts is set), else QueryEngine."""
+    if cfg.shard_hosts or is_sharded(out_dir):
+        return ShardedQueryEngine(out_dir, cfg, model)
+    return QueryEngine(out_dir, cfg, model)
+
+
+def run_shard_server(out_dir: str, shard: int, cfg: Config, host: str = "127.0.0.1", port: int = 8800):
+    """Serve one shard of the sharded index in out_dir to remote coordinators (pexeso.py shard)."""
+    path = os.path.join(shard_dir(out_dir, shard), INDEX_DIRNAME)
+    print(f"{GREEN}Serving shard {shard} ({os.path.dirname(path)}) on {host}:{port}{RESET}", flush=True)
+    serve_shard(path, cfg, (host, port), shard_key())
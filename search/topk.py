@@ -0,0 +1,145 @@
+from __future__ import annotations
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from index.inverted_index import PostingsBlock
+from search.blocking import Blocker, QueryGroups
+from utils.types import TableId, ColumnId
+
+# Query vectors scanned between two upper-bound checks of a column.
+_QUERY_CHUNK = 64
+
+
+@dataclass
+class TopKStats:
+    """Per-query counters of a top-k search, in candidate columns."""
+    columns: int = 0            # candidate columns reached by the range query
+    columns_scored: int = 0     # scanned to the end (exact score known)
+    columns_abandoned: int = 0  # scan stopped once the column could no longer enter the top k
+    columns_skipped: int = 0    # never scanned: initial upper bound already too low
+
+
+class TopKSearcher:
+    """
+    Top-k joinable columns for one query column.
+
+    The score of a candidate column is the (weighted) number of query
+    vectors with at least one of its vectors within τ. Every candidate
+    column starts with an upper bound: the weight of the query vectors
+    whose τ-rectangle reaches at least one of its cells (and, with column
+    summaries and cfg.column_prefilter, that can reach the column at all;
+    columns bounded below min_matches are then dropped up front, see
+    BlockingStats.columns_pruned_*). Columns are scanned in decreasing
+    bound order, equal bounds by decreasing MinHash joinability estimate
+    (ColumnSummaries.estimate), against an admission score (beat the
+    current k-th best, and reach min_matches):
+
+    - once a column's bound is below the admission score, it and every
+      column after it are skipped;
+    - while a column is scanned (Blocker._column_matches), query vectors
+      that already matched skip the remaining candidate vectors, and the
+      scan stops as soon as matched-so-far + unscanned query weight falls
+      below the admission score.
+
+    Equal scores are broken in favour of the column stored first (posting
+    column order), so neither the scan order nor pruning changes the result.
+    """
+
+    def __init__(self, blocker: Blocker, k: int, min_matches: int = 1):
+        self.blocker = blocker
+        self.k = k
+        self.min_matches = max(1, min_matches)
+        self.stats = TopKStats()
+
+    def search(
+        self,
+        query_vecs: np.ndarray,          # (n_q, d)
+        query_dists: np.ndarray,         # (n_q, k)
+        weights: np.ndarray,             # (n_q,) rows each query vector stands for
+        postings: PostingsBlock,
+        cand_vecs_map: Dict[Tuple[str, str], np.ndarray],
+        cand_dists_map: Dict[Tuple[str, str], np.ndarray],
+    ) -> List[Tuple[Tuple[TableId, ColumnId], int]]:
+        """
+        Returns:
+            up to k ((table, column), matched query weight) pairs, best first
+        """
+        self.stats = TopKStats()
+        blocker = self.blocker
+        query_vecs = np.asarray(query_vecs)
+        query_dists = np.asarray(query_dists)
+        weights = np.asarray(weights, dtype=np.int64)
+        if len(query_vecs) == 0 or len(postings) == 0 or self.k <= 0:
+            return []
+
+        hit, accept = blocker._masks(query_vecs, query_dists, postings.cells)
+        grouped = blocker._group_postings(postings, cand_vecs_map)
+        self.stats.columns = len(grouped)
+        blocker.stats.columns_reached += len(grouped)
+
+        q_sq = np.einsum("ij,ij->i", query_vecs, query_vecs)
+        prefilter = blocker.cfg.column_prefilter
+        reach = estimate = None
+        if prefilter and blocker.summaries is not None and grouped:
+            rows = blocker.summaries.positions([(table.name, col.name) for table, col in grouped])
+            reach = blocker.summaries.reachable(rows, query_vecs, q_sq, query_dists, blocker.tau)
+            estimate = blocker.summaries.estimate(rows, query_vecs)
+
+        plans = []
+        for j, (key, (row_ids, row_cells)) in enumerate(grouped.items()):
+            reachable = hit[:, row_cells].any(axis=1)
+            if reach is not None:
+                if weights[reach[:, j]].sum() < self.min_matches:
+                    blocker.stats.columns_pruned_summary += 1
+                    continue
+                reachable &= reach[:, j]
+            active = np.flatnonzero(reachable)
+            bound = int(weights[active].sum())
+            if prefilter and bound < self.min_matches:
+                blocker.stats.columns_pruned_cells += 1
+                continue
+            plans.append((bound, 0.0 if estimate is None else float(estimate[j]), j, key, row_ids, row_cells, active))
+        # stable: equal bounds and estimates keep posting (column id) order
+        plans.sort(key=lambda plan: (-plan[0], -plan[1]))
+
+        best: List[Tuple[int, int, Tuple[TableId, ColumnId]]] = []  # min-heap (score, -column order, key)
+        for rank, (bound, _, j, key, row_ids, row_cells, active) in enumerate(plans):
+            floor = self.min_matches
+            if len(best) == self.k:
+                # beat the k-th best; an equal score is enough for a column stored before it
+                floor = max(floor, best[0][0] + int(j > -best[0][1]))
+            if bound < floor:
+                if len(best) < self.k or bound < max(self.min_matches, best[0][0]):
+                    # later columns are bounded no higher
+                    self.stats.columns_skipped += len(plans) - rank
+                    break
+                self.stats.columns_skipped += 1
+                continue
+
+            table, col = key
+            name_key = (table.name, col.name)
+            blocker.stats.columns_scanned += 1
+            cand_block, codes = blocker._gather(cand_vecs_map[name_key], row_ids)
+            matched, complete = blocker._column_matches(
+                query_vecs[active], q_sq[active], query_dists[active],
+                cand_block, cand_dists_map[name_key][row_ids],
+                ~hit[active][:, row_cells], accept[active][:, row_cells],
+                QueryGroups(np.arange(len(active)), np.zeros(len(active), dtype=np.int64), weights[active], 1),
+                np.array([floor]), blocker.stats, stop="unreachable", chunk_rows=_QUERY_CHUNK, codes=codes,
+            )
+            if not complete[0]:
+                self.stats.columns_abandoned += 1
+                continue
+            matched = int(matched[0])
+            self.stats.columns_scored += 1
+            if matched >= floor:
+                entry = (matched, -j, key)
+                if len(best) < self.k:
+                    heapq.heappush(best, entry)
+                else:
+                    heapq.heapreplace(best, entry)
+
+        return [(key, score) for score, _, key in sorted(best, reverse=True)]
@@ -7,7 +7,8 @@ from utils.config import Config
 
 class Verifier:
     """
-    Verifies candidate joinability by computing overlap ratio.
+    Verifies candidate joinability by computing overlap ratio: the share of
+    query values with at least one candidate value within τ.
     """
 
     def __init__(self, config: Config):
@@ -18,7 +19,7 @@ class Verifier:
         query_table: TableId,
         query_column: ColumnId,
         query_size: int,
-        candidates: Dict[Tuple[str, str], List[int]]
+        candidates: Dict[Tuple[TableId, ColumnId], int]
     ) -> List[JoinableResult]:
         """
         Check joinability of query column with candidates.
@@ -27,23 +28,25 @@ class Verifier:
             query_table: identifier of the query table
             query_column: identifier of the query column
             query_size: number of rows in the query column
-            candidates: dict mapping (table, column) → list of matched row_ids
+            candidates: dict mapping (TableId, ColumnId) → number of query rows
+                with a match (Blocker.block); a lower bound for columns whose
+                scan stopped early, which are then below T_ratio (or, with
+                verify_early_stop="decided", at or above it)
 
         Returns:
             results: list of JoinableResult
         """
         results: List[JoinableResult] = []
 
-        for (table, col), matched_rows in candidates.items():
-            matches = len(set(matched_rows))
+        for (table, col), matches in candidates.items():
             joinability = matches / max(1, query_size)
             is_joinable = joinability >= self.cfg.T_ratio
 
             res = JoinableResult(
                 query_table=query_table,
-                candidate_table=TableId(table),
+                candidate_table=table,
                 query_column=query_column,
-                candidate_column=ColumnId(col),
+                candidate_column=col,
                 joinability=joinability,
                 is_joinable=is_joinable,
                 matches=matches,
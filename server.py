@@ -0,0 +1,179 @@
+"""
+Long-running query service over a built index.
+
+The embedding model and the memory-mapped index are loaded once
+(QueryEngine, or ShardedQueryEngine for a sharded index) and shared by
+all requests; each request is handled on its own thread. Listens on a TCP port or, with a socket path, a Unix socket.
+
+Endpoints (JSON in, JSON out):
+    GET  /health   {"status": "ok", "columns": <indexed columns>}
+    POST /query    {"values": [...], "table": "q", "column": "c", "top": 0}
+                   -> {"results": [...], "stats": {...}}
+                   with "top" > 0 and without "all", answered by a top-k
+                   search that skips columns which cannot make the cut
+                   (adds "topk_stats")
+    POST /query_csv {"path": "/path/query.csv", "top": 0}
+                   -> {"columns": [{"column": ..., "results": [...]}], "stats": {...}}
+
+Results are the candidate columns at or above T_ratio, best first;
+"all": true returns every candidate that matched at all (scores below
+T_ratio are lower bounds unless Config.verify_early_stop is "none"), and
+"top" > 0 keeps only the best `top`. With "metrics": true, responses
+also carry the request's stage timings and counters (see utils.metrics).
+"""
+from __future__ import annotations
+import json
+import os
+import socketserver
+import time
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import pandas as pd
+
+from embedding.embedder import EmbeddingModel
+from search.engine import QueryEngine
+from search.shards import open_engine
+from utils.config import Config
+from utils.metrics import NULL_METRICS, Metrics
+from utils.result import JoinableResult
+from utils.types import GREEN, RESET
+
+
+def _result_json(res: JoinableResult) -> dict:
+    return {
+        "table": res.candidate_table.name,
+        "column": res.candidate_column.name,
+        "joinability": res.joinability,
+        "is_joinable": res.is_joinable,
+        "matches": res.matches,
+        "query_size": res.query_size,
+    }
+
+
+def _rank(results: List[JoinableResult], top: int, include_all: bool) -> List[dict]:
+    kept = [r for r in results if include_all or r.is_joinable]
+    kept.sort(key=lambda r: (-r.joinability, r.candidate_table.name, r.candidate_column.name))
+    return [_result_json(r) for r in (kept[:top] if top > 0 else kept)]
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    engine: QueryEngine  # set on the subclass created by make_server()
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok", "columns": self.engine.num_columns})
+        else:
+            self._send(404, {"error": f"unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        metrics = NULL_METRICS
+        try:
+            req = self._read_json()  # read even for unknown endpoints: the connection is reused
+            if self.path not in ("/query", "/query_csv"):
+                self._send(404, {"error": f"unknown endpoint {self.path}"})
+                return
+            t0 = time.perf_counter()
+            metrics = Metrics.from_config(self.engine.cfg, "query", self.path)
+            if req.get("metrics") and not metrics.enabled:
+                metrics = Metrics("query", self.path)
+            body = self._query(req, metrics) if self.path == "/query" else self._query_csv(req, metrics)
+            body["elapsed_ms"] = (time.perf_counter() - t0) * 1000
+            record, metrics = metrics.finish(), NULL_METRICS
+            if req.get("metrics"):
+                body["metrics"] = record
+            status = 200
+        except (ValueError, KeyError, TypeError, OSError) as e:
+            status, body = 400, {"error": f"{type(e).__name__}: {e}"}
+        except Exception as e:
+            # e.g. a failing remote shard: answer instead of dropping the keep-alive connection
+            status, body = 500, {"error": f"{type(e).__name__}: {e}"}
+        metrics.finish()  # record (and stop the profile of) a failed request too, before answering
+        self._send(status, body)
+
+    def _query(self, req: dict, metrics: Metrics) -> dict:
+        values = req["values"]
+        if not isinstance(values, list) or not values:
+            raise ValueError("'values' must be a non-empty list")
+        table, column = req.get("table", "query"), req.get("column", "query")
+        top, include_all = int(req.get("top", 0)), bool(req.get("all", False))
+        if top > 0 and not include_all:
+            results, stats, topk_stats = self.engine.query_top_k(table, column, values, top, metrics)
+            return {
+                "results": [_result_json(r) for r in results],
+                "stats": asdict(stats),
+                "topk_stats": asdict(topk_stats),
+            }
+        results, stats = self.engine.query_column(table, column, values, metrics)
+        return {"results": _rank(results, top, include_all), "stats": asdict(stats)}
+
+    def _query_csv(self, req: dict, metrics: Metrics) -> dict:
+        path = req["path"]
+        df = pd.read_csv(path, sep="\t" if path.endswith(".tsv") else ",")
+        names = [str(c) for c in df.columns]
+        results, stats = self.engine.query_batch([(os.path.basename(path), c, df[c]) for c in names], metrics)
+        columns = [
+            {"column": col, "results": _rank(res, int(req.get("top", 0)), bool(req.get("all", False)))}
+            for col, res in zip(names, results)
+        ]
+        return {"columns": columns, "stats": asdict(stats)}
+
+    def log_message(self, format, *args):
+        pass  # one line per request is too noisy under load
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = self.server_address, 0
+
+
+def make_server(engine: QueryEngine, host: str = "127.0.0.1", port: int = 8765, socket_path: str | None = None):
+    """HTTP server answering queries with `engine` (Unix socket if socket_path is given)."""
+    handler = type("BoundQueryHandler", (QueryHandler,), {"engine": engine})
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(
+    out_dir: str,
+    cfg: Config,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: str | None = None,
+    model: EmbeddingModel | None = None,
+):
+    """Load model and index once, then answer queries until interrupted."""
+    engine = open_engine(out_dir, cfg, model)
+    server = make_server(engine, host, port, socket_path)
+    where = socket_path or f"http://{host}:{server.server_address[1]}"
+    print(f"{GREEN}Serving {engine.num_columns} indexed columns on {where}{RESET}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,6 @@
+# pexeso/tests/conftest.py
+"""Make the repository's top-level packages importable when pytest runs from anywhere."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
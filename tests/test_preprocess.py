@@ -0,0 +1,50 @@
+# pexeso/tests/test_preprocess.py
+"""Vectorized normalize_column against the original per-value loop, on random columns of every kind."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.workloads import random_strings, reference_normalize_column
+from data.preprocess import distinct_values, normalize_column
+
+N_COLUMNS = 300
+
+
+def random_column(rng: np.random.Generator) -> pd.Series:
+    n = int(rng.integers(0, 60))
+    missing = rng.random(n) < rng.choice([0.0, 0.2, 0.9])
+    kind = rng.choice(["text", "object", "int", "float", "float32", "nullable", "bool", "datetime", "datetime_tz"])
+    if kind == "text":
+        return pd.Series([None if m else s for s, m in zip(random_strings(rng, n), missing)], dtype="str")
+    if kind == "object":
+        choices = random_strings(rng, n) + [1, -0.0, 2.5, True, np.nan, None, float("inf")]
+        return pd.Series([choices[i] for i in rng.integers(0, len(choices), n)], dtype=object)
+    if kind == "int":
+        return pd.Series(rng.integers(-10**12, 10**12, n))
+    if kind in ("float", "float32"):
+        values = np.where(rng.random(n) < 0.5, rng.standard_normal(n) * 10.0 ** rng.integers(-20, 20, n),
+                          rng.choice([0.1, -0.0, np.inf, -np.inf, 1e16, 3.0], n))
+        values[missing] = np.nan
+        return pd.Series(values, dtype="float64" if kind == "float" else "float32")
+    if kind == "nullable":
+        return pd.Series([None if m else int(v) for v, m in zip(rng.integers(-99, 99, n), missing)], dtype="Int64")
+    if kind == "bool":
+        return pd.Series(rng.random(n) < 0.5)
+    stamps = pd.to_datetime(rng.integers(-2 * 10**18, 4 * 10**18, n)).to_series(index=range(n))
+    stamps[missing] = pd.NaT
+    return stamps.dt.tz_localize("UTC").dt.tz_convert("America/St_Johns") if kind == "datetime_tz" else stamps
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_normalize_column_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(N_COLUMNS // 3):
+        series = random_column(rng)
+        expected = reference_normalize_column(series)
+        assert normalize_column(series) == expected, series.tolist()[:5]
+        distinct, inverse = normalize_column(series, return_inverse=True)
+        assert [distinct[i] for i in inverse] == expected
+        assert distinct == distinct_values(expected)[0]
+        assert len(set(distinct)) == len(distinct)
@@ -0,0 +1,71 @@
+# pexeso/tests/test_server.py
+"""Error responses of the query service: every failure is answered, and the keep-alive connection stays usable."""
+from __future__ import annotations
+
+import http.client
+import json
+import threading
+from dataclasses import replace
+
+import pytest
+
+from server import make_server
+from utils.config import Config
+
+
+class FailingEngine:
+    """Engine whose queries fail the way a remote shard or numpy can."""
+
+    cfg = Config()
+    num_columns = 0
+
+    def query_column(self, table, column, values, metrics):
+        if values == ["bad"]:
+            raise ValueError("bad value")
+        raise RuntimeError("shard 1 is unreachable")
+
+
+@pytest.fixture
+def engine():
+    return FailingEngine()
+
+
+@pytest.fixture
+def connection(engine):
+    server = make_server(engine, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    yield conn
+    conn.close()
+    server.shutdown()
+    server.server_close()
+
+
+def _post(conn, path: str, body: dict):
+    conn.request("POST", path, json.dumps(body), {"Content-Type": "application/json"})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def test_unexpected_error_is_answered_with_500(connection):
+    status, body = _post(connection, "/query", {"values": ["x"]})
+    assert status == 500
+    assert body["error"] == "RuntimeError: shard 1 is unreachable"
+
+
+def test_connection_survives_errors(connection):
+    assert _post(connection, "/query", {"values": ["x"]})[0] == 500
+    assert _post(connection, "/query", {"values": ["bad"]})[0] == 400
+    assert _post(connection, "/nowhere", {})[0] == 404
+    connection.request("GET", "/health")
+    response = connection.getresponse()
+    assert response.status == 200 and json.loads(response.read())["columns"] == 0
+
+
+def test_failed_request_finishes_its_metrics(connection, engine, tmp_path):
+    engine.cfg = replace(Config(), metrics_path=str(tmp_path / "metrics.jsonl"), profile_dir=str(tmp_path / "prof"))
+    assert _post(connection, "/query", {"values": ["x"]})[0] == 500
+    with open(tmp_path / "metrics.jsonl") as f:
+        record = json.loads(f.readline())
+    assert record["kind"] == "query" and (tmp_path / "prof").is_dir()
@@ -0,0 +1,103 @@
+# pexeso/tests/test_storage.py
+"""Versioned index directories: commits are published by the CURRENT pointer and never touch a version readers hold."""
+from __future__ import annotations
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from index.storage import CURRENT, LOCK, MANIFEST, IndexReader, IndexWriter, index_exists, resolve_index
+
+
+def _commit(path: str, rows: np.ndarray, reopen: bool = False) -> None:
+    writer = IndexWriter.reopen(path) if reopen else IndexWriter(path)
+    writer.append("embeddings", rows)
+    writer.close(columns=[])
+
+
+def _versions(path: str):
+    return sorted(d for d in os.listdir(path) if d not in (CURRENT, LOCK))
+
+
+def test_reader_keeps_its_version_across_commits(tmp_path):
+    path = str(tmp_path / "index")
+    first = np.arange(12, dtype=np.float32).reshape(4, 3)
+    _commit(path, first)
+    reader = IndexReader(path)
+
+    _commit(path, -first[:2], reopen=True)
+
+    assert np.array_equal(reader.array("embeddings"), first)
+    assert np.array_equal(IndexReader(path).array("embeddings"), np.vstack([first, -first[:2]]))
+
+
+def test_commit_keeps_previous_version_only(tmp_path):
+    path = str(tmp_path / "index")
+    rows = np.ones((2, 3), dtype=np.float32)
+    for _ in range(4):
+        _commit(path, rows)
+    assert _versions(path) == ["v000003", "v000004"]
+    assert resolve_index(path) == os.path.join(path, "v000004")
+
+
+def test_interrupted_commit_is_invisible(tmp_path):
+    path = str(tmp_path / "index")
+    rows = np.ones((2, 3), dtype=np.float32)
+    _commit(path, rows)
+    writer = IndexWriter.reopen(path)
+    writer.append("embeddings", rows)  # never published
+
+    assert len(IndexReader(path).array("embeddings")) == 2
+    writer.abandon()
+    _commit(path, rows, reopen=True)
+    assert len(IndexReader(path).array("embeddings")) == 4
+
+
+def test_overlapping_writers_are_serialized(tmp_path):
+    path = str(tmp_path / "index")
+    rows = np.arange(6, dtype=np.float32).reshape(2, 3)
+    _commit(path, rows)
+    first = IndexWriter.reopen(path)
+    first.append("embeddings", rows + 1)
+
+    second = threading.Thread(target=_commit, args=(path, rows + 2), kwargs={"reopen": True})
+    second.start()
+    second.join(timeout=0.5)
+    assert second.is_alive()  # waits for the first writer's lock
+    assert len(IndexReader(path).array("embeddings")) == 2
+    first.close(columns=[])
+    second.join()
+
+    assert np.array_equal(IndexReader(path).array("embeddings"), np.vstack([rows, rows + 1, rows + 2]))
+
+
+def test_append_does_not_modify_published_files(tmp_path):
+    path = str(tmp_path / "index")
+    rows = np.ones((2, 3), dtype=np.float32)
+    _commit(path, rows)
+    published = os.path.join(resolve_index(path), "embeddings.bin")
+    size = os.path.getsize(published)
+
+    writer = IndexWriter.reopen(path)
+    writer.append("embeddings", rows)
+    assert os.path.getsize(published) == size
+    writer.abandon()
+
+
+def test_unversioned_index_is_read_and_replaced(tmp_path):
+    path = str(tmp_path / "index")
+    os.makedirs(path)
+    rows = np.arange(6, dtype=np.float32).reshape(2, 3)
+    rows.tofile(os.path.join(path, "embeddings.bin"))
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump({"format": "pexeso-index", "version": 1, "columns": [],
+                   "arrays": {"embeddings": {"dtype": "<f4", "shape": [2, 3]}}}, f)
+    assert index_exists(path)
+
+    _commit(path, rows, reopen=True)
+    assert np.array_equal(IndexReader(path).array("embeddings"), np.vstack([rows, rows]))
+    _commit(path, rows, reopen=True)
+    assert not os.path.exists(os.path.join(path, MANIFEST))
+    assert len(IndexReader(path).array("embeddings")) == 6
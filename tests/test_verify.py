@@ -0,0 +1,63 @@
+# pexeso/tests/test_verify.py
+"""Joinability scores of every early-stop mode (Config.verify_early_stop) on a lake with known joinability."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from benchmarks.workloads import index_lake, make_joinable_lake, unit
+from index.grid import HierarchicalGrid
+from index.pivots import PivotSelector
+from search.blocking import Blocker
+from search.verify import Verifier
+from utils.config import Config
+from utils.types import TableId, ColumnId
+
+DIM = 32
+QUERY_ROWS = 80
+N_COLUMNS = 16
+COLUMN_ROWS = 200
+
+
+@pytest.fixture(scope="module")
+def indexed():
+    cfg = Config()
+    rng = np.random.default_rng(cfg.seed)
+    query = unit(rng.standard_normal((QUERY_ROWS, DIM)))
+    lake, known = make_joinable_lake(query, N_COLUMNS, COLUMN_ROWS, rng)
+    all_vecs = np.vstack(list(lake.values()))
+    selector = PivotSelector(k=cfg.pivots_k, seed=cfg.seed)
+    selector.fit(all_vecs)
+    grid = HierarchicalGrid(levels=cfg.grid_levels)
+    grid.fit(selector.transform(all_vecs))
+    inv, tree, dists_map = index_lake(lake, selector, grid)
+    return query, selector.transform(query), lake, known, grid, tree, inv, dists_map
+
+
+def scores(stop: str, indexed):
+    """(table, column) -> (joinability, is_joinable) with verify_early_stop = stop."""
+    query, q_dists, lake, _, grid, tree, inv, dists_map = indexed
+    cfg = Config(verify_early_stop=stop)
+    blocker = Blocker(cfg, grid, tree)
+    candidates = blocker.block(query, blocker.range_query(q_dists, inv), lake, q_dists, dists_map)
+    results = Verifier(cfg).verify(TableId("q.csv"), ColumnId("value"), QUERY_ROWS, candidates)
+    return {(r.candidate_table.name, r.candidate_column.name): (r.joinability, r.is_joinable) for r in results}
+
+
+def test_no_early_stop_is_exact(indexed):
+    known = indexed[3]
+    got = scores("none", indexed)
+    for key, j in known.items():
+        assert got.get(key, (0.0, False))[0] == pytest.approx(j, abs=1e-12)
+
+
+@pytest.mark.parametrize("stop", ["unreachable", "decided"])
+def test_early_stop_keeps_joinable_columns(stop, indexed):
+    known = indexed[3]
+    expected = {key for key, j in known.items() if j >= Config().T_ratio}
+    got = scores(stop, indexed)
+    assert expected and {key for key, (_, joinable) in got.items() if joinable} == expected
+    if stop == "unreachable":
+        # columns that can reach T_ratio are scanned to the end
+        for key in expected:
+            assert got[key][0] == pytest.approx(known[key], abs=1e-12)
@@ -1,27 +1,99 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Literal
+from typing import Literal, Tuple
 
 # distance types
 DistanceType = Literal["euclidean"]
+# when a candidate column's scan may stop (see Blocker._column_matches)
+EarlyStop = Literal["none", "unreachable", "decided"]
+# what |Q| counts: every query row, or each distinct query value once
+JoinabilityMode = Literal["weighted", "distinct"]
+# pivot selection (see index.pivots; compare with python -m index.pivots <index_dir>)
+PivotStrategy = Literal["pca", "pca_outlier", "farthest_first", "max_variance"]
+# grid bin edges per level: equal width, or equal depth (quantiles of the data)
+GridBins = Literal["uniform", "quantile"]
+# embedding model (see embedding.embedder.make_embedder)
+EmbeddingModelName = Literal["fasttext", "hashing"]
+# CSV parser (pyarrow is optional)
+CsvEngine = Literal["c", "pyarrow"]
+# candidate generation backend (see index.candidates)
+CandidateBackend = Literal["grid", "ivf"]
+# compact codes of the stored embeddings (see index.quantization)
+EmbeddingCodes = Literal["none", "sq8", "pq"]
+# where the shards of a sharded index are searched (see search.shards)
+ShardMode = Literal["thread", "process"]
 
 @dataclass
 class Config:
     """Global configuration for PEXESO (v1: in-memory only)."""
     # index parameters
     pivots_k: int = 3              # |P| (recommended 3..7)
+    pivot_strategy: PivotStrategy = "pca"
     grid_levels: int = 3           # m (recommended 3..8)
+    grid_bins: GridBins = "quantile"
+    grid_cell_cap: int = 0         # > 0: add levels (up to the cell code width) until no leaf cell holds more rows
 
     # distance / thresholds
     distance: DistanceType = "euclidean"  # on L2-normalized vectors
     tau_ratio: float = 0.06        # τ as % of max distance (2.0 for L2-norm)
     T_ratio: float = 0.60          # joinability threshold (% of |Q|)
+    joinability: JoinabilityMode = "weighted"  # weighted: by row frequency; distinct: per distinct value
 
     # data heuristics
     min_col_len: int = 5          # ignore very small columns
     distinct_ratio_min: float = 0.30  # heuristic used in adapters.detect_key_columns
 
+    # CSV ingestion (see data.adapters.CSVFolderAdapter)
+    csv_engine: CsvEngine = "c"    # pyarrow: multithreaded, but may infer some column types differently
+    ingest_sniff_rows: int = 0     # > 0: pick key columns on the first n rows, parse only those
+    ingest_max_rows: int = 0       # > 0: index only the first n rows of each table
+
+    # embedding model
+    embedding_model: EmbeddingModelName = "fasttext"  # hashing: hashed character n-grams, no download
+
+    # embedding cache
+    embedding_cache: bool = True   # cache vectors per distinct value across columns and runs
+    embedding_cache_dir: str | None = None  # None: <output_dir>/embedding_cache
+    embedding_cache_items: int = 100_000    # in-memory LRU capacity (vectors)
+
+    # candidate generation
+    candidate_generator: CandidateBackend = "grid"  # ivf: also build IVF lists at index time
+    ivf_lists: int = 0             # 0: about 4·sqrt(#vectors)
+    ivf_nprobe: int = 0            # 0: every list within radius + τ (exact); n: at most n per query vector
+
+    # embedding storage
+    embedding_codes: EmbeddingCodes = "none"  # sq8/pq: also store codes; block on codes, re-rank near τ
+    pq_subspaces: int = 30         # pq: bytes per vector
+
+    # blocking
+    block_tile_size: int = 2048    # rows per side of a query × candidate distance tile
+    query_batch_rows: int = 20_000  # query values (over all query columns) blocked together
+    query_workers: int = 1         # threads over candidate columns when blocking a batch
+    top_k: int = 0                 # > 0: report only the k best joinable columns per query column
+    verify_early_stop: EarlyStop = "unreachable"  # stop a column once it cannot reach T_ratio
+    column_prefilter: bool = True  # skip columns that cannot reach T_ratio unread (not with early stop "none")
+
+    # offline build
+    workers: int = 1               # processes for table ingestion/embedding
+    streaming_build: bool = False  # write columns to disk as produced; memory bounded by budget
+    memory_budget_mb: int = 1024   # streaming build: pivot sample + working chunk
+    pivot_sample_size: int = 100_000  # max vectors in the reservoir used to fit pivots
+
+    # sharding (see index.shards, search.shards)
+    shards: int = 1                # > 1: partition tables into this many shards by a hash of their name
+    shard: int | None = None       # build only this shard (None: all of them, shard 0 first)
+    shard_mode: ShardMode = "thread"   # query shards on threads of this process, or one local process each
+    shard_hosts: Tuple[str, ...] = ()  # host:port of shard servers (pexeso.py shard), shard 0 first
+
+    # incremental updates
+    compact_dead_fraction: float = 0.25  # suggest compaction above this share of tombstoned rows
+    refit_drift_threshold: float = 0.20  # suggest a full rebuild above this drift (see index_drift)
+
+    # instrumentation (see utils.metrics)
+    metrics_path: str | None = None  # append a JSON line of stage timings and counters per build/update/query batch
+    profile_dir: str | None = None   # write a cProfile dump per build/update/query batch here
+
     # misc
     seed: int = 42
-    dtype: str = "float32"
+    dtype: str = "float32"         # stored embeddings: float32 or float16
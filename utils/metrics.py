@@ -0,0 +1,163 @@
+"""
+Stage timers, counters and memory samples of one build or query batch.
+
+    metrics = Metrics.from_config(cfg, "query", name)
+    with metrics.stage("embed"):
+        ...
+    metrics.count("values_embedded", n)
+    metrics.finish()   # appends one JSON line to cfg.metrics_path
+
+Each stage records wall and (process) CPU seconds and how often it ran;
+each record also has the process peak RSS seen at every stage end.
+With cfg.profile_dir a cProfile of the whole build or batch is written
+there as well, and hooks (callables taking (stage, wall_s, cpu_s)) see
+every stage as it ends, e.g. for tracing. When neither is configured
+Metrics.from_config returns NULL_METRICS, whose methods do nothing.
+"""
+from __future__ import annotations
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, is_dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+StageHook = Callable[[str, float, float], None]
+
+_profile_seq = 0
+_lock = threading.Lock()
+
+
+def peak_rss_mb() -> float | None:
+    """High-water mark of this process's resident memory (None where unavailable)."""
+    if resource is None:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Metrics:
+    """Timers and counters of one build ("build") or query batch ("query")."""
+
+    enabled = True
+
+    def __init__(self, kind: str, name: str = "", path: str | None = None, profile_dir: str | None = None):
+        self.kind = kind
+        self.name = name
+        self.path = path
+        self.profile_dir = profile_dir
+        self.hooks: List[StageHook] = []
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.peak_rss_mb: Dict[str, float] = {}
+        self.started = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        self._t0, self._cpu0 = time.perf_counter(), time.process_time()
+        self._profiler = None
+        if profile_dir is not None:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:  # another profiler is active (Python 3.12+ allows one per process)
+                self._profiler = None
+
+    @classmethod
+    def from_config(cls, cfg, kind: str, name: str = "") -> "Metrics":
+        """Metrics writing to cfg.metrics_path / cfg.profile_dir, or NULL_METRICS if both are unset."""
+        if cfg.metrics_path is None and cfg.profile_dir is None:
+            return NULL_METRICS
+        return cls(kind, name, cfg.metrics_path, cfg.profile_dir)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block; repeated stages accumulate."""
+        t0, cpu0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - t0, time.process_time() - cpu0
+            st = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+            st["wall_s"] += wall
+            st["cpu_s"] += cpu
+            st["calls"] += 1
+            rss = peak_rss_mb()
+            if rss is not None:
+                self.peak_rss_mb[name] = rss
+            for hook in self.hooks:
+                hook(name, wall, cpu)
+
+    def count(self, name: str, n: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def count_fields(self, stats, prefix: str = ""):
+        """Add every numeric field of a stats dataclass (BlockingStats, CacheStats, ...)."""
+        for key, value in (asdict(stats) if is_dataclass(stats) else stats).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.count(prefix + key, value)
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "started": self.started,
+            "wall_s": time.perf_counter() - self._t0,
+            "cpu_s": time.process_time() - self._cpu0,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+            "counters": self.counters,
+            "stage_peak_rss_mb": self.peak_rss_mb,
+        }
+
+    def finish(self) -> dict:
+        """Stop profiling, append the record to `path` (JSON lines) and return it."""
+        record = self.to_dict()
+        if self._profiler is not None:
+            global _profile_seq
+            self._profiler.disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            with _lock:
+                _profile_seq += 1
+                seq = _profile_seq
+            record["profile"] = os.path.join(self.profile_dir, f"{self.kind}-{os.getpid()}-{seq}.prof")
+            self._profiler.dump_stats(record["profile"])
+            self._profiler = None
+        if self.path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with _lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        return record
+
+
+class _NullMetrics(Metrics):
+    """Metrics that records nothing (instrumentation off)."""
+
+    enabled = False
+
+    def __init__(self):
+        self.kind, self.name, self.path, self.profile_dir = "", "", None, None
+        self.hooks, self.stages, self.counters, self.peak_rss_mb = [], {}, {}, {}
+        self._stage = nullcontext()
+
+    def stage(self, name: str):
+        return self._stage
+
+    def count(self, name: str, n: float = 1):
+        pass
+
+    def count_fields(self, stats, prefix: str = ""):
+        pass
+
+    def finish(self) -> dict:
+        return {}
+
+
+NULL_METRICS = _NullMetrics()
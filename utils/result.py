@@ -0,0 +1,16 @@
+from __future__ import annotations
+from dataclasses import dataclass
+
+from utils.types import TableId, ColumnId
+
+@dataclass
+class JoinableResult:
+    """Joinability of one candidate column with respect to a query column."""
+    query_table: TableId
+    candidate_table: TableId
+    query_column: ColumnId
+    candidate_column: ColumnId
+    joinability: float   # matches / query_size
+    is_joinable: bool    # joinability >= T_ratio
+    matches: int
+    query_size: int